@@ -0,0 +1,376 @@
+"""
+Rule-based alerts
+User-defined rules (recommendation changes, new buy/sell signals, price crossing the moving
+average, P/E against the sector median) are indexed by symbol and by the state fields they
+read. When a refresh updates a symbol's cached data, only the rules on that symbol whose
+fields changed are checked, so idle rules cost nothing between refreshes. Fired alerts are
+appended to a JSON lines log and kept in a bounded in-memory queue.
+
+Rule state is per process (like live updates): the first refresh of a symbol after startup
+records its baseline, and alerts fire on the changes after that. Every gunicorn worker sees
+the same changes, so the log file is the shared record of what has fired: it is locked while
+an alert is appended, and an alert another process already logged is not recorded again.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from serialization import dumps_bytes
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+ALERT_RULES_FILE = 'alert_rules.json'
+ALERT_LOG_FILE = 'alerts_log.jsonl'
+
+# Fired alerts kept in memory (older ones stay in the log file)
+ALERT_QUEUE_SIZE = 1000
+# Seconds between background refreshes of the symbols that have rules
+ALERT_REFRESH_INTERVAL = 300
+
+RECOMMENDATIONS = ('BUY', 'SELL', 'HOLD')
+
+# Rule type -> state fields it reads (see symbol_state in app.py)
+RULE_FIELDS = {
+    'recommendation_change': ('overall_recommendation',),
+    'technical_recommendation_change': ('technical_recommendation',),
+    'buy_signal': ('last_buy_signal',),
+    'sell_signal': ('last_sell_signal',),
+    'price_cross_ma': ('last_close', 'moving_average'),
+    'pe_vs_sector': ('pe_ratio', 'pe_sector_median')
+}
+
+_rules = {}          # rule id -> rule
+_index = {}          # symbol -> field -> [rule]
+_states = {}         # symbol -> last evaluated state
+_fired = deque(maxlen=ALERT_QUEUE_SIZE)
+_fired_keys = set()
+_loaded = {'rules': False}   # signature of the rules file as last loaded
+_log_position = {'offset': 0}   # end of the log as last read by this process
+_lock = threading.RLock()
+
+_refresher = {'thread': None}
+
+def validate_rule(symbol, rule_type, params):
+    """Normalized (symbol, type, params) of a new rule; raises ValueError when invalid"""
+    symbol = (symbol or '').strip().upper()
+    if not symbol:
+        raise ValueError('symbol is required')
+    if rule_type not in RULE_FIELDS:
+        raise ValueError(f"type must be one of {', '.join(RULE_FIELDS)}")
+
+    params = dict(params or {})
+    if rule_type in ('recommendation_change', 'technical_recommendation_change'):
+        target = params.get('to')
+        if target is not None and str(target).upper() not in RECOMMENDATIONS:
+            raise ValueError(f"to must be one of {', '.join(RECOMMENDATIONS)}")
+        params = {'to': str(target).upper()} if target is not None else {}
+    elif rule_type == 'price_cross_ma':
+        direction = params.get('direction', 'any')
+        if direction not in ('above', 'below', 'any'):
+            raise ValueError("direction must be 'above', 'below' or 'any'")
+        params = {'direction': direction}
+    elif rule_type == 'pe_vs_sector':
+        condition = params.get('condition', 'below')
+        if condition not in ('above', 'below'):
+            raise ValueError("condition must be 'above' or 'below'")
+        ratio = float(params.get('ratio', 1.0))
+        if ratio <= 0:
+            raise ValueError('ratio must be positive')
+        params = {'condition': condition, 'ratio': ratio}
+    else:
+        params = {}
+    return symbol, rule_type, params
+
+def _rebuild_index():
+    index = {}
+    for rule in _rules.values():
+        fields = index.setdefault(rule['symbol'], {})
+        for field in RULE_FIELDS[rule['type']]:
+            fields.setdefault(field, []).append(rule)
+    _index.clear()
+    _index.update(index)
+
+def _rules_signature():
+    try:
+        stat = os.stat(ALERT_RULES_FILE)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+def _read_rules_file():
+    """{rule id: rule} as currently saved ({} if there is no rules file)"""
+    rules = {}
+    if os.path.exists(ALERT_RULES_FILE):
+        with open(ALERT_RULES_FILE, 'r') as f:
+            for rule in json.load(f).get('rules', []):
+                if rule.get('type') in RULE_FIELDS:
+                    rules[rule['id']] = rule
+    return rules
+
+def _use_rules(rules, signature):
+    _rules.clear()
+    _rules.update(rules)
+    _rebuild_index()
+    _loaded['rules'] = signature
+
+def _ensure_rules_loaded():
+    """Load the rules, again whenever another process has changed the rules file"""
+    signature = _rules_signature()
+    if _loaded['rules'] is not False and _loaded['rules'] == signature:
+        return
+    with _lock:
+        signature = _rules_signature()
+        if _loaded['rules'] is not False and _loaded['rules'] == signature:
+            return
+        try:
+            rules = _read_rules_file()
+        except Exception as e:
+            print(f"Error loading alert rules: {e}")
+            rules = dict(_rules)
+        _use_rules(rules, signature)
+
+def _change_rules(change):
+    """Apply change(rules) to the saved rules and save the result; returns what change returned
+
+    The file is re-read under an exclusive lock first, so rules added or removed by other
+    processes are kept.
+    """
+    with _lock, open(ALERT_RULES_FILE + '.lock', 'a') as lock_file:
+        _lock_file(lock_file, exclusive=True)
+        rules = _read_rules_file()
+        result = change(rules)
+        tmp_file = ALERT_RULES_FILE + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump({'rules': list(rules.values())}, f, indent=2)
+        os.replace(tmp_file, ALERT_RULES_FILE)
+        _use_rules(rules, _rules_signature())
+    return result
+
+def add_rule(symbol, rule_type, params=None):
+    """Create and persist a rule; returns it"""
+    symbol, rule_type, params = validate_rule(symbol, rule_type, params)
+    rule = {
+        'id': uuid.uuid4().hex[:12],
+        'symbol': symbol,
+        'type': rule_type,
+        'params': params,
+        'created': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+    def add(rules):
+        rules[rule['id']] = rule
+
+    _change_rules(add)
+    return rule
+
+def remove_rule(rule_id):
+    """Delete a rule; returns False if it does not exist"""
+    def remove(rules):
+        return rules.pop(rule_id, None) is not None
+
+    return _change_rules(remove)
+
+def list_rules(symbol=None):
+    _ensure_rules_loaded()
+    return [rule for rule in _rules.values() if symbol is None or rule['symbol'] == symbol]
+
+def has_rules(symbol):
+    _ensure_rules_loaded()
+    return symbol in _index
+
+def alerted_symbols():
+    _ensure_rules_loaded()
+    return set(_index)
+
+def check_rule(rule, previous, state):
+    """Alert message if rule fires on the change from previous to state (None otherwise)"""
+    params = rule['params']
+    rule_type = rule['type']
+
+    if rule_type in ('recommendation_change', 'technical_recommendation_change'):
+        field = RULE_FIELDS[rule_type][0]
+        old, new = previous.get(field), state.get(field)
+        if old is None or new is None or old == new:
+            return None
+        if params.get('to') and new != params['to']:
+            return None
+        label = 'Overall' if rule_type == 'recommendation_change' else 'Technical'
+        return f"{label} recommendation changed from {old} to {new}"
+
+    if rule_type in ('buy_signal', 'sell_signal'):
+        field = RULE_FIELDS[rule_type][0]
+        old, new = previous.get(field), state.get(field)
+        if new is None or (old is not None and new <= old):
+            return None
+        return f"New {'buy' if rule_type == 'buy_signal' else 'sell'} signal on {new}"
+
+    if rule_type == 'price_cross_ma':
+        values = (previous.get('last_close'), previous.get('moving_average'),
+                  state.get('last_close'), state.get('moving_average'))
+        if any(value is None for value in values):
+            return None
+        old_close, old_ma, close, ma = values
+        crossed_above = old_close <= old_ma and close > ma
+        crossed_below = old_close >= old_ma and close < ma
+        direction = params.get('direction', 'any')
+        if crossed_above and direction in ('above', 'any'):
+            return f"Price {close:.2f} crossed above the moving average {ma:.2f}"
+        if crossed_below and direction in ('below', 'any'):
+            return f"Price {close:.2f} crossed below the moving average {ma:.2f}"
+        return None
+
+    if rule_type == 'pe_vs_sector':
+        def condition_met(values):
+            pe, median = values.get('pe_ratio'), values.get('pe_sector_median')
+            if pe is None or median is None:
+                return None
+            threshold = median * params['ratio']
+            return pe < threshold if params['condition'] == 'below' else pe > threshold
+        # Fires when the condition starts to hold
+        if condition_met(state) and condition_met(previous) is False:
+            threshold = state['pe_sector_median'] * params['ratio']
+            return (f"P/E {state['pe_ratio']:.2f} moved {params['condition']} "
+                    f"{threshold:.2f} ({params['ratio']:g}x the sector median {state['pe_sector_median']:.2f})")
+        return None
+
+    return None
+
+def _alert_key(rule, previous, state):
+    # Identical for the same transition on the same bar, so workers that all see it (and
+    # refetches of the same data) record it once, while a later repeat of it fires again
+    fields = RULE_FIELDS[rule['type']]
+    old = ','.join(str(previous.get(field)) for field in fields)
+    new = ','.join(str(state.get(field)) for field in fields)
+    return f"{rule['id']}:{state.get('as_of')}:{old}->{new}"
+
+def _add_fired(alert):
+    if len(_fired) == _fired.maxlen:
+        _fired_keys.discard(_fired[0].get('key'))
+    _fired.append(alert)
+    _fired_keys.add(alert.get('key'))
+
+def _read_new_alerts(f):
+    """Add the alerts appended to the open log (by any process) since this process last read it"""
+    f.seek(0, os.SEEK_END)
+    if f.tell() < _log_position['offset']:
+        # The log was truncated or replaced
+        _log_position['offset'] = 0
+    f.seek(_log_position['offset'])
+    for line in deque(f, maxlen=ALERT_QUEUE_SIZE):
+        _add_fired(json.loads(line))
+    _log_position['offset'] = f.tell()
+
+def _lock_file(f, exclusive):
+    if fcntl is not None:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+
+def _sync_log():
+    """Bring the in-memory queue up to date with the log"""
+    with _lock:
+        try:
+            if os.path.exists(ALERT_LOG_FILE):
+                with open(ALERT_LOG_FILE, 'rb') as f:
+                    _lock_file(f, exclusive=False)
+                    _read_new_alerts(f)
+        except Exception as e:
+            print(f"Error loading alert log: {e}")
+
+def _record(alerts):
+    """Log the alerts that no process has logged yet; returns them"""
+    recorded = []
+    with _lock:
+        try:
+            with open(ALERT_LOG_FILE, 'a+b') as f:
+                # Held until the file is closed, so two workers cannot both log the same alert
+                _lock_file(f, exclusive=True)
+                _read_new_alerts(f)
+                for alert in alerts:
+                    if alert['key'] in _fired_keys:
+                        continue
+                    _add_fired(alert)
+                    recorded.append(alert)
+                if recorded:
+                    f.write(b''.join(dumps_bytes(alert) + b'\n' for alert in recorded))
+                    f.flush()
+                    _log_position['offset'] = f.tell()
+        except Exception as e:
+            print(f"Error writing alert log: {e}")
+            # Still deduplicated within this process
+            for alert in alerts:
+                if alert['key'] not in _fired_keys:
+                    _add_fired(alert)
+                    recorded.append(alert)
+    return recorded
+
+def evaluate(symbol, state):
+    """Check the rules on symbol whose fields changed since its last state; returns fired alerts"""
+    if state is None or not has_rules(symbol):
+        return []
+
+    with _lock:
+        previous = _states.get(symbol)
+        _states[symbol] = state
+        if previous is None:
+            return []
+
+        fields = _index.get(symbol, {})
+        candidates = {}
+        for field, rules in fields.items():
+            if previous.get(field) != state.get(field):
+                for rule in rules:
+                    candidates[rule['id']] = rule
+
+    fired_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    alerts = []
+    for rule in candidates.values():
+        message = check_rule(rule, previous, state)
+        if message:
+            alerts.append({
+                'key': _alert_key(rule, previous, state),
+                'rule_id': rule['id'],
+                'symbol': symbol,
+                'type': rule['type'],
+                'message': message,
+                'fired_at': fired_at,
+                'values': {field: state.get(field) for field in RULE_FIELDS[rule['type']]}
+            })
+    return _record(alerts) if alerts else []
+
+def recent_alerts(symbol=None, since=None, limit=100):
+    """Fired alerts, newest first (optionally for one symbol / fired at or after since)"""
+    _sync_log()
+    with _lock:
+        alerts = list(_fired)
+    alerts = [alert for alert in reversed(alerts)
+              if (symbol is None or alert['symbol'] == symbol) and
+              (since is None or alert['fired_at'] >= since)]
+    return alerts[:limit]
+
+def start_refresher(refresh, interval=ALERT_REFRESH_INTERVAL):
+    """Start (once per process) a daemon thread calling refresh(symbols) for the symbols with rules"""
+    with _lock:
+        if _refresher['thread'] is not None and _refresher['thread'].is_alive():
+            return _refresher['thread']
+
+        def run():
+            while True:
+                time.sleep(interval)
+                symbols = alerted_symbols()
+                if not symbols:
+                    continue
+                try:
+                    refresh(symbols)
+                except Exception as e:
+                    print(f"Error in alert refresh: {e}")
+
+        thread = threading.Thread(target=run, name='alert-refresher', daemon=True)
+        thread.start()
+        _refresher['thread'] = thread
+        return thread
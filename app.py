@@ -3,94 +3,168 @@ Stock Portfolio Analysis Web Service
 A Flask application to display fundamental and technical analysis for your stock portfolio
 """
 
-from flask import Flask, render_template, jsonify, request
-import yfinance as yf
+from flask import Flask, Blueprint, Response, render_template, jsonify, request, stream_with_context
+import importlib.util
+import sys
+import threading
 import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib
-import json
-import os
-from datetime import datetime
-matplotlib.use('Agg')  # Use non-interactive backend for web
 import io
 import base64
 import json
 import os
 from datetime import datetime, timedelta
 import numpy as np
+from indicator_cache import compact_indicator_frame, expand_indicator_frame, compact_column
+import price_store
+from indicators import calculate_served_indicators
+from streaming_indicators import INTRADAY_INTERVALS, StreamingIndicatorState
+from universe import universe_symbols, load_universe, UNIVERSE_FILE
+from concurrent.futures import ThreadPoolExecutor
+import time
+from screener import screen_symbols, screen_entry, last_signal_dates
+from backtest import backtest_symbols
+from sweep import run_parameter_sweep
+from serialization import init_app as init_serialization, memoized_json_response, forget_memoized
+import live_updates
+import alerts
+import portfolios
+from portfolios import DEFAULT_PORTFOLIO
+import snapshots
+import symbol_master
+import export
+from batch_report import precomputed_body
+from risk import cached_portfolio_risk, RISK_BENCHMARK, RISK_LOOKBACK_DAYS
+from statements import cached_growth_metrics, extract_enhanced_growth_metrics, growth_metrics_for_symbols, growth_cache, growth_cache_stats, GROWTH_FIELDS
 
-app = Flask(__name__)
+def lazy_import(name):
+    """Module that is only imported on first attribute access (keeps app startup fast)"""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named '{name}'")
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
 
-# Portfolio configuration file
-PORTFOLIO_FILE = 'portfolio.json'
+# yfinance is only needed once data is fetched
+yf = lazy_import('yfinance')
 
-def load_portfolio():
-    """Load portfolio from JSON file"""
-    try:
-        if os.path.exists(PORTFOLIO_FILE):
-            with open(PORTFOLIO_FILE, 'r') as f:
-                data = json.load(f)
-                return data.get('portfolio', [])
-        else:
-            # Create default portfolio if file doesn't exist
-            default_portfolio = []
-            save_portfolio(default_portfolio)
-            return default_portfolio
-    except Exception as e:
-        print(f"Error loading portfolio: {e}")
-        return []
+def new_figure(**kwargs):
+    """A standalone matplotlib Figure, imported on first chart render
+
+    Figures are created without pyplot, whose global current-figure state is shared by every
+    thread, so concurrent chart requests render independently.
+    """
+    from matplotlib.figure import Figure
+    return Figure(**kwargs)
+
+bp = Blueprint('stock_analysis', __name__)
 
-def save_portfolio(portfolio):
-    """Save portfolio to JSON file"""
+def load_portfolio(name=DEFAULT_PORTFOLIO):
+    """Holdings of a named portfolio, sorted by symbol"""
     try:
-        data = {'portfolio': portfolio}
-        with open(PORTFOLIO_FILE, 'w') as f:
-            json.dump(data, f, indent=4)
-        return True
+        return portfolios.portfolio_holdings(name)
     except Exception as e:
-        print(f"Error saving portfolio: {e}")
-        return False
+        print(f"Error loading portfolio '{name}': {e}")
+        return []
 
-def get_portfolio_stocks():
-    """Get list of stock symbols from portfolio"""
-    portfolio = load_portfolio()
+def get_portfolio_stocks(name=DEFAULT_PORTFOLIO):
+    """Get list of stock symbols from a portfolio"""
+    portfolio = load_portfolio(name)
     return [stock['symbol'] for stock in portfolio]
 
+def get_all_portfolio_stocks():
+    """Symbols held by any portfolio (each fetched and cached once however many hold it)"""
+    return list(portfolios.referenced_symbols())
+
+def is_portfolio_symbol(symbol):
+    return portfolios.symbol_refcount(symbol) > 0
+
 def get_company_name_from_yf(symbol):
-    """Get company name from Yahoo Finance"""
+    """Get company name from the symbol master, or Yahoo Finance for symbols it does not name"""
+    listed = symbol_master.lookup(symbol)
+    if listed and listed.get('name'):
+        return listed['name']
     try:
-        ticker = yf.Ticker(symbol)
-        info = ticker.info
+        info = get_ticker_info(symbol)
         return info.get('longName', info.get('shortName', symbol))
     except:
         return symbol
 
 # Global variables to cache data
+# data_cache holds compact indicator entries (see indicator_cache.py), not DataFrames
 data_cache = {}
 fundamental_cache = {}
 last_update = {}
 
-def fetch_single_stock_data(symbol):
+def release_symbols(symbols):
+    """Drop the shared cache entries of symbols that no portfolio holds any more"""
+    released = [symbol for symbol in symbols if not is_portfolio_symbol(symbol)]
+    for symbol in released:
+        data_cache.pop(symbol, None)
+        fundamental_cache.pop(symbol, None)
+        last_update.pop(symbol, None)
+        info_cache.pop(symbol, None)
+        live_updates.forget_snapshot(symbol)
+        for key in [key for key in intraday_states if key[0] == symbol]:
+            intraday_states.pop(key, None)
+        # Memoized stock and chart payloads are keyed (kind, symbol, ...)
+        forget_memoized(lambda key, symbol=symbol: isinstance(key, tuple) and len(key) > 1 and key[1] == symbol)
+    return released
+
+# Raw Yahoo Finance info per symbol, shared by the stock view, portfolio validation
+# and the sector benchmark pipeline: {symbol: {'info': dict, 'fetched_at': datetime}}
+info_cache = {}
+INFO_CACHE_MAX_AGE = timedelta(hours=1)
+info_cache_stats = {'hits': 0, 'fetches': 0}
+
+def get_ticker_info(symbol, max_age=INFO_CACHE_MAX_AGE, ticker=None):
+    """Get ticker.info for a symbol, reusing a cached copy younger than max_age"""
+    entry = info_cache.get(symbol)
+    if entry and datetime.now() - entry['fetched_at'] < max_age:
+        info_cache_stats['hits'] += 1
+        return entry['info']
+    
+    ticker = ticker or yf.Ticker(symbol)
+    info = ticker.info
+    info_cache_stats['fetches'] += 1
+    if info:
+        info_cache[symbol] = {'info': info, 'fetched_at': datetime.now()}
+    return info
+
+def get_cached_frame(symbol):
+    """Get the cached indicator DataFrame for a symbol (empty if not cached)"""
+    return expand_indicator_frame(data_cache.get(symbol))
+
+def fetch_single_stock_data(symbol, max_age_seconds=3600):
     """Fetch data for a single stock on demand"""
     global data_cache, fundamental_cache, last_update
     
     # Check if we have cached data for this stock and if it's still fresh (cache for 1 hour)
     if (symbol in data_cache and symbol in last_update and 
-        (datetime.now() - last_update[symbol]).seconds < 3600):
+        (datetime.now() - last_update[symbol]).total_seconds() < max_age_seconds):
         print(f"Using cached data for {symbol}")
         return
     
     print(f"Fetching fresh data for {symbol}...")
     
     try:
-        # Fetch market data with explicit auto_adjust=True for consistent behavior
-        # This adjusts prices for stock splits and dividends, providing cleaner technical analysis
-        data = yf.download(symbol, period='300d', interval='1d', auto_adjust=True)
-        data = data.dropna()
+        # Prefer the shared memory-mapped price store when it was rebuilt recently
+        data = load_history_from_price_store(symbol)
+        if data is None:
+            # Fetch market data with explicit auto_adjust=True for consistent behavior
+            # This adjusts prices for stock splits and dividends, providing cleaner technical analysis
+            data = yf.download(symbol, period='300d', interval='1d', auto_adjust=True)
+            data = data.dropna()
         
         # Get fundamental data
         ticker = yf.Ticker(symbol)
-        info = ticker.info
+        info = get_ticker_info(symbol, ticker=ticker)
+        record_benchmark_ticker_info(symbol, info)
         basic_metrics = extract_fundamental_metrics(symbol, info)
         enhanced_metrics = extract_enhanced_growth_metrics(ticker)
         
@@ -102,22 +176,173 @@ def fetch_single_stock_data(symbol):
             fundamental_data = enhanced_metrics
         
         # Calculate technical indicators
-        data = calculate_technical_indicators(data)
+        data = calculate_served_indicators(data)
         
-        # Cache the data
-        data_cache[symbol] = data
+        # Cache the data in compact form
+        data_cache[symbol] = compact_indicator_frame(data)
         fundamental_cache[symbol] = fundamental_data
         last_update[symbol] = datetime.now()
+        record_fundamentals_snapshot(symbol, fundamental_data)
         
         print(f"Data fetch completed for {symbol}.")
+        notify_symbol_refreshed(symbol)
         
     except Exception as e:
         print(f"Error fetching data for {symbol}: {e}")
         # Store empty data to avoid repeated failed requests
-        data_cache[symbol] = pd.DataFrame()
+        data_cache[symbol] = compact_indicator_frame(pd.DataFrame())
         fundamental_cache[symbol] = {}
         last_update[symbol] = datetime.now()
 
+def record_fundamentals_snapshot(symbol, fundamental_data):
+    """Keep today's fundamentals of symbol in the snapshot history"""
+    try:
+        snapshots.record_fundamentals(symbol, fundamental_data)
+    except Exception as e:
+        print(f"Error recording fundamentals snapshot for {symbol}: {e}")
+
+# State fields only the alert rules read; live-update clients get the rest
+ALERT_STATE_FIELDS = ('moving_average', 'pe_ratio', 'pe_sector_median')
+
+def symbol_state(symbol):
+    """Latest price, recommendations, signal dates and alert inputs of a cached symbol (None if not cached)"""
+    stock_data = get_cached_frame(symbol)
+    if stock_data.empty or 'Buy_Signal' not in stock_data:
+        return None
+    
+    technical_recommendation = get_technical_recommendation(stock_data)
+    fundamental_analysis = calculate_fundamental_analysis(fundamental_cache.get(symbol, {}))
+    signal_dates = last_signal_dates(stock_data[['Buy_Signal', 'Sell_Signal']])
+    stock_last_update = last_update.get(symbol)
+    pe_comparison = fundamental_analysis['sector_comparison'].get('metrics', {}).get('pe_ratio', {})
+    moving_average = stock_data['30_Moving_Avg'].iloc[-1]
+    
+    return {
+        'last_close': round(float(stock_data['Close'].iloc[-1]), 2),
+        'as_of': stock_data.index[-1].strftime('%Y-%m-%d'),
+        'technical_recommendation': technical_recommendation,
+        'overall_recommendation': get_simple_overall_recommendation(fundamental_analysis, technical_recommendation),
+        'last_buy_signal': signal_dates['Buy_Signal'],
+        'last_sell_signal': signal_dates['Sell_Signal'],
+        'last_updated': stock_last_update.strftime('%Y-%m-%d %H:%M:%S') if stock_last_update else 'N/A',
+        'moving_average': round(float(moving_average), 2) if not pd.isna(moving_average) else None,
+        'pe_ratio': pe_comparison.get('company_value'),
+        'pe_sector_median': pe_comparison.get('sector_median')
+    }
+
+def live_snapshot(symbol, state=None):
+    """The fields of symbol_state sent to live-update clients (None if not cached)"""
+    state = state if state is not None else symbol_state(symbol)
+    if state is None:
+        return None
+    return {key: value for key, value in state.items() if key not in ALERT_STATE_FIELDS}
+
+def notify_symbol_refreshed(symbol):
+    """Check alert rules and push what changed to live-update clients after a symbol was fetched"""
+    listening = live_updates.subscriber_count() > 0
+    if not listening:
+        # Nobody is listening: the next subscriber gets a full snapshot instead of a diff
+        live_updates.forget_snapshot(symbol)
+    
+    # Symbols without rules and without listeners cost nothing here
+    if not listening and not alerts.has_rules(symbol):
+        return
+    
+    state = symbol_state(symbol)
+    if state is None:
+        return
+    
+    fired = alerts.evaluate(symbol, state)
+    if not listening:
+        return
+    
+    for alert in fired:
+        live_updates.publish('alert', alert, symbol=symbol)
+    changes = live_updates.snapshot_changes(symbol, live_snapshot(symbol, state))
+    if changes:
+        live_updates.publish('update', {'symbol': symbol, 'changes': changes}, symbol=symbol)
+
+def refresh_live_symbols(symbols):
+    """Background refresh of the portfolio symbols live-update clients are watching"""
+    for symbol in get_all_portfolio_stocks():
+        if symbols is None or symbol in symbols:
+            fetch_single_stock_data(symbol, max_age_seconds=live_updates.REFRESH_INTERVAL)
+
+def refresh_alert_symbols(symbols):
+    """Background refresh of the symbols that have alert rules (fires their alerts)"""
+    for symbol in sorted(symbols):
+        fetch_single_stock_data(symbol, max_age_seconds=alerts.ALERT_REFRESH_INTERVAL)
+
+# Streaming indicator state per (symbol, interval) for intraday mode
+intraday_states = {}
+intraday_lock = threading.Lock()
+# Minimum seconds between intraday downloads for the same symbol and interval
+INTRADAY_POLL_SECONDS = 30
+
+def completed_bars(bars, interval, now=None):
+    """Bars whose interval has ended; the last one is dropped only while it is still forming"""
+    if bars.empty:
+        return bars
+    last = bars.index[-1]
+    now = now or pd.Timestamp.now(tz=last.tz)
+    if last + pd.Timedelta(interval) > now:
+        return bars.iloc[:-1]
+    return bars
+
+def update_intraday_state(symbol, interval):
+    """Feed bars completed since the last update into the symbol's streaming indicator state"""
+    with intraday_lock:
+        entry = intraday_states.get((symbol, interval))
+    now = datetime.now()
+    if entry and (now - entry['fetched_at']).total_seconds() < INTRADAY_POLL_SECONDS:
+        return entry['state'], 0
+    
+    # A state that missed more than a day of bars is rebuilt from the full intraday history
+    state = entry['state'] if entry else None
+    if state is not None and state.last_timestamp is not None:
+        if pd.Timestamp.now(tz=state.last_timestamp.tz) - state.last_timestamp > pd.Timedelta(days=1):
+            state = None
+    
+    # Downloaded without the lock, so one slow symbol does not hold up the others
+    period = '1d' if state is not None else INTRADAY_INTERVALS[interval]
+    bars = yf.download(symbol, period=period, interval=interval, auto_adjust=True, progress=False)
+    if isinstance(bars.columns, pd.MultiIndex):
+        bars.columns = bars.columns.droplevel(1)
+    bars = completed_bars(bars.dropna(), interval)
+    
+    with intraday_lock:
+        current = intraday_states.get((symbol, interval))
+        if current is not None and current['fetched_at'] > now:
+            # A request that started later has already updated the state
+            return current['state'], 0
+        state = state or StreamingIndicatorState()
+        # Bars already fed by a concurrent update are skipped
+        added = state.update_frame(bars)
+        intraday_states[(symbol, interval)] = {'state': state, 'fetched_at': now}
+    return state, added
+
+def price_store_updated_at():
+    """When the price store shared by every worker was last rebuilt (None without one)"""
+    return price_store.store_updated_at(price_store.open_price_store())
+
+def report_freshness_cutoff(symbol):
+    """Newest data time a batch report must beat: the shared store's rebuild or this worker's own fetch"""
+    times = [t for t in (price_store_updated_at(), last_update.get(symbol)) if t is not None]
+    return max(times) if times else None
+
+def load_history_from_price_store(symbol, days=300):
+    """Get the last `days` of daily history from the price store (None if not available)"""
+    store = price_store.open_price_store()
+    if not price_store.is_store_fresh(store):
+        return None
+
+    data = price_store.symbol_history(store, symbol, start=datetime.now() - timedelta(days=days))
+    if data is None or data.empty:
+        return None
+
+    print(f"Using price store history for {symbol}")
+    return data
+
 def fetch_stock_data():
     """Legacy function - kept for backward compatibility but now does nothing"""
     # This function is now obsolete since we load stocks on demand
@@ -186,83 +411,31 @@ def extract_fundamental_metrics(stock, info):
     
     return metrics
 
-def calculate_technical_indicators(data):
-    """Calculate technical indicators"""
-    if isinstance(data.columns, pd.MultiIndex):
-        data.columns = data.columns.droplevel(1)
-    
-    if len(data) < 30:
-        return data
-    
-    data = data.sort_index()
-    
-    # 30-Day Moving Average
-    data['30_Moving_Avg'] = data['Close'].rolling(window=30, min_periods=1).mean()
-    
-    # Stochastic Oscillator
-    high_14 = data['High'].rolling(window=14, min_periods=1).max()
-    low_14 = data['Low'].rolling(window=14, min_periods=1).min()
-    
-    denominator = (high_14 - low_14)
-    denominator = denominator.replace(0, 1e-10)
-    data['%K'] = (data['Close'] - low_14) * 100 / denominator
-    data['%K'] = data['%K'].rolling(window=3, min_periods=1).mean()
-    data['%D'] = data['%K'].rolling(window=3, min_periods=1).mean()
-    data['Smoothed_%D'] = data['%D'].rolling(window=30, min_periods=1).mean()
-    
-    # MACD
-    data['12_EMA'] = data['Close'].ewm(span=12, adjust=False).mean()
-    data['26_EMA'] = data['Close'].ewm(span=26, adjust=False).mean()
-    data['MACD'] = data['12_EMA'] - data['26_EMA']
-    data['Signal_Line'] = data['MACD'].ewm(span=9, adjust=False).mean()
-    data['Smoothed_MACD'] = data['MACD'].rolling(window=15, min_periods=1).mean()
-    data['Smoothed_Signal_Line'] = data['Signal_Line'].rolling(window=15, min_periods=1).mean()
-    
-    # Generate buy/sell signals
-    data['buy_ma'] = (data['Close'] > data['30_Moving_Avg'])
-    data['buy_stochastic'] = (data['Smoothed_%D'] > 30) & (data['Smoothed_%D'].shift(1) <= 30)
-    data['buy_macd'] = (data['Smoothed_MACD'] > data['Smoothed_Signal_Line']) & (data['Smoothed_MACD'].shift(1) <= data['Smoothed_Signal_Line'].shift(1))
-    
-    data['sell_ma'] = (data['Close'] < data['30_Moving_Avg'])
-    data['sell_stochastic'] = (data['Smoothed_%D'] < 30) & (data['Smoothed_%D'].shift(1) >= 30)
-    data['sell_macd'] = (data['Smoothed_MACD'] < data['Smoothed_Signal_Line']) & (data['Smoothed_MACD'].shift(1) >= data['Smoothed_Signal_Line'].shift(1))
-    
-    window = 10
-    buy_signal = (
-        data['buy_ma'].rolling(window=window, min_periods=window).max().fillna(False).astype(bool) &
-        data['buy_stochastic'].rolling(window=window, min_periods=window).max().fillna(False).astype(bool) &
-        data['buy_macd'].rolling(window=window, min_periods=window).max().fillna(False).astype(bool)
-    )
-    data['Buy_Signal'] = buy_signal
-    
-    sell_signal = (
-        data['sell_ma'].rolling(window=window, min_periods=window).max().fillna(False).astype(bool) &
-        data['sell_stochastic'].rolling(window=window, min_periods=window).max().fillna(False).astype(bool) &
-        data['sell_macd'].rolling(window=window, min_periods=window).max().fillna(False).astype(bool)
-    )
-    data['Sell_Signal'] = sell_signal
-    
-    return data
-
 def get_sector_representative_stocks():
     """Get representative stocks for each sector to calculate benchmarks"""
     return {
-        'Technology': ['AAPL', 'MSFT', 'GOOGL', 'AMZN', 'NVDA', 'META', 'TSLA', 'NFLX', 'ADBE', 'CRM'],
+        'Technology': ['AAPL', 'MSFT', 'GOOGL', 'AMZN', 'NVDA', 'META', 'TSLA', 'ORCL', 'ADBE', 'CRM'],
         'Healthcare': ['JNJ', 'UNH', 'PFE', 'ABBV', 'TMO', 'ABT', 'MRK', 'DHR', 'BMY', 'LLY'],
         'Financial Services': ['JPM', 'BAC', 'WFC', 'GS', 'MS', 'C', 'AXP', 'BLK', 'SCHW', 'USB'],
         'Consumer Cyclical': ['HD', 'MCD', 'NKE', 'SBUX', 'TGT', 'LOW', 'TJX', 'MAR', 'GM', 'F'],
         'Consumer Defensive': ['PG', 'KO', 'PEP', 'WMT', 'COST', 'CL', 'KMB', 'GIS', 'K', 'CPB'],
         'Utilities': ['NEE', 'DUK', 'SO', 'D', 'AEP', 'EXC', 'SRE', 'PEG', 'XEL', 'ED'],
-        'Energy': ['XOM', 'CVX', 'COP', 'EOG', 'SLB', 'PXD', 'KMI', 'OKE', 'WMB', 'VLO'],
+        'Energy': ['XOM', 'CVX', 'COP', 'EOG', 'SLB', 'MPC', 'KMI', 'OKE', 'WMB', 'VLO'],
         'Industrials': ['BA', 'HON', 'UPS', 'CAT', 'GE', 'MMM', 'LMT', 'RTX', 'UNP', 'CSX'],
         'Materials': ['LIN', 'APD', 'SHW', 'FCX', 'NEM', 'DOW', 'DD', 'PPG', 'ECL', 'IFF'],
         'Real Estate': ['AMT', 'PLD', 'CCI', 'EQIX', 'SPG', 'O', 'WELL', 'DLR', 'PSA', 'EQR'],
-        'Communication Services': ['T', 'VZ', 'CMCSA', 'DIS', 'CHTR', 'TMUS', 'NFLX', 'EA', 'ATVI', 'TTWO']
+        'Communication Services': ['T', 'VZ', 'CMCSA', 'DIS', 'CHTR', 'TMUS', 'NFLX', 'EA', 'WBD', 'TTWO']
     }
 
+# Sector benchmark file, including per-ticker freshness data
+BENCHMARKS_FILE = 'sector_benchmarks.json'
+
+# Representative stock data older than this is refetched on a routine refresh
+BENCHMARK_TICKER_MAX_AGE = timedelta(days=7)
+
 def load_sector_benchmarks():
     """Load sector benchmarks from JSON file"""
-    benchmarks_file = 'sector_benchmarks.json'
+    benchmarks_file = BENCHMARKS_FILE
     
     try:
         if os.path.exists(benchmarks_file):
@@ -277,9 +450,9 @@ def load_sector_benchmarks():
         print(f"Error loading sector benchmarks: {e}")
         return get_fallback_sector_benchmarks_all()
 
-def save_sector_benchmarks(benchmarks_data):
+def save_sector_benchmarks(benchmarks_data, refresh_summary=None):
     """Save sector benchmarks to JSON file"""
-    benchmarks_file = 'sector_benchmarks.json'
+    benchmarks_file = BENCHMARKS_FILE
     
     try:
         # Add metadata
@@ -287,89 +460,219 @@ def save_sector_benchmarks(benchmarks_data):
             'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
             'total_sectors': len([k for k in benchmarks_data.keys() if not k.startswith('_')]),
             'calculation_method': 'yahoo_finance_percentiles',
-            'representative_stocks_per_sector': 10
+            'representative_stocks_per_sector': 10,
+            'last_refresh': refresh_summary or {}
         }
         
-        with open(benchmarks_file, 'w') as f:
+        # Write to a temporary file first so a failed write never leaves a truncated file
+        tmp_file = benchmarks_file + '.tmp'
+        with open(tmp_file, 'w') as f:
             json.dump(benchmarks_data, f, indent=2)
+        os.replace(tmp_file, benchmarks_file)
         
         print(f"Sector benchmarks saved to {benchmarks_file}")
+        try:
+            snapshots.record_benchmarks(benchmarks_data)
+        except Exception as e:
+            print(f"Error recording sector benchmark snapshot: {e}")
         return True
     except Exception as e:
         print(f"Error saving sector benchmarks: {e}")
         return False
 
-def calculate_all_sector_benchmarks():
-    """Calculate benchmarks for all sectors and save to file"""
-    print("Starting calculation of all sector benchmarks...")
+def is_ticker_entry_stale(entry, now=None):
+    """Check whether a representative stock needs refetching (missing, failed or too old)"""
+    if not entry or entry.get('status') == 'failed':
+        return True
+    
+    now = now or datetime.now()
+    try:
+        last_fetched = datetime.strptime(entry['last_fetched'], '%Y-%m-%d %H:%M:%S')
+    except (KeyError, ValueError):
+        return True
+    return now - last_fetched >= BENCHMARK_TICKER_MAX_AGE
+
+def calculate_all_sector_benchmarks(force=False, sectors=None):
+    """Refresh sector benchmarks, refetching only stale or failed representative stocks, and save to file"""
+    print("Starting calculation of sector benchmarks...")
     
     representative_stocks = get_sector_representative_stocks()
-    all_benchmarks = {}
+    ensure_benchmarks_loaded()
+    existing = sector_benchmarks_data or {}
+    ticker_entries = dict(existing.get('_tickers', {}))
+    all_benchmarks = {k: v for k, v in existing.items() if not k.startswith('_')}
+    summary = {'refreshed': [], 'kept_last_good': [], 'fallback': [], 'unchanged': [], 'tickers_fetched': 0}
+    now = datetime.now()
     
     for sector, stocks in representative_stocks.items():
-        print(f"\nCalculating benchmarks for {sector} sector...")
+        previous = existing.get(sector)
+        has_good_values = bool(previous) and '_sector_info' in previous
+        
+        if sectors and sector not in sectors:
+            if not previous:
+                all_benchmarks[sector] = get_fallback_sector_benchmarks(sector)
+            continue
+        
+        stale = [symbol for symbol in stocks if force or is_ticker_entry_stale(ticker_entries.get(symbol), now)]
+        if not stale and has_good_values:
+            summary['unchanged'].append(sector)
+            continue
+        
+        print(f"\nCalculating benchmarks for {sector} sector ({len(stale)} of {len(stocks)} stocks to fetch)...")
+        fetched_ok = 0
         try:
-            sector_benchmarks = calculate_single_sector_benchmarks(sector, stocks)
-            if sector_benchmarks:
-                all_benchmarks[sector] = sector_benchmarks
-                print(f"✅ {sector}: {len(sector_benchmarks)} benchmarks calculated")
+            for i, symbol in enumerate(stale, 1):
+                print(f"    {i}/{len(stale)}: {symbol}", end=" ")
+                entry = fetch_benchmark_ticker_metrics(symbol, max_age=timedelta(0) if force else BENCHMARK_TICKER_MAX_AGE)
+                old_entry = ticker_entries.get(symbol)
+                if entry['status'] == 'failed' and old_entry and old_entry.get('metrics'):
+                    # Keep the last good values; the failed fetch is retried next refresh
+                    entry['metrics'] = old_entry['metrics']
+                ticker_entries[symbol] = entry
+                summary['tickers_fetched'] += 1
+                fetched_ok += entry['status'] != 'failed'
+            
+            if fetched_ok == 0 and has_good_values:
+                # Every fetch failed: nothing new to calculate from
+                sector_benchmarks = None
             else:
-                print(f"❌ {sector}: Failed to calculate benchmarks")
-                all_benchmarks[sector] = get_fallback_sector_benchmarks(sector)
+                sector_benchmarks = calculate_single_sector_benchmarks(sector, stocks, ticker_entries)
         except Exception as e:
             print(f"❌ {sector}: Error - {e}")
+            sector_benchmarks = None
+        
+        if sector_benchmarks:
+            all_benchmarks[sector] = sector_benchmarks
+            summary['refreshed'].append(sector)
+            print(f"✅ {sector}: {len(sector_benchmarks)} benchmarks calculated")
+        elif has_good_values:
+            # New dicts: readers may still hold the published benchmarks
+            all_benchmarks[sector] = {**previous, '_sector_info': {
+                **previous['_sector_info'],
+                'status': 'kept_last_good',
+                'last_failed_refresh': now.strftime('%Y-%m-%d %H:%M:%S')
+            }}
+            summary['kept_last_good'].append(sector)
+            print(f"⚠️ {sector}: Refresh failed, keeping last good benchmarks")
+        else:
             all_benchmarks[sector] = get_fallback_sector_benchmarks(sector)
+            summary['fallback'].append(sector)
+            print(f"❌ {sector}: Failed to calculate benchmarks, using fallback")
+    
+    all_benchmarks['_tickers'] = ticker_entries
     
     # Save to file
-    if save_sector_benchmarks(all_benchmarks):
-        print(f"\n🎉 All sector benchmarks calculated and saved!")
+    if save_sector_benchmarks(all_benchmarks, summary):
+        print(f"\n🎉 Sector benchmarks saved ({len(summary['refreshed'])} refreshed, "
+              f"{summary['tickers_fetched']} stocks fetched)")
         return all_benchmarks
     else:
         print(f"\n❌ Failed to save benchmarks to file")
         return None
 
-def calculate_single_sector_benchmarks(sector, stocks):
-    """Calculate simplified benchmarks (median only) for a single sector"""
-    metrics_data = []
+# Percentiles stored for every benchmark metric (0th, 5th, ..., 100th)
+BENCHMARK_PERCENTILES = list(range(0, 101, 5))
+
+def calculate_metric_distribution(metric, values):
+    """Median and percentile grid entries for one benchmark metric"""
+    grid = np.percentile(np.asarray(values, dtype=float), BENCHMARK_PERCENTILES)
+    return {
+        f'{metric}_median': round(float(np.median(values)), 3),
+        f'{metric}_percentiles': [round(float(v), 4) for v in grid]
+    }
+
+def benchmark_entry_from_info(symbol, info, fetched_at=None):
+    """Build a representative stock entry (benchmark metrics, status, fetch time) from ticker info"""
+    # Extract key metrics
+    stock_metrics = {
+        'symbol': symbol,
+        'pe_ratio': info.get('trailingPE'),
+        'price_to_book': info.get('priceToBook'),
+        'price_to_sales': info.get('priceToSalesTrailing12Months'),
+        'return_on_equity': info.get('returnOnEquity'),
+        'profit_margin': info.get('profitMargins')
+    }
     
-    print(f"  Fetching data for {len(stocks)} stocks...")
+    entry = {
+        'metrics': None,
+        'status': 'insufficient',
+        'sector': info.get('sector'),
+        'industry': info.get('industry'),
+        'last_fetched': (fetched_at or datetime.now()).strftime('%Y-%m-%d %H:%M:%S')
+    }
     
-    # Fetch data for representative stocks
-    for i, symbol in enumerate(stocks, 1):
-        try:
-            print(f"    {i}/{len(stocks)}: {symbol}", end=" ")
-            ticker = yf.Ticker(symbol)
-            info = ticker.info
-            
-            # Extract key metrics
-            stock_metrics = {
-                'symbol': symbol,
-                'pe_ratio': info.get('trailingPE'),
-                'price_to_book': info.get('priceToBook'),
-                'price_to_sales': info.get('priceToSalesTrailing12Months'),
-                'return_on_equity': info.get('returnOnEquity'),
-                'profit_margin': info.get('profitMargins')
-            }
+    # Only include stocks with valid core data
+    if (stock_metrics['pe_ratio'] and stock_metrics['pe_ratio'] > 0 and
+        stock_metrics['return_on_equity'] and stock_metrics['return_on_equity'] > 0):
+        entry['metrics'] = stock_metrics
+        entry['status'] = 'ok'
+    
+    return entry
+
+def fetch_benchmark_ticker_metrics(symbol, max_age=BENCHMARK_TICKER_MAX_AGE):
+    """Fetch benchmark metrics for one representative stock, with fetch status and time
+
+    Info already fetched for the stock view (or an earlier refresh) within max_age is reused.
+    """
+    try:
+        info = get_ticker_info(symbol, max_age=max_age)
+        fetched_at = info_cache[symbol]['fetched_at'] if symbol in info_cache else None
+        entry = benchmark_entry_from_info(symbol, info, fetched_at)
+        print("✅" if entry['status'] == 'ok' else "❌ (insufficient data)")
+        return entry
             
-            # Only include stocks with valid core data
-            if (stock_metrics['pe_ratio'] and stock_metrics['pe_ratio'] > 0 and
-                stock_metrics['return_on_equity'] and stock_metrics['return_on_equity'] > 0):
-                metrics_data.append(stock_metrics)
-                print("✅")
-            else:
-                print("❌ (insufficient data)")
-                
-        except Exception as e:
-            print(f"❌ (error: {str(e)[:30]})")
-            continue
+    except Exception as e:
+        print(f"❌ (error: {str(e)[:30]})")
+        return {
+            'metrics': None,
+            'status': 'failed',
+            'last_fetched': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'error': str(e)[:100]
+        }
+
+def record_benchmark_ticker_info(symbol, info):
+    """Feed info fetched for the stock view into the benchmark data of a representative stock"""
+    if not info:
+        return
+    ensure_benchmarks_loaded()
+    if not sector_benchmarks_data:
+        return
+    
+    if not any(symbol in stocks for stocks in get_sector_representative_stocks().values()):
+        return
+    
+    entry = benchmark_entry_from_info(symbol, info)
+    if entry['status'] == 'ok':
+        # Swapped in whole, so a refresh or save iterating the old dict is not disturbed
+        sector_benchmarks_data['_tickers'] = {**sector_benchmarks_data.get('_tickers', {}), symbol: entry}
+
+def calculate_single_sector_benchmarks(sector, stocks, ticker_entries=None):
+    """Calculate benchmarks (median and percentile distribution) for a single sector
+
+    ticker_entries holds already fetched representative stock data; missing stocks are fetched.
+    """
+    if ticker_entries is None:
+        ticker_entries = {}
+    
+    missing = [symbol for symbol in stocks if symbol not in ticker_entries]
+    if missing:
+        print(f"  Fetching data for {len(missing)} stocks...")
+    
+    # Fetch data for representative stocks not fetched yet
+    for i, symbol in enumerate(missing, 1):
+        print(f"    {i}/{len(missing)}: {symbol}", end=" ")
+        ticker_entries[symbol] = fetch_benchmark_ticker_metrics(symbol)
+    
+    metrics_data = [ticker_entries[symbol]['metrics'] for symbol in stocks
+                    if ticker_entries[symbol].get('metrics')]
     
     if len(metrics_data) < 3:
-        print(f"  ❌ Insufficient valid data ({len(metrics_data)} stocks), using fallback")
+        print(f"  ❌ Insufficient valid data ({len(metrics_data)} stocks)")
         return None
     
     print(f"  📊 Calculating medians from {len(metrics_data)} valid stocks...")
     
-    # Calculate ONLY medians for each metric (simplified!)
+    # Calculate the median and the percentile distribution for each metric
     benchmarks = {}
     metrics_to_calculate = ['pe_ratio', 'price_to_book', 'price_to_sales', 'return_on_equity', 'profit_margin']
     
@@ -378,25 +681,165 @@ def calculate_single_sector_benchmarks(sector, stocks):
                  if stock[metric] is not None and stock[metric] > 0]
         
         if len(values) >= 3:
-            values.sort()
-            n = len(values)
-            
-            # Calculate ONLY the median (50th percentile)
-            median_idx = int(0.50 * n) - 1
-            median_value = values[median_idx]
-            
-            # Store only the median value (simplified!)
-            benchmarks[f'{metric}_median'] = round(median_value, 3)
+            benchmarks.update(calculate_metric_distribution(metric, values))
     
     # Add metadata
     benchmarks['_sector_info'] = {
         'total_stocks_analyzed': len(metrics_data),
         'representative_stocks': [stock['symbol'] for stock in metrics_data],
-        'calculation_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        'calculation_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'status': 'fresh'
     }
     
     return benchmarks
 
+# Industry benchmarks over the peer universe in universe.csv
+INDUSTRY_BENCHMARKS_FILE = 'industry_benchmarks.json'
+
+# Industries need at least this many valid peers to be used for comparison
+MIN_INDUSTRY_PEERS = 5
+
+# Default wall-clock limit and parallelism for an industry refresh
+INDUSTRY_REFRESH_TIME_BUDGET = 300
+INDUSTRY_FETCH_WORKERS = 8
+
+def load_industry_benchmarks():
+    """Load industry benchmarks from JSON file (empty if not calculated yet)"""
+    try:
+        if os.path.exists(INDUSTRY_BENCHMARKS_FILE):
+            with open(INDUSTRY_BENCHMARKS_FILE, 'r') as f:
+                data = json.load(f)
+                print(f"Loaded industry benchmarks from {INDUSTRY_BENCHMARKS_FILE}")
+                return data
+    except Exception as e:
+        print(f"Error loading industry benchmarks: {e}")
+    return {'industries': {}, '_tickers': {}, '_metadata': {}}
+
+def save_industry_benchmarks(benchmarks_data):
+    """Save industry benchmarks to JSON file"""
+    try:
+        tmp_file = INDUSTRY_BENCHMARKS_FILE + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(benchmarks_data, f, indent=2)
+        os.replace(tmp_file, INDUSTRY_BENCHMARKS_FILE)
+        print(f"Industry benchmarks saved to {INDUSTRY_BENCHMARKS_FILE}")
+        return True
+    except Exception as e:
+        print(f"Error saving industry benchmarks: {e}")
+        return False
+
+def get_benchmark_peer_universe():
+    """Peer universe rows (symbol, sector, industry): universe.csv, else the sector representatives"""
+    rows = load_universe(UNIVERSE_FILE)
+    if rows:
+        return rows
+    
+    return [{'symbol': symbol, 'sector': sector}
+            for sector, stocks in get_sector_representative_stocks().items()
+            for symbol in stocks]
+
+def calculate_industry_benchmarks(force=False, time_budget=INDUSTRY_REFRESH_TIME_BUDGET,
+                                  max_workers=INDUSTRY_FETCH_WORKERS):
+    """Refresh industry benchmarks over the peer universe within a time budget and save to file
+
+    Stale peers are fetched in parallel; peers not reached before the deadline keep their
+    previous data and are picked up by the next refresh.
+    """
+    print("Starting calculation of industry benchmarks...")
+    start_time = time.monotonic()
+    deadline = start_time + time_budget
+    
+    ensure_benchmarks_loaded()
+    existing = industry_benchmarks_data or {}
+    ticker_entries = dict(existing.get('_tickers', {}))
+    universe_rows = get_benchmark_peer_universe()
+    now = datetime.now()
+    max_age = timedelta(0) if force else BENCHMARK_TICKER_MAX_AGE
+    
+    stale = [row['symbol'] for row in universe_rows
+             if force or is_ticker_entry_stale(ticker_entries.get(row['symbol']), now)]
+    print(f"  {len(stale)} of {len(universe_rows)} peers to fetch ({max_workers} workers, {time_budget}s budget)")
+    
+    def fetch_peer(symbol):
+        if time.monotonic() > deadline:
+            return symbol, None
+        try:
+            info = get_ticker_info(symbol, max_age=max_age)
+            fetched_at = info_cache[symbol]['fetched_at'] if symbol in info_cache else None
+            return symbol, benchmark_entry_from_info(symbol, info, fetched_at)
+        except Exception as e:
+            return symbol, {'metrics': None, 'status': 'failed', 'error': str(e)[:100],
+                            'last_fetched': datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+    
+    fetched = failed = skipped = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for symbol, entry in executor.map(fetch_peer, stale):
+            if entry is None:
+                skipped += 1
+                continue
+            old_entry = ticker_entries.get(symbol)
+            if entry['status'] == 'failed':
+                failed += 1
+                if old_entry and old_entry.get('metrics'):
+                    # Keep the last good values; the failed fetch is retried next refresh
+                    entry['metrics'] = old_entry['metrics']
+                    entry['sector'] = old_entry.get('sector')
+                    entry['industry'] = old_entry.get('industry')
+            ticker_entries[symbol] = entry
+            fetched += 1
+    
+    # Group peers by industry (universe file first, fetched info otherwise)
+    peers_by_industry = {}
+    for row in universe_rows:
+        entry = ticker_entries.get(row['symbol'], {})
+        industry = row.get('industry') or entry.get('industry')
+        if industry and entry.get('metrics'):
+            peers_by_industry.setdefault(industry, []).append((row, entry))
+    
+    industries = {}
+    metrics_to_calculate = ['pe_ratio', 'price_to_book', 'price_to_sales', 'return_on_equity', 'profit_margin']
+    for industry, peers in peers_by_industry.items():
+        if len(peers) < MIN_INDUSTRY_PEERS:
+            continue
+        
+        benchmarks = {}
+        for metric in metrics_to_calculate:
+            values = [entry['metrics'][metric] for row, entry in peers
+                      if entry['metrics'].get(metric) is not None and entry['metrics'][metric] > 0]
+            if len(values) >= MIN_INDUSTRY_PEERS:
+                benchmarks.update(calculate_metric_distribution(metric, values))
+        
+        sectors = [row.get('sector') or entry.get('sector') for row, entry in peers]
+        benchmarks['_industry_info'] = {
+            'sector': max(set(sectors), key=sectors.count) if any(sectors) else None,
+            'total_stocks_analyzed': len(peers),
+            'peer_stocks': sorted(row['symbol'] for row, entry in peers),
+            'calculation_date': now.strftime('%Y-%m-%d %H:%M:%S')
+        }
+        industries[industry] = benchmarks
+    
+    elapsed = round(time.monotonic() - start_time, 1)
+    benchmarks_data = {
+        'industries': industries,
+        '_tickers': ticker_entries,
+        '_metadata': {
+            'last_updated': now.strftime('%Y-%m-%d %H:%M:%S'),
+            'total_industries': len(industries),
+            'universe_size': len(universe_rows),
+            'peers_fetched': fetched,
+            'peers_failed': failed,
+            'peers_deferred': skipped,
+            'elapsed_seconds': elapsed,
+            'min_peers': MIN_INDUSTRY_PEERS
+        }
+    }
+    
+    if save_industry_benchmarks(benchmarks_data):
+        print(f"🎉 {len(industries)} industry benchmarks saved ({fetched} fetched, "
+              f"{skipped} deferred, {elapsed}s)")
+        return benchmarks_data
+    return None
+
 def get_fallback_sector_benchmarks_all():
     """Get fallback benchmarks for all sectors"""
     return {
@@ -463,26 +906,114 @@ def get_fallback_sector_benchmarks(sector):
     return fallback_benchmarks.get(sector, default_benchmarks)
 
 # Load sector benchmarks on startup
-sector_benchmarks_data = load_sector_benchmarks()
+# Benchmarks are loaded on first use (or in the background by create_app), not at import
+sector_benchmarks_data = None
+industry_benchmarks_data = None
+_benchmarks_lock = threading.Lock()
+
+def ensure_benchmarks_loaded():
+    """Load sector and industry benchmarks from disk if not loaded yet"""
+    global sector_benchmarks_data, industry_benchmarks_data
+    if sector_benchmarks_data is not None and industry_benchmarks_data is not None:
+        return
+    with _benchmarks_lock:
+        if sector_benchmarks_data is None:
+            sector_benchmarks_data = load_sector_benchmarks()
+        if industry_benchmarks_data is None:
+            industry_benchmarks_data = load_industry_benchmarks()
+
+def reload_benchmarks():
+    """Re-read the sector and industry benchmark files (e.g. after they were replaced on disk)"""
+    global sector_benchmarks_data, industry_benchmarks_data
+    with _benchmarks_lock:
+        sector_benchmarks_data = load_sector_benchmarks()
+        industry_benchmarks_data = load_industry_benchmarks()
 
 def get_sector_benchmarks(sector):
     """Get sector-specific benchmark values from loaded data"""
-    global sector_benchmarks_data
-    
+    ensure_benchmarks_loaded()
     if sector in sector_benchmarks_data:
         return sector_benchmarks_data[sector]
     else:
         print(f"Sector '{sector}' not found in benchmarks, using fallback")
         return get_fallback_sector_benchmarks(sector)
 
+def get_industry_benchmarks(industry):
+    """Get industry benchmark values (None if the industry has no benchmarks)"""
+    ensure_benchmarks_loaded()
+    if not industry or not industry_benchmarks_data:
+        return None
+    return industry_benchmarks_data.get('industries', {}).get(industry)
+
+# Legacy short names accepted by the scoring functions
+METRIC_ALIASES = {'pb': 'price_to_book', 'ps': 'price_to_sales', 'roe': 'return_on_equity'}
+
+# Sorted percentile arrays per (level, sector or industry, metric), rebuilt when benchmark data is replaced
+_percentile_index = {'source': None, 'arrays': {}}
+
+def get_percentile_index():
+    """Get the {(level, name, metric): sorted percentile array} lookup for the loaded benchmarks"""
+    ensure_benchmarks_loaded()
+    source = (id(sector_benchmarks_data), id(industry_benchmarks_data))
+    if _percentile_index['source'] != source:
+        groups = [('sector', name, benchmarks) for name, benchmarks in sector_benchmarks_data.items()]
+        groups += [('industry', name, benchmarks)
+                   for name, benchmarks in (industry_benchmarks_data or {}).get('industries', {}).items()]
+        
+        arrays = {}
+        for level, name, benchmarks in groups:
+            if name.startswith('_') or not isinstance(benchmarks, dict):
+                continue
+            for key, values in benchmarks.items():
+                if key.endswith('_percentiles') and values:
+                    metric = key[:-len('_percentiles')]
+                    arrays[(level, name, metric)] = np.maximum.accumulate(np.asarray(values, dtype=float))
+        _percentile_index['arrays'] = arrays
+        _percentile_index['source'] = source
+    return _percentile_index['arrays']
+
+def percentile_rank_in_sector(values, metric_type, sector, level='sector'):
+    """Percentile rank (0-100) of values within a sector (or industry) distribution (None if not stored)"""
+    metric = METRIC_ALIASES.get(metric_type, metric_type)
+    grid = get_percentile_index().get((level, sector, metric))
+    if grid is None:
+        return None
+
+    values = np.asarray(values, dtype=float)
+    percentiles = np.asarray(BENCHMARK_PERCENTILES, dtype=float)
+
+    # Locate each value's bin in the grid, then interpolate between the bin edges
+    upper = np.clip(np.searchsorted(grid, values, side='right'), 1, len(grid) - 1)
+    lower = upper - 1
+    span = grid[upper] - grid[lower]
+    fraction = np.where(span > 0, (values - grid[lower]) / np.where(span > 0, span, 1), 1.0)
+    ranks = percentiles[lower] + np.clip(fraction, 0, 1) * (percentiles[upper] - percentiles[lower])
+    return np.clip(ranks, 0, 100)
+
+# Score bands over the percentile rank (flipped when lower is better), mirroring the
+# median-multiple scoring below: at or above the median scores 7, the top decile 10
+PERCENTILE_SCORE_THRESHOLDS = [10, 25, 40, 50, 60, 75, 90]
+PERCENTILE_SCORES = np.array([1, 2, 4, 6, 7, 8, 9, 10])
+
+def score_from_percentile_rank(ranks, higher_is_better=True):
+    """Map percentile ranks (0-100) to 1-10 scores"""
+    ranks = np.asarray(ranks, dtype=float)
+    if not higher_is_better:
+        ranks = 100 - ranks
+    return PERCENTILE_SCORES[np.searchsorted(PERCENTILE_SCORE_THRESHOLDS, ranks, side='right')]
+
 def score_metric_relative_to_sector(value, metric_type, sector, higher_is_better=True):
-    """Simplified scoring: compare to sector median with magnitude consideration"""
+    """Score a metric by its percentile rank in the sector distribution (median multiples as fallback)"""
     if value is None or value <= 0:
         return 0
     
+    ranks = percentile_rank_in_sector([value], metric_type, sector)
+    if ranks is not None:
+        return int(score_from_percentile_rank(ranks, higher_is_better)[0])
+    
     benchmarks = get_sector_benchmarks(sector)
     
-    # Get median value for this metric type
+    # No stored distribution (fallback benchmarks): compare to the median
     median_key = f"{metric_type}_median"
     
     # Handle legacy naming for some metrics
@@ -577,12 +1108,22 @@ def calculate_fundamental_analysis(metrics):
     
     # Get company sector for comparison
     sector = metrics.get('sector', 'Technology')  # Default to Technology if no sector
-    sector_benchmarks = get_sector_benchmarks(sector)
-    print(f"Analyzing {sector} sector comparison")
+    industry = metrics.get('industry')
+    
+    # Compare against industry peers when the industry has benchmarks, otherwise the sector
+    sector_benchmarks = get_industry_benchmarks(industry)
+    if sector_benchmarks:
+        benchmark_level, benchmark_name = 'industry', industry
+    else:
+        sector_benchmarks = get_sector_benchmarks(sector)
+        benchmark_level, benchmark_name = 'sector', sector
+    print(f"Analyzing {benchmark_name} {benchmark_level} comparison")
     
     # Part 1: Sector Comparison - Company vs Peers
     sector_comparison = {
         'sector_name': sector,
+        'benchmark_level': benchmark_level,
+        'benchmark_name': benchmark_name,
         'metrics': {}
     }
     
@@ -646,6 +1187,12 @@ def calculate_fundamental_analysis(metrics):
             'better_than_sector': company_margin > sector_margin_median
         }
     
+    # Where the peer distribution is stored, add the company's percentile rank within it
+    for metric_name, metric_data in sector_comparison['metrics'].items():
+        ranks = percentile_rank_in_sector([metrics.get(metric_name)], metric_name, benchmark_name, benchmark_level)
+        if ranks is not None:
+            metric_data['sector_percentile'] = round(float(ranks[0]), 1)
+    
     # Part 2: Growth Analysis - Company's Own Growth Metrics
     growth_analysis = {
         'metrics': {}
@@ -870,7 +1417,8 @@ def get_technical_recommendation(stock_data):
 
 def create_technical_chart(stock, stock_data):
     """Create technical analysis chart"""
-    fig, axs = plt.subplots(3, 1, figsize=(12, 10), facecolor='white')
+    fig = new_figure(figsize=(12, 10), facecolor='white')
+    axs = fig.subplots(3, 1)
     
     # Plot 1: Price and Moving Average
     axs[0].plot(stock_data.index, stock_data['Close'], label='Close Price', color='blue', alpha=0.7)
@@ -900,51 +1448,66 @@ def create_technical_chart(stock, stock_data):
     axs[2].legend()
     axs[2].grid(True, alpha=0.3)
     
-    plt.tight_layout()
+    fig.tight_layout()
     
     # Convert plot to base64 string
     img_buffer = io.BytesIO()
-    plt.savefig(img_buffer, format='png', dpi=100, bbox_inches='tight')
+    fig.savefig(img_buffer, format='png', dpi=100, bbox_inches='tight')
     img_buffer.seek(0)
     img_str = base64.b64encode(img_buffer.getvalue()).decode()
-    plt.close()
     
     return img_str
 
 def get_company_name(symbol):
-    """Get company name from Yahoo Finance"""
+    """Get company name from the symbol master, or Yahoo Finance for symbols it does not name"""
+    listed = symbol_master.lookup(symbol)
+    if listed and listed.get('name'):
+        return listed['name']
     try:
-        ticker = yf.Ticker(symbol)
-        info = ticker.info
+        info = get_ticker_info(symbol)
         return info.get('longName', info.get('shortName', symbol))
     except:
         return symbol
 
-@app.route('/')
+@bp.route('/')
 def index():
     """Main page"""
     # No longer fetch all stock data at startup - load on demand instead
     # Get current portfolio and sort alphabetically by symbol
-    portfolio = load_portfolio()
+    portfolio_name = request.args.get('portfolio', DEFAULT_PORTFOLIO)
+    portfolio = load_portfolio(portfolio_name)
     portfolio_sorted = sorted(portfolio, key=lambda x: x['symbol'])
-    return render_template('index.html', stocks=portfolio_sorted)
+    return render_template('index.html', stocks=portfolio_sorted, portfolio_name=portfolio_name,
+                           portfolios=portfolios.list_portfolios())
 
-@app.route('/api/stock/<symbol>')
+@bp.route('/api/stock/<symbol>')
 def get_stock_data(symbol):
     """API endpoint to get stock data"""
-    portfolio_stocks = get_portfolio_stocks()
-    if symbol not in portfolio_stocks:
+    if not is_portfolio_symbol(symbol):
         return jsonify({'error': 'Stock not found in portfolio'}), 404
     
+    # A batch report run after the close answers until the stock is fetched here again
+    body = precomputed_body('stock', symbol, newer_than=report_freshness_cutoff(symbol))
+    if body is not None:
+        return Response(body, mimetype='application/json')
+    
     # Fetch data for this specific stock on demand
     fetch_single_stock_data(symbol)
     
+    # The payload only changes when the stock is refreshed or benchmarks are replaced
+    ensure_benchmarks_loaded()
+    cache_key = ('stock', symbol, last_update.get(symbol),
+                 id(sector_benchmarks_data), id(industry_benchmarks_data))
+    return memoized_json_response(cache_key, lambda: build_stock_payload(symbol))
+
+def build_stock_payload(symbol):
+    """Stock view payload: fundamentals, analysis and recommendations for a cached symbol"""
     # Get fundamental data
     fundamental_metrics = fundamental_cache.get(symbol, {})
     fundamental_analysis = calculate_fundamental_analysis(fundamental_metrics)
     
     # Get technical data
-    stock_data = data_cache.get(symbol, pd.DataFrame())
+    stock_data = get_cached_frame(symbol)
     technical_recommendation = get_technical_recommendation(stock_data)
     
     # Simple overall recommendation based on growth and sector comparison
@@ -970,133 +1533,716 @@ def get_stock_data(symbol):
     # Get last update time for this specific stock
     stock_last_update = last_update.get(symbol)
     
-    return jsonify({
+    return {
         'symbol': symbol,
         'fundamental_metrics': formatted_metrics,
         'fundamental_analysis': fundamental_analysis,
         'technical_recommendation': technical_recommendation,
         'overall_recommendation': overall_recommendation,
         'last_updated': stock_last_update.strftime('%Y-%m-%d %H:%M:%S') if stock_last_update else 'N/A'
-    })
+    }
 
-@app.route('/api/chart/<symbol>')
+@bp.route('/api/chart/<symbol>')
 def get_chart(symbol):
     """API endpoint to get technical analysis chart"""
-    portfolio_stocks = get_portfolio_stocks()
-    if symbol not in portfolio_stocks:
+    if not is_portfolio_symbol(symbol):
         return jsonify({'error': 'Stock not found in portfolio'}), 404
     
+    body = precomputed_body('chart', symbol, newer_than=report_freshness_cutoff(symbol))
+    if body is not None:
+        return Response(body, mimetype='application/json')
+    
     # Ensure we have data for this stock
     fetch_single_stock_data(symbol)
-    stock_data = data_cache.get(symbol, pd.DataFrame())
+    stock_data = get_cached_frame(symbol)
     
     if stock_data.empty:
         return jsonify({'error': 'No data available'}), 404
     
-    chart_img = create_technical_chart(symbol, stock_data)
+    # Charts are drawn once per data refresh
+    cache_key = ('chart', symbol, last_update.get(symbol))
+    return memoized_json_response(cache_key, lambda: {'chart': create_technical_chart(symbol, stock_data)})
+
+@bp.route('/api/stream')
+def stream_updates():
+    """Server-sent events with live updates for ?symbols= (default: every symbol)"""
+    symbols = [s.strip().upper() for s in request.args.get('symbols', '').split(',') if s.strip()]
+    
+    client_queue = live_updates.subscribe(symbols or None)
+    if client_queue is None:
+        # Each stream holds a server thread; the rest are kept for API requests
+        return jsonify({'error': 'Too many live update streams on this server, poll /api/stock/<symbol> instead',
+                        'retry_after': live_updates.STREAM_RETRY_AFTER}), 503, \
+            {'Retry-After': str(live_updates.STREAM_RETRY_AFTER)}
+    live_updates.start_refresher(refresh_live_symbols)
+    
+    # Start each client from the current state of its symbols
+    initial_events = []
+    for symbol in symbols:
+        snapshot = live_snapshot(symbol)
+        if snapshot is not None:
+            initial_events.append(('snapshot', {'symbol': symbol, 'changes': snapshot}))
+    
+    return Response(live_updates.event_stream(client_queue, initial_events),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@bp.route('/api/intraday/<symbol>')
+def get_intraday_data(symbol):
+    """Latest intraday indicators and signals for a portfolio stock (?interval=1m|5m|...)"""
+    if not is_portfolio_symbol(symbol):
+        return jsonify({'error': 'Stock not found in portfolio'}), 404
+    
+    interval = request.args.get('interval', '5m')
+    if interval not in INTRADAY_INTERVALS:
+        return jsonify({'error': f"interval must be one of {', '.join(INTRADAY_INTERVALS)}"}), 400
+    
+    try:
+        state, bars_added = update_intraday_state(symbol, interval)
+    except Exception as e:
+        return jsonify({'error': f'Failed to fetch intraday data: {str(e)}'}), 500
+    
+    if not state.bars:
+        return jsonify({'error': 'No intraday data available'}), 404
     
-    return jsonify({'chart': chart_img})
+    latest = state.latest
+    return jsonify({
+        'symbol': symbol,
+        'interval': interval,
+        'bars': state.bars,
+        'bars_added': bars_added,
+        'ready': state.ready,
+        'as_of': str(state.last_timestamp),
+        'last_close': round(latest['Close'], 2),
+        'indicators': {name: round(latest[name], 4) for name in
+                       ('30_Moving_Avg', 'Smoothed_%D', 'MACD', 'Signal_Line', 'Smoothed_MACD', 'Smoothed_Signal_Line')},
+        'signals': {'buy': bool(latest['Buy_Signal']) and state.ready,
+                    'sell': bool(latest['Sell_Signal']) and state.ready},
+        'technical_recommendation': state.recommendation()
+    })
+
+@bp.route('/api/alerts', methods=['GET'])
+def get_fired_alerts():
+    """Fired alerts, newest first (?symbol=, ?since=YYYY-MM-DD HH:MM:SS, ?limit=)"""
+    symbol = request.args.get('symbol', '').strip().upper() or None
+    since = request.args.get('since') or None
+    try:
+        limit = int(request.args.get('limit', 100))
+    except ValueError:
+        return jsonify({'error': 'limit must be a number'}), 400
+    return jsonify({'alerts': alerts.recent_alerts(symbol=symbol, since=since, limit=limit)})
 
-@app.route('/api/portfolio', methods=['GET'])
+@bp.route('/api/alerts/rules', methods=['GET'])
+def get_alert_rules():
+    """Alert rules, optionally for one ?symbol="""
+    symbol = request.args.get('symbol', '').strip().upper() or None
+    return jsonify({'rules': alerts.list_rules(symbol), 'types': list(alerts.RULE_FIELDS)})
+
+@bp.route('/api/alerts/rules/add', methods=['POST'])
+def add_alert_rule():
+    """Add a rule, e.g. {"symbol": "AAPL", "type": "price_cross_ma", "params": {"direction": "above"}}"""
+    data = request.get_json() or {}
+    try:
+        rule = alerts.add_rule(data.get('symbol'), data.get('type'), data.get('params'))
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    except OSError as e:
+        print(f"Error saving alert rules: {e}")
+        return jsonify({'error': 'Failed to save alert rules'}), 500
+    
+    # Record the symbol's current state as the baseline the rule fires against
+    if rule['symbol'] in data_cache:
+        alerts.evaluate(rule['symbol'], symbol_state(rule['symbol']))
+    alerts.start_refresher(refresh_alert_symbols)
+    
+    return jsonify({'message': f"Added {rule['type']} alert for {rule['symbol']}", 'rule': rule})
+
+@bp.route('/api/alerts/rules/remove', methods=['POST'])
+def remove_alert_rule():
+    """Remove a rule by {"id": ...}"""
+    data = request.get_json() or {}
+    rule_id = data.get('id', '')
+    if not rule_id:
+        return jsonify({'error': 'Rule id is required'}), 400
+    try:
+        removed = alerts.remove_rule(rule_id)
+    except OSError as e:
+        print(f"Error saving alert rules: {e}")
+        return jsonify({'error': 'Failed to save alert rules'}), 500
+    if not removed:
+        return jsonify({'error': 'Alert rule not found'}), 404
+    return jsonify({'message': f'Removed alert rule {rule_id}'})
+
+@bp.route('/api/portfolios', methods=['GET'])
+def get_portfolios():
+    """Named portfolios and how many distinct symbols they share"""
+    referenced = portfolios.referenced_symbols()
+    return jsonify({
+        'portfolios': portfolios.list_portfolios(),
+        'default': DEFAULT_PORTFOLIO,
+        'distinct_symbols': len(referenced),
+        'shared_symbols': sum(1 for count in referenced.values() if count > 1),
+        'cached_symbols': sum(1 for symbol in referenced if symbol in data_cache)
+    })
+
+@bp.route('/api/portfolios/create', methods=['POST'])
+def create_portfolio():
+    """Create a named portfolio: {"name": "growth", "owner": "alice"}"""
+    data = request.get_json() or {}
+    name = data.get('name', '').strip()
+    if not name:
+        return jsonify({'error': 'Portfolio name is required'}), 400
+    
+    if not portfolios.create_portfolio(name, owner=data.get('owner')):
+        return jsonify({'error': f"Portfolio '{name}' already exists"}), 400
+    return jsonify({'message': f"Created portfolio '{name}'"})
+
+@bp.route('/api/portfolios/delete', methods=['POST'])
+def delete_portfolio():
+    """Delete a named portfolio and release the cache entries only it referenced"""
+    data = request.get_json() or {}
+    name = data.get('name', '').strip()
+    if not name:
+        return jsonify({'error': 'Portfolio name is required'}), 400
+    if name == DEFAULT_PORTFOLIO:
+        return jsonify({'error': 'The default portfolio cannot be deleted'}), 400
+    
+    symbols = portfolios.delete_portfolio(name)
+    if symbols is None:
+        return jsonify({'error': f"Portfolio '{name}' not found"}), 404
+    released = release_symbols(symbols)
+    return jsonify({'message': f"Deleted portfolio '{name}'", 'released_symbols': released})
+
+@bp.route('/api/portfolio', methods=['GET'])
 def get_portfolio():
-    """Get current portfolio sorted alphabetically"""
-    portfolio = load_portfolio()
-    portfolio_sorted = sorted(portfolio, key=lambda x: x['symbol'])
-    return jsonify({'portfolio': portfolio_sorted})
+    """Get a portfolio (?portfolio=name, default portfolio otherwise) sorted alphabetically"""
+    name = request.args.get('portfolio', DEFAULT_PORTFOLIO)
+    if not portfolios.portfolio_exists(name):
+        return jsonify({'error': f"Portfolio '{name}' not found"}), 404
+    return jsonify({'portfolio': load_portfolio(name), 'name': name})
 
-@app.route('/api/portfolio/add', methods=['POST'])
+@bp.route('/api/portfolio/add', methods=['POST'])
 def add_to_portfolio():
-    """Add stock to portfolio"""
+    """Add stock to a portfolio ({"symbol": ..., "portfolio": ...}, default portfolio otherwise)"""
     data = request.get_json()
     symbol = data.get('symbol', '').upper().strip()
+    name = data.get('portfolio') or DEFAULT_PORTFOLIO
     
     if not symbol:
         return jsonify({'error': 'Symbol is required'}), 400
+    if not portfolios.portfolio_exists(name):
+        return jsonify({'error': f"Portfolio '{name}' not found"}), 404
+    
+    # Validate against the local symbol master first; Yahoo Finance only for symbols it cannot settle
+    # (unlisted symbols that are not plain US tickers, e.g. ^GSPC, VOD.L or BTC-USD)
+    listed = symbol_master.lookup(symbol)
+    if listed is None and symbol_master.can_reject(symbol):
+        suggestions = [row['symbol'] for row in symbol_master.search(symbol, limit=5)]
+        return jsonify({'error': 'Invalid stock symbol', 'suggestions': suggestions}), 400
+    
+    if listed and listed.get('name'):
+        company_name = listed['name']
+    else:
+        try:
+            info = get_ticker_info(symbol)
+            if not info or 'symbol' not in info:
+                return jsonify({'error': 'Invalid stock symbol'}), 400
+            
+            company_name = info.get('longName', info.get('shortName', symbol))
+        except:
+            return jsonify({'error': 'Unable to fetch stock data'}), 400
     
-    # Validate stock exists
+    # Cached data is shared: a symbol another portfolio already holds is not fetched again
     try:
-        ticker = yf.Ticker(symbol)
-        info = ticker.info
-        if not info or 'symbol' not in info:
-            return jsonify({'error': 'Invalid stock symbol'}), 400
-        
-        company_name = info.get('longName', info.get('shortName', symbol))
-    except:
-        return jsonify({'error': 'Unable to fetch stock data'}), 400
-    
-    # Load current portfolio
-    portfolio = load_portfolio()
-    
-    # Check if stock already exists
-    for stock in portfolio:
-        if stock['symbol'] == symbol:
-            return jsonify({'error': 'Stock already in portfolio'}), 400
-    
-    # Add new stock
-    new_stock = {
-        'symbol': symbol,
-        'name': company_name,
-        'date_added': datetime.now().strftime('%Y-%m-%d')
-    }
-    portfolio.append(new_stock)
-    
-    # Save portfolio
-    if save_portfolio(portfolio):
-        # Clear cache for the specific stock only (if it exists)
-        global data_cache, fundamental_cache, last_update
-        if symbol in data_cache:
-            del data_cache[symbol]
-        if symbol in fundamental_cache:
-            del fundamental_cache[symbol]
-        if symbol in last_update:
-            del last_update[symbol]
-        
-        return jsonify({'message': f'Successfully added {symbol} to portfolio', 'stock': new_stock})
-    else:
+        new_stock = portfolios.add_holding(name, symbol, company_name)
+    except Exception as e:
+        print(f"Error saving portfolio '{name}': {e}")
         return jsonify({'error': 'Failed to save portfolio'}), 500
+    if new_stock is None:
+        return jsonify({'error': 'Stock already in portfolio'}), 400
+    
+    return jsonify({'message': f'Successfully added {symbol} to portfolio', 'stock': new_stock})
 
-@app.route('/api/portfolio/remove', methods=['POST'])
+@bp.route('/api/portfolio/remove', methods=['POST'])
 def remove_from_portfolio():
-    """Remove stock from portfolio"""
+    """Remove stock from a portfolio ({"symbol": ..., "portfolio": ...}, default portfolio otherwise)"""
     data = request.get_json()
     symbol = data.get('symbol', '').upper().strip()
+    name = data.get('portfolio') or DEFAULT_PORTFOLIO
     
     if not symbol:
         return jsonify({'error': 'Symbol is required'}), 400
     
-    # Load current portfolio
-    portfolio = load_portfolio()
-    
-    # Find and remove stock
-    original_length = len(portfolio)
-    portfolio = [stock for stock in portfolio if stock['symbol'] != symbol]
-    
-    if len(portfolio) == original_length:
+    try:
+        removed = portfolios.remove_holding(name, symbol)
+    except Exception as e:
+        print(f"Error saving portfolio '{name}': {e}")
+        return jsonify({'error': 'Failed to save portfolio'}), 500
+    if not removed:
         return jsonify({'error': 'Stock not found in portfolio'}), 404
     
-    # Save portfolio
-    if save_portfolio(portfolio):
-        # Clear cache for the specific stock only
-        global data_cache, fundamental_cache, last_update
-        if symbol in data_cache:
-            del data_cache[symbol]
-        if symbol in fundamental_cache:
-            del fundamental_cache[symbol]
-        if symbol in last_update:
-            del last_update[symbol]
-        
-        return jsonify({'message': f'Successfully removed {symbol} from portfolio'})
+    # Cached data is only dropped once no other portfolio holds the symbol
+    release_symbols([symbol])
+    return jsonify({'message': f'Successfully removed {symbol} from portfolio'})
+
+@bp.route('/api/symbols/search', methods=['GET'])
+def search_symbols():
+    """Autocomplete symbols and company names from the local symbol master (?q=, ?limit=)"""
+    query = request.args.get('q', '')
+    try:
+        limit = min(int(request.args.get('limit', symbol_master.SEARCH_LIMIT)), 50)
+    except ValueError:
+        return jsonify({'error': 'limit must be a number'}), 400
+    
+    index = symbol_master.get_index()
+    start_time = time.perf_counter()
+    results = index.search(query, limit)
+    return jsonify({
+        'query': query,
+        'results': results,
+        'source': index.source,
+        'symbols_indexed': len(index),
+        'elapsed_us': round((time.perf_counter() - start_time) * 1e6, 1)
+    })
+
+def known_sector_rows():
+    """Symbol rows with the sector and industry of every stock whose fundamentals were fetched"""
+    ensure_benchmarks_loaded()
+    rows = [{'symbol': symbol, 'sector': entry.get('sector'), 'industry': entry.get('industry')}
+            for symbol, entry in sector_benchmarks_data.get('_tickers', {}).items()]
+    for symbol, entry in list(info_cache.items()):
+        info = entry['info']
+        rows.append({'symbol': symbol, 'name': info.get('longName') or info.get('shortName'),
+                     'sector': info.get('sector'), 'industry': info.get('industry')})
+    return rows
+
+@bp.route('/api/symbols/refresh', methods=['POST'])
+def refresh_symbols():
+    """Rebuild the symbol master from the exchange listings, universe.csv and fetched fundamentals"""
+    try:
+        summary = symbol_master.refresh_symbol_master(extra_rows=known_sector_rows())
+        return jsonify({'message': 'Symbol master refreshed', **summary})
+    except Exception as e:
+        return jsonify({'error': f'Failed to refresh symbol master: {str(e)}'}), 500
+
+def get_requested_symbols(args):
+    """Resolve the ?symbols= list or ?universe= name of a request (None if the universe is unknown)"""
+    symbols_param = args.get('symbols', '')
+    universe_name = args.get('universe', 'file')
+
+    if symbols_param:
+        return [s.strip().upper() for s in symbols_param.split(',') if s.strip()]
+    elif universe_name == 'portfolio':
+        return get_portfolio_stocks(args.get('portfolio', DEFAULT_PORTFOLIO))
+    elif universe_name in ('file', 'store'):
+        symbols = universe_symbols() if universe_name == 'file' else []
+        if not symbols:
+            # No universe file: use everything in the price store
+            store = price_store.open_price_store()
+            symbols = store['symbols'] if store else []
+        return symbols
     else:
-        return jsonify({'error': 'Failed to save portfolio'}), 500
+        return None
+
+@bp.route('/api/screen', methods=['GET'])
+def screen_universe():
+    """Screen a universe of symbols for current buy/sell technical signals"""
+    try:
+        symbols = get_requested_symbols(request.args)
+        if symbols is None:
+            return jsonify({'error': "universe must be 'file', 'store' or 'portfolio'"}), 400
+
+        screened = screen_symbols(symbols)
+        results = {
+            'buy': list(screened['buy']),
+            'sell': list(screened['sell']),
+            'hold_count': screened['hold_count'],
+            'screened': screened['screened'],
+            'missing_symbols': [],
+            'as_of': screened['as_of'],
+            'elapsed_ms': screened.get('elapsed_ms')
+        }
+
+        # Symbols not in the price store can still be screened from the dashboard cache
+        for symbol in screened['missing_symbols']:
+            stock_data = get_cached_frame(symbol)
+            if stock_data.empty:
+                results['missing_symbols'].append(symbol)
+                continue
+
+            recommendation = get_technical_recommendation(stock_data)
+            results['screened'] += 1
+            if recommendation == 'HOLD':
+                results['hold_count'] += 1
+                continue
+
+            signal_dates = last_signal_dates(stock_data[['Buy_Signal', 'Sell_Signal']])
+            entry = screen_entry(symbol, recommendation, signal_dates['Buy_Signal'],
+                                 signal_dates['Sell_Signal'], stock_data['Close'].iloc[-1])
+            results['buy' if recommendation == 'BUY' else 'sell'].append(entry)
+
+        return jsonify(results)
+
+    except Exception as e:
+        return jsonify({'error': f'Failed to screen universe: {str(e)}'}), 500
+
+@bp.route('/api/backtest', methods=['GET'])
+def backtest_universe():
+    """Backtest the technical buy/sell rules over the price store history"""
+    try:
+        symbols = get_requested_symbols(request.args)
+        if symbols is None:
+            return jsonify({'error': "universe must be 'file', 'store' or 'portfolio'"}), 400
+
+        start = request.args.get('start') or None
+        end = request.args.get('end') or None
+        for date_value in (start, end):
+            if date_value:
+                datetime.strptime(date_value, '%Y-%m-%d')
+
+        return jsonify(backtest_symbols(symbols, start=start, end=end))
+
+    except ValueError:
+        return jsonify({'error': 'start and end must be dates in YYYY-MM-DD format'}), 400
+    except Exception as e:
+        return jsonify({'error': f'Failed to run backtest: {str(e)}'}), 500
+
+@bp.route('/api/backtest/sweep', methods=['POST'])
+def sweep_indicator_parameters():
+    """Grid search over indicator parameters, e.g. {"grid": {"ma_window": [20, 30, 50]}}"""
+    try:
+        data = request.get_json() or {}
+        grid = data.get('grid')
+        if not grid or not isinstance(grid, dict):
+            return jsonify({'error': 'grid of {parameter: [values]} is required'}), 400
+
+        symbols = data.get('symbols') or get_requested_symbols({'universe': data.get('universe', 'file')})
+        if symbols is None:
+            return jsonify({'error': "universe must be 'file', 'store' or 'portfolio'"}), 400
+
+        sweep = run_parameter_sweep(grid, [s.upper() for s in symbols],
+                                    start=data.get('start'), end=data.get('end'),
+                                    processes=data.get('processes'))
+        return jsonify(sweep)
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Failed to run parameter sweep: {str(e)}'}), 500
+
+def fetch_quarterly_statements(symbol):
+    """Quarterly (financials, cashflow, balance sheet) for a symbol (empty frames on failure)"""
+    try:
+        ticker = yf.Ticker(symbol)
+        return ticker.quarterly_financials, ticker.quarterly_cashflow, ticker.quarterly_balance_sheet
+    except Exception as e:
+        print(f"Error fetching quarterly statements for {symbol}: {e}")
+        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+
+@bp.route('/api/fundamentals/growth', methods=['GET'])
+def growth_screen():
+    """Revenue, operating cash flow and ROE growth for a set of symbols (default: the portfolio)"""
+    try:
+        args = request.args.to_dict()
+        args.setdefault('universe', 'portfolio')
+        symbols = get_requested_symbols(args)
+        if symbols is None:
+            return jsonify({'error': "universe must be 'file', 'store' or 'portfolio'"}), 400
+
+        start_time = time.perf_counter()
+        symbols = list(dict.fromkeys(symbols))
+        # Statements are only downloaded for symbols without fresh cached growth metrics
+        growth = cached_growth_metrics(symbols)
+        stale = [symbol for symbol in symbols if symbol not in growth]
+        if stale:
+            with ThreadPoolExecutor(max_workers=INDUSTRY_FETCH_WORKERS) as executor:
+                statement_sets = dict(zip(stale, executor.map(fetch_quarterly_statements, stale)))
+            growth.update(growth_metrics_for_symbols(statement_sets))
+        results = [{'symbol': symbol, **{field: (round(value, 4) if value is not None else None)
+                                         for field, value in growth[symbol].items()}}
+                   for symbol in symbols]
+
+        summary = {}
+        for field in GROWTH_FIELDS:
+            values = [entry[field] for entry in results if entry[field] is not None]
+            summary[f'{field}_median'] = round(float(np.median(values)), 4) if values else None
+
+        return jsonify({
+            'results': results,
+            'summary': summary,
+            'symbols': len(symbols),
+            'elapsed_ms': round((time.perf_counter() - start_time) * 1000, 1)
+        })
+
+    except Exception as e:
+        return jsonify({'error': f'Failed to calculate growth metrics: {str(e)}'}), 500
+
+def parse_snapshot_date(value):
+    """YYYY-MM-DD query parameter normalized (None if missing); raises ValueError when malformed"""
+    if not value:
+        return None
+    return datetime.strptime(value, '%Y-%m-%d').strftime('%Y-%m-%d')
+
+@bp.route('/api/history/<symbol>', methods=['GET'])
+def get_metric_history(symbol):
+    """Daily snapshots of a fundamental metric against the sector median
+
+    ?metric=pe_ratio (default), ?days=365 or ?start=/?end= (YYYY-MM-DD). Served from the
+    snapshot store only, nothing is fetched.
+    """
+    symbol = symbol.upper()
+    metric = request.args.get('metric', 'pe_ratio')
+    try:
+        end = parse_snapshot_date(request.args.get('end'))
+        start = parse_snapshot_date(request.args.get('start'))
+        if start is None:
+            days = int(request.args.get('days', 365))
+            if days < 1:
+                return jsonify({'error': 'days must be positive'}), 400
+            start = ((datetime.strptime(end, '%Y-%m-%d') if end else datetime.now()) -
+                     timedelta(days=days)).strftime('%Y-%m-%d')
+    except ValueError:
+        return jsonify({'error': 'days must be a number and start/end dates YYYY-MM-DD'}), 400
+
+    try:
+        start_time = time.perf_counter()
+        history = snapshots.metric_history(symbol, metric, start=start, end=end)
+        relative = [entry['relative'] for entry in history if entry['relative'] is not None]
+        return jsonify({
+            'symbol': symbol,
+            'metric': metric,
+            'start': start,
+            'end': end or snapshots.today(),
+            'history': history,
+            'summary': {
+                'snapshots': len(history),
+                'relative_min': min(relative) if relative else None,
+                'relative_max': max(relative) if relative else None,
+                'relative_median': round(float(np.median(relative)), 4) if relative else None
+            },
+            'elapsed_ms': round((time.perf_counter() - start_time) * 1000, 2)
+        })
+    except Exception as e:
+        return jsonify({'error': f'Failed to read snapshot history: {str(e)}'}), 500
+
+@bp.route('/api/history/<symbol>/snapshot', methods=['GET'])
+def get_fundamentals_snapshot(symbol):
+    """Fundamentals and sector benchmarks of a symbol as they were on ?date=YYYY-MM-DD (default today)"""
+    symbol = symbol.upper()
+    try:
+        date = parse_snapshot_date(request.args.get('date')) or snapshots.today()
+    except ValueError:
+        return jsonify({'error': 'date must be YYYY-MM-DD'}), 400
+
+    try:
+        snapshot_date, metrics = snapshots.fundamentals_as_of(symbol, date)
+        if snapshot_date is None:
+            return jsonify({'error': f'No snapshot of {symbol} on or before {date}'}), 404
+        sector = metrics.get('sector')
+        return jsonify({
+            'symbol': symbol,
+            'date': date,
+            'snapshot_date': snapshot_date,
+            'fundamentals': metrics,
+            'sector': sector,
+            'sector_benchmarks': snapshots.benchmarks_as_of(sector, date) if sector else {}
+        })
+    except Exception as e:
+        return jsonify({'error': f'Failed to read snapshot: {str(e)}'}), 500
+
+def close_history_sources(symbols):
+    """Split symbols into (fresh price store or None, symbols read from it, symbols read from data_cache)"""
+    store = price_store.open_price_store()
+    if not price_store.is_store_fresh(store):
+        store = None
+    from_store = [s for s in symbols if store is not None and s in store['symbol_index']]
+    in_store = set(from_store)
+    from_cache = [s for s in symbols if s not in in_store and
+                  compact_column(data_cache.get(s)) is not None]
+    return store, from_store, from_cache
+
+def load_close_histories(store, from_store, from_cache):
+    """Date x symbol close frame over the risk lookback from the price store and data_cache"""
+    columns = []
+    if from_store:
+        start = datetime.now() - timedelta(days=RISK_LOOKBACK_DAYS)
+        columns.append(price_store.matrix(store, 'Close', from_store, start=start))
+    for symbol in from_cache:
+        columns.append(compact_column(data_cache.get(symbol)).rename(symbol).to_frame())
+    if not columns:
+        return pd.DataFrame()
+    closes = pd.concat(columns, axis=1)
+    closes.index = pd.DatetimeIndex(closes.index).tz_localize(None)
+    return closes
+
+def parse_weights(weights_param):
+    """{symbol: weight} from ?weights=AAPL:2,MSFT:1 (None when not given)"""
+    if not weights_param:
+        return None
+    weights = {}
+    for item in weights_param.split(','):
+        symbol, _, weight = item.partition(':')
+        weights[symbol.strip().upper()] = float(weight)
+    return weights
+
+@bp.route('/api/portfolio/risk', methods=['GET'])
+def get_portfolio_risk():
+    """Correlation, volatility, betas and VaR of the portfolio (or ?symbols= / ?universe=)
+
+    Uses the histories already in the price store or data_cache; ?fetch=true first loads
+    missing symbols. Optional ?weights=AAPL:2,MSFT:1, ?horizon=<days>, ?benchmark=SPY and
+    ?correlation=full (full matrix for large portfolios).
+    """
+    try:
+        args = request.args.to_dict()
+        args.setdefault('universe', 'portfolio')
+        symbols = get_requested_symbols(args)
+        if symbols is None:
+            return jsonify({'error': "universe must be 'file', 'store' or 'portfolio'"}), 400
+        symbols = list(dict.fromkeys(symbols))
+        if not symbols:
+            return jsonify({'error': 'No symbols to analyze'}), 400
+
+        try:
+            weights = parse_weights(request.args.get('weights'))
+            horizon_days = int(request.args.get('horizon', 1))
+        except ValueError:
+            return jsonify({'error': 'weights must look like AAPL:2,MSFT:1 and horizon must be a number of days'}), 400
+        if not 1 <= horizon_days <= 60:
+            return jsonify({'error': 'horizon must be between 1 and 60 days'}), 400
+        benchmark = request.args.get('benchmark', RISK_BENCHMARK).strip().upper()
+        full_correlation = request.args.get('correlation') == 'full'
+
+        # The benchmark may be a holding too; each column is loaded once
+        risk_symbols = list(dict.fromkeys(symbols + [benchmark]))
+
+        if request.args.get('fetch') == 'true':
+            # Sequential on purpose: concurrent yf.download calls share module state
+            _, from_store, from_cache = close_history_sources(risk_symbols)
+            loaded = set(from_store) | set(from_cache)
+            for symbol in risk_symbols:
+                if symbol not in loaded:
+                    fetch_single_stock_data(symbol)
+
+        store, from_store, from_cache = close_history_sources(risk_symbols)
+        loaded = set(from_store) | set(from_cache)
+        holdings = [s for s in symbols if s in loaded]
+        if not holdings:
+            return jsonify({'error': 'No price history loaded for the requested symbols',
+                            'missing_symbols': symbols}), 404
+
+        # Changes whenever the store is rebuilt or a cached symbol is refetched
+        version = (store['version'] if from_store else None,
+                   tuple((s, last_update.get(s)) for s in from_cache),
+                   tuple(holdings), benchmark)
+
+        def load_closes():
+            closes = load_close_histories(store, from_store, from_cache)
+            benchmark_close = closes[benchmark] if benchmark in closes.columns else None
+            return closes[holdings], benchmark_close, benchmark
+
+        report = cached_portfolio_risk(version, load_closes, weights=weights,
+                                       horizon_days=horizon_days, full_correlation=full_correlation)
+        return jsonify({**report, 'missing_symbols': [s for s in symbols if s not in loaded]})
 
-@app.route('/api/benchmarks/refresh', methods=['POST'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Failed to calculate portfolio risk: {str(e)}'}), 500
+
+# Fundamental metrics an export can include, in the order they are written
+EXPORT_FUNDAMENTAL_COLUMNS = list(extract_fundamental_metrics('', {})) + GROWTH_FIELDS
+
+def export_indicator_frame(symbol, start=None, fetch=False):
+    """Indicator DataFrame for an export: cached, else computed from the price store (without
+    caching it), else fetched when fetch is set (empty if unavailable)"""
+    compact = data_cache.get(symbol)
+    if compact is None or len(compact['index']) == 0:
+        days = 300
+        if start:
+            # Extra history so the indicators are warmed up at start
+            days = max(days, (datetime.now() - datetime.strptime(start, '%Y-%m-%d')).days + 60)
+        data = load_history_from_price_store(symbol, days=days)
+        if data is not None:
+            return calculate_served_indicators(data)
+        if not fetch:
+            return pd.DataFrame()
+        fetch_single_stock_data(symbol)
+    return get_cached_frame(symbol)
+
+def export_fundamentals(symbol, fetch=False):
+    """Cached fundamental metrics for an export (fetched first when fetch is set)"""
+    if symbol not in fundamental_cache and fetch:
+        fetch_single_stock_data(symbol)
+    return fundamental_cache.get(symbol)
+
+@bp.route('/api/export', methods=['GET'])
+def export_data():
+    """Stream indicators or fundamentals for the portfolio (or ?symbols= / ?universe=)
+
+    ?format=csv|ndjson|parquet, ?dataset=indicators|fundamentals, ?columns=Close,Buy_Signal,
+    ?start= and ?end= (YYYY-MM-DD, indicators only), ?fetch=true to load symbols that are
+    neither cached nor in the price store.
+    """
+    args = request.args.to_dict()
+    args.setdefault('universe', 'portfolio')
+    symbols = get_requested_symbols(args)
+    if symbols is None:
+        return jsonify({'error': "universe must be 'file', 'store' or 'portfolio'"}), 400
+    symbols = list(dict.fromkeys(symbols))
+
+    fmt = request.args.get('format', 'csv')
+    if fmt not in export.available_formats():
+        return jsonify({'error': f"format must be one of {', '.join(export.available_formats())}"}), 400
+    dataset = request.args.get('dataset', 'indicators')
+    if dataset not in ('indicators', 'fundamentals'):
+        return jsonify({'error': "dataset must be 'indicators' or 'fundamentals'"}), 400
+
+    start = request.args.get('start') or None
+    end = request.args.get('end') or None
+    fetch = request.args.get('fetch') == 'true'
+    requested_columns = [c.strip() for c in request.args.get('columns', '').split(',') if c.strip()]
+    try:
+        for date_value in (start, end):
+            if date_value:
+                datetime.strptime(date_value, '%Y-%m-%d')
+    except ValueError:
+        return jsonify({'error': 'start and end must be dates in YYYY-MM-DD format'}), 400
+    try:
+        available_columns = export.INDICATOR_COLUMNS if dataset == 'indicators' else EXPORT_FUNDAMENTAL_COLUMNS
+        columns = export.select_columns(requested_columns, available_columns)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if dataset == 'indicators':
+        frames = export.indicator_frames(symbols, lambda symbol: export_indicator_frame(symbol, start, fetch),
+                                         columns, start=start, end=end)
+        schema = export.indicator_schema(columns) if fmt == 'parquet' else None
+    else:
+        frames = export.fundamental_frames(symbols, lambda symbol: export_fundamentals(symbol, fetch), columns)
+        schema = export.fundamental_schema(columns) if fmt == 'parquet' else None
+
+    filename = f"{dataset}_{datetime.now().strftime('%Y%m%d')}.{fmt}"
+    return Response(stream_with_context(export.export_stream(frames, fmt, schema)),
+                    mimetype=export.EXPORT_FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+@bp.route('/api/benchmarks/refresh', methods=['POST'])
 def refresh_sector_benchmarks():
-    """Calculate and save sector benchmarks to JSON file"""
+    """Refresh stale sector benchmarks and save them to JSON file
+
+    ?force=true refetches every representative stock; ?sector=Energy limits the refresh to one sector.
+    """
     try:
         print("Starting sector benchmark calculation...")
         
-        # Calculate all sector benchmarks
-        new_benchmarks = calculate_all_sector_benchmarks()
+        force = request.args.get('force', 'false').lower() == 'true'
+        sector = request.args.get('sector')
+        if sector and sector not in get_sector_representative_stocks():
+            return jsonify({'error': f'Unknown sector: {sector}'}), 400
+        
+        # Refresh only what is stale (or everything when forced)
+        new_benchmarks = calculate_all_sector_benchmarks(force=force, sectors=[sector] if sector else None)
         
         if new_benchmarks:
             # Reload the global benchmarks data
@@ -1106,13 +2252,19 @@ def refresh_sector_benchmarks():
             # Get metadata for response
             metadata = new_benchmarks.get('_metadata', {})
             sectors_calculated = [k for k in new_benchmarks.keys() if not k.startswith('_')]
+            refresh_summary = metadata.get('last_refresh', {})
             
             return jsonify({
                 'message': 'Sector benchmarks calculated and saved successfully',
                 'sectors_calculated': sectors_calculated,
                 'total_sectors': len(sectors_calculated),
+                'sectors_refreshed': refresh_summary.get('refreshed', []),
+                'sectors_unchanged': refresh_summary.get('unchanged', []),
+                'sectors_kept_last_good': refresh_summary.get('kept_last_good', []),
+                'sectors_fallback': refresh_summary.get('fallback', []),
+                'tickers_fetched': refresh_summary.get('tickers_fetched', 0),
                 'last_updated': metadata.get('last_updated'),
-                'file_saved': 'sector_benchmarks.json'
+                'file_saved': BENCHMARKS_FILE
             })
         else:
             return jsonify({'error': 'Failed to calculate sector benchmarks'}), 500
@@ -1120,14 +2272,43 @@ def refresh_sector_benchmarks():
     except Exception as e:
         return jsonify({'error': f'Failed to refresh benchmarks: {str(e)}'}), 500
 
-@app.route('/api/benchmarks/status', methods=['GET'])
+@bp.route('/api/benchmarks/industries/refresh', methods=['POST'])
+def refresh_industry_benchmarks():
+    """Refresh industry benchmarks over the peer universe (?time_budget=seconds, ?force=true)"""
+    try:
+        force = request.args.get('force', 'false').lower() == 'true'
+        time_budget = float(request.args.get('time_budget', INDUSTRY_REFRESH_TIME_BUDGET))
+        workers = int(request.args.get('workers', INDUSTRY_FETCH_WORKERS))
+        if time_budget <= 0 or workers < 1:
+            return jsonify({'error': 'time_budget and workers must be positive'}), 400
+        
+        new_benchmarks = calculate_industry_benchmarks(force=force, time_budget=time_budget, max_workers=workers)
+        if not new_benchmarks:
+            return jsonify({'error': 'Failed to calculate industry benchmarks'}), 500
+        
+        global industry_benchmarks_data
+        industry_benchmarks_data = new_benchmarks
+        
+        return jsonify({
+            'message': 'Industry benchmarks calculated and saved successfully',
+            'industries_calculated': sorted(new_benchmarks['industries']),
+            **new_benchmarks['_metadata'],
+            'file_saved': INDUSTRY_BENCHMARKS_FILE
+        })
+    
+    except ValueError:
+        return jsonify({'error': 'time_budget and workers must be numbers'}), 400
+    except Exception as e:
+        return jsonify({'error': f'Failed to refresh industry benchmarks: {str(e)}'}), 500
+
+@bp.route('/api/benchmarks/status', methods=['GET'])
 def get_benchmark_status():
     """Get status of sector benchmark file"""
     try:
-        global sector_benchmarks_data
+        ensure_benchmarks_loaded()
         
         # Check if file exists
-        benchmarks_file = 'sector_benchmarks.json'
+        benchmarks_file = BENCHMARKS_FILE
         file_exists = os.path.exists(benchmarks_file)
         
         if file_exists:
@@ -1144,6 +2325,28 @@ def get_benchmark_status():
         
         # Check representative stocks status
         representative_stocks = get_sector_representative_stocks()
+        ticker_entries = sector_benchmarks_data.get('_tickers', {})
+        now = datetime.now()
+        
+        # Per-sector age and staleness
+        sector_status = {}
+        for sector in sectors_available:
+            sector_info = sector_benchmarks_data[sector].get('_sector_info', {})
+            calculation_date = sector_info.get('calculation_date')
+            age_hours = None
+            if calculation_date:
+                age = now - datetime.strptime(calculation_date, '%Y-%m-%d %H:%M:%S')
+                age_hours = round(age.total_seconds() / 3600, 1)
+            
+            stale_stocks = [symbol for symbol in representative_stocks.get(sector, [])
+                            if is_ticker_entry_stale(ticker_entries.get(symbol), now)]
+            sector_status[sector] = {
+                'last_calculated': calculation_date or 'fallback',
+                'age_hours': age_hours,
+                'status': sector_info.get('status', 'fresh') if sector_info else 'fallback',
+                'stocks_analyzed': sector_info.get('total_stocks_analyzed', 0),
+                'stale_stocks': stale_stocks
+            }
         
         return jsonify({
             'file_status': {
@@ -1157,139 +2360,67 @@ def get_benchmark_status():
                 'sectors_available': sectors_available,
                 'last_calculated': metadata.get('last_updated', 'Unknown'),
                 'calculation_method': metadata.get('calculation_method', 'Unknown'),
-                'using_fallback': metadata.get('last_updated') == 'fallback'
+                'using_fallback': metadata.get('last_updated') == 'fallback',
+                'sectors': sector_status
             },
             'representative_stocks': {
                 'total_stocks': sum(len(stocks) for stocks in representative_stocks.values()),
-                'stocks_per_sector': {sector: len(stocks) for sector, stocks in representative_stocks.items()}
+                'stocks_per_sector': {sector: len(stocks) for sector, stocks in representative_stocks.items()},
+                'stale_stocks': sum(len(status['stale_stocks']) for status in sector_status.values()),
+                'max_age_days': BENCHMARK_TICKER_MAX_AGE.days
+            },
+            'industry_data': {
+                'total_industries': len(industry_benchmarks_data.get('industries', {})),
+                'last_calculated': industry_benchmarks_data.get('_metadata', {}).get('last_updated', 'Never'),
+                'universe_size': industry_benchmarks_data.get('_metadata', {}).get('universe_size', 0),
+                'peers_deferred': industry_benchmarks_data.get('_metadata', {}).get('peers_deferred', 0)
+            },
+            'fundamentals_cache': {
+                'symbols_cached': len(info_cache),
+                'cache_hits': info_cache_stats['hits'],
+                'upstream_fetches': info_cache_stats['fetches'],
+                'growth_metrics_cached': len(growth_cache),
+                'growth_cache_hits': growth_cache_stats['hits']
             }
         })
         
     except Exception as e:
         return jsonify({'error': f'Failed to get benchmark status: {str(e)}'}), 500
 
-def validate_growth_data(quarterly_data, metric_name, required_quarters=4):
-    """Validate data quality for growth calculations"""
-    if quarterly_data.empty:
-        return False, f"No quarterly data available for {metric_name}"
-    
-    if quarterly_data.shape[1] < required_quarters:
-        return False, f"Insufficient quarters for {metric_name} (need {required_quarters}, got {quarterly_data.shape[1]})"
-    
-    # Check if metric exists
-    metric_rows = [idx for idx in quarterly_data.index if metric_name.lower() in str(idx).lower()]
-    if not metric_rows:
-        return False, f"Metric '{metric_name}' not found in quarterly data"
-    
-    return True, "Data valid"
+_background_pid = {'pid': None}
 
-def calculate_yoy_growth(quarterly_data, metric_name):
-    """Calculate year-over-year growth from quarterly data"""
-    try:
-        # Validate data quality first
-        is_valid, message = validate_growth_data(quarterly_data, metric_name)
-        if not is_valid:
-            print(f"Data validation failed: {message}")
-            return None
-        
-        # Find the row with the specified metric
-        metric_rows = [idx for idx in quarterly_data.index if metric_name.lower() in str(idx).lower()]
-        metric_data = quarterly_data.loc[metric_rows[0]]
-        
-        # Get most recent quarter vs same quarter last year (4 quarters ago)
-        current_q = metric_data.iloc[0]  # Most recent quarter
-        year_ago_q = metric_data.iloc[3] if len(metric_data) >= 4 else None
-        
-        if (year_ago_q is None or year_ago_q == 0 or 
-            pd.isna(current_q) or pd.isna(year_ago_q)):
-            return None
-        
-        growth_rate = (current_q - year_ago_q) / abs(year_ago_q)
-        return growth_rate
-        
-    except Exception as e:
-        print(f"Error calculating YoY growth for {metric_name}: {e}")
-        return None
+def start_background_threads():
+    """Start this process's alert refresher; threads do not survive a fork, so each worker runs this"""
+    if _background_pid['pid'] == os.getpid():
+        return
+    _background_pid['pid'] = os.getpid()
+    if alerts.alerted_symbols():
+        alerts.start_refresher(refresh_alert_symbols)
 
-def calculate_roe_growth(quarterly_financials, quarterly_balance_sheet):
-    """Calculate ROE growth rate over time"""
-    try:
-        if quarterly_financials.empty or quarterly_balance_sheet.empty:
-            return None
-        
-        # Find Net Income
-        income_rows = [idx for idx in quarterly_financials.index 
-                      if 'net income' in str(idx).lower() and 'common' not in str(idx).lower()]
-        if not income_rows:
-            return None
-        
-        # Find Stockholders Equity
-        equity_rows = [idx for idx in quarterly_balance_sheet.index 
-                      if 'stockholder' in str(idx).lower() and 'equity' in str(idx).lower()]
-        if not equity_rows:
-            return None
-        
-        income_data = quarterly_financials.loc[income_rows[0]]
-        equity_data = quarterly_balance_sheet.loc[equity_rows[0]]
-        
-        # Calculate ROE for recent quarter and year-ago quarter using TTM approach
-        if len(income_data) >= 4 and len(equity_data) >= 4:
-            # Current TTM (Trailing Twelve Months) ROE
-            current_ttm_income = income_data.iloc[0:4].sum()  # Sum of last 4 quarters
-            current_equity = equity_data.iloc[0]  # Most recent equity
-            
-            # Year-ago TTM ROE (if we have enough data)
-            if len(income_data) >= 7 and len(equity_data) >= 4:
-                year_ago_ttm_income = income_data.iloc[3:7].sum()  # Sum of quarters 4-7
-                year_ago_equity = equity_data.iloc[3]  # Equity 4 quarters ago
-            else:
-                # Fallback: annualize the year-ago quarter
-                year_ago_ttm_income = income_data.iloc[3] * 4
-                year_ago_equity = equity_data.iloc[3]
-            
-            if (current_equity > 0 and year_ago_equity > 0 and
-                not pd.isna(current_ttm_income) and not pd.isna(year_ago_ttm_income)):
-                
-                current_roe = current_ttm_income / current_equity
-                year_ago_roe = year_ago_ttm_income / year_ago_equity
-                
-                if year_ago_roe != 0:
-                    roe_growth = (current_roe - year_ago_roe) / abs(year_ago_roe)
-                    return roe_growth
-        
-        return None
-        
-    except Exception as e:
-        print(f"Error calculating ROE growth: {e}")
-        return None
+@bp.before_app_request
+def start_background_threads_once():
+    # Not in create_app: with --preload that runs in the gunicorn master, before the fork
+    start_background_threads()
 
-def extract_enhanced_growth_metrics(ticker):
-    """Extract enhanced growth metrics from quarterly data"""
-    try:
-        # Get quarterly data
-        quarterly_financials = ticker.quarterly_financials
-        quarterly_cashflow = ticker.quarterly_cashflow
-        quarterly_balance_sheet = ticker.quarterly_balance_sheet
-        
-        enhanced_metrics = {}
-        
-        # 1. Enhanced Revenue Growth (YoY quarterly)
-        revenue_growth_yoy = calculate_yoy_growth(quarterly_financials, 'Total Revenue')
-        enhanced_metrics['revenue_growth_yoy'] = revenue_growth_yoy
-        
-        # 2. Operating Cash Flow Growth
-        ocf_growth_yoy = calculate_yoy_growth(quarterly_cashflow, 'Operating Cash Flow')
-        enhanced_metrics['ocf_growth_yoy'] = ocf_growth_yoy
-        
-        # 3. ROE Growth Rate
-        roe_growth_yoy = calculate_roe_growth(quarterly_financials, quarterly_balance_sheet)
-        enhanced_metrics['roe_growth_yoy'] = roe_growth_yoy
-        
-        return enhanced_metrics
-        
-    except Exception as e:
-        print(f"Error extracting enhanced growth metrics: {e}")
-        return {}
+def create_app(load_benchmarks='background'):
+    """Create the Flask application
+
+    load_benchmarks: 'background' reads the benchmark files in a thread so startup does not
+    wait for them, 'eager' reads them before returning, 'lazy' on first use.
+    """
+    if load_benchmarks not in ('background', 'eager', 'lazy'):
+        raise ValueError("load_benchmarks must be 'background', 'eager' or 'lazy'")
+
+    app = Flask(__name__)
+    app.register_blueprint(bp)
+    init_serialization(app)
+
+    if load_benchmarks == 'eager':
+        ensure_benchmarks_loaded()
+    elif load_benchmarks == 'background':
+        threading.Thread(target=ensure_benchmarks_loaded, name='benchmark-loader', daemon=True).start()
+
+    return app
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    create_app().run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,165 @@
+"""
+Vectorized historical backtest of the technical buy/sell signal rules
+Replays Buy_Signal/Sell_Signal over wide date x symbol frames with array operations:
+go long at the close of a buy signal's bar and exit at the close of a sell signal's bar,
+so a trade earns the returns of the bars after its signals
+"""
+
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import price_store
+from indicators import calculate_signals_batch
+
+TRADING_DAYS_PER_YEAR = 252
+
+# Recent backtest results keyed by (store version, symbols, date range)
+BACKTEST_CACHE_SIZE = 16
+_backtest_cache = OrderedDict()
+_backtest_cache_lock = threading.Lock()
+
+def signal_positions(buy, sell):
+    """Long/flat position held over each bar: entered at a buy's close, closed at a sell's close
+
+    A bar is held when its return (previous close to close) is earned, so a position
+    taken at the close of a signal bar is held from the next bar on. A bar with both
+    signals keeps the previous position.
+    """
+    events = buy.astype('int8') - sell.astype('int8')
+    state = events.where(events != 0).ffill().fillna(-1)
+    return (state > 0).shift(1, fill_value=False)
+
+def backtest_performance(close, held):
+    """Per-symbol returns, hit rate and drawdown for a position frame"""
+    close = close.ffill()
+    returns = close / close.shift(1) - 1.0
+    strategy_returns = returns.where(held, 0.0).fillna(0.0)
+
+    equity = (1.0 + strategy_returns).cumprod()
+    drawdown = equity / equity.cummax() - 1.0
+
+    bars = close.notna().sum()
+    total_return = equity.iloc[-1] - 1.0
+    years = bars / TRADING_DAYS_PER_YEAR
+    annualized_return = (1.0 + total_return) ** (1.0 / years.where(years > 0)) - 1.0
+
+    first_close = close.bfill().iloc[0]
+    last_close = close.iloc[-1]
+    buy_and_hold_return = last_close / first_close - 1.0
+
+    # Per-trade returns: label each run of held bars, then sum log returns per (symbol, trade)
+    entries = held & ~held.shift(1, fill_value=False)
+    trade_ids = entries.cumsum().to_numpy()
+    held_values = held.to_numpy()
+    log_returns = np.log1p(strategy_returns.to_numpy())
+
+    rows, cols = np.nonzero(held_values)
+    trades = pd.DataFrame({
+        'symbol': cols,
+        'trade': trade_ids[rows, cols],
+        'log_return': log_returns[rows, cols]
+    })
+    trade_returns = np.expm1(trades.groupby(['symbol', 'trade'])['log_return'].sum())
+    trade_wins = (trade_returns > 0).groupby(level='symbol')
+    trade_counts = trade_wins.size().reindex(range(close.shape[1]), fill_value=0).to_numpy()
+    hit_rates = trade_wins.mean().reindex(range(close.shape[1])).to_numpy()
+
+    return pd.DataFrame({
+        'total_return': total_return,
+        'annualized_return': annualized_return,
+        'buy_and_hold_return': buy_and_hold_return,
+        'max_drawdown': drawdown.min(),
+        'trades': trade_counts,
+        'hit_rate': hit_rates,
+        'exposure': held.sum() / bars.where(bars > 0),
+        'bars': bars
+    }, index=close.columns)
+
+def run_backtest(high, low, close, start=None, end=None, params=None):
+    """Backtest the signal rules on wide frames; indicators warm up on data before `start`"""
+    if end is not None:
+        high, low, close = high.loc[:end], low.loc[:end], close.loc[:end]
+
+    buy, sell = calculate_signals_batch(high, low, close, params)
+    held = signal_positions(buy, sell)
+
+    if start is not None:
+        close, held = close.loc[start:], held.loc[start:].copy()
+        # A position carried into the window starts from the first bar's close
+        held.iloc[:1] = False
+
+    return backtest_performance(close, held)
+
+def _round_or_none(value, digits=4):
+    if value is None or pd.isna(value):
+        return None
+    return round(float(value), digits)
+
+def backtest_symbols(symbols, start=None, end=None, store=None):
+    """Backtest symbols from the price store; symbols not in the store are reported as missing"""
+    start_time = time.perf_counter()
+    store = store or price_store.open_price_store()
+
+    if store is None:
+        return {'results': [], 'summary': {}, 'missing_symbols': list(symbols)}
+
+    symbols = list(dict.fromkeys(symbols))
+    cache_key = (store['path'], store['version'], tuple(symbols), start, end)
+    with _backtest_cache_lock:
+        cached = _backtest_cache.get(cache_key)
+        if cached is not None:
+            _backtest_cache.move_to_end(cache_key)
+            return cached
+
+    available = [s for s in symbols if s in store['symbol_index']]
+    missing = [s for s in symbols if s not in store['symbol_index']]
+
+    high = price_store.matrix(store, 'High', available)
+    low = price_store.matrix(store, 'Low', available)
+    close = price_store.matrix(store, 'Close', available)
+
+    performance = run_backtest(high, low, close, start=start, end=end)
+
+    results = []
+    for symbol, row in performance.iterrows():
+        results.append({
+            'symbol': symbol,
+            'total_return': _round_or_none(row['total_return']),
+            'annualized_return': _round_or_none(row['annualized_return']),
+            'buy_and_hold_return': _round_or_none(row['buy_and_hold_return']),
+            'max_drawdown': _round_or_none(row['max_drawdown']),
+            'trades': int(row['trades']),
+            'hit_rate': _round_or_none(row['hit_rate']),
+            'exposure': _round_or_none(row['exposure']),
+            'bars': int(row['bars'])
+        })
+
+    summary = {}
+    if len(performance):
+        summary = {
+            'symbols_tested': len(performance),
+            'median_total_return': _round_or_none(performance['total_return'].median()),
+            'median_buy_and_hold_return': _round_or_none(performance['buy_and_hold_return'].median()),
+            'median_max_drawdown': _round_or_none(performance['max_drawdown'].median()),
+            'total_trades': int(performance['trades'].sum()),
+            'median_hit_rate': _round_or_none(performance['hit_rate'].median())
+        }
+
+    tested_dates = close.loc[start:end].index
+    backtest = {
+        'results': results,
+        'summary': summary,
+        'missing_symbols': missing,
+        'start': tested_dates[0].strftime('%Y-%m-%d') if len(tested_dates) else None,
+        'end': tested_dates[-1].strftime('%Y-%m-%d') if len(tested_dates) else None,
+        'elapsed_ms': round((time.perf_counter() - start_time) * 1000, 1)
+    }
+
+    with _backtest_cache_lock:
+        _backtest_cache[cache_key] = backtest
+        while len(_backtest_cache) > BACKTEST_CACHE_SIZE:
+            _backtest_cache.popitem(last=False)
+
+    return backtest
@@ -0,0 +1,312 @@
+"""
+Offline batch report
+Runs the dashboard's full analysis (data fetch and indicators, fundamental analysis,
+recommendations, technical chart) for a portfolio, universe file or symbol list across a
+process pool, and writes a static report:
+
+    reports/latest/
+        index.html          summary table and charts, viewable without the server
+        report.json         the same summary as data
+        manifest.json       what was generated and when
+        api/stock/AAPL.json the exact /api/stock/AAPL response body
+        api/chart/AAPL.json the exact /api/chart/AAPL response body
+        charts/AAPL.png
+
+Run it after market close; until the next US session opens the web app answers /api/stock
+and /api/chart from the precomputed bodies instead of fetching and rendering on the first
+click, unless the shared price store was rebuilt or the worker fetched the symbol itself
+after the report.
+
+    python batch_report.py --portfolio default
+    python batch_report.py --universe universe.csv --processes 8
+"""
+
+import argparse
+import base64
+import contextlib
+import html
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from datetime import datetime, time as clock_time, timedelta
+from zoneinfo import ZoneInfo
+from multiprocessing import Pool
+from serialization import dumps_bytes
+
+REPORTS_DIR = 'reports'
+REPORT_DIR = os.path.join(REPORTS_DIR, 'latest')
+MANIFEST_FILE = 'manifest.json'
+
+# Precomputed responses are served until the next regular session opens (weekdays;
+# exchange holidays are not known, so a report may expire a day early)
+MARKET_TIMEZONE = ZoneInfo('America/New_York')
+SESSION_OPEN = clock_time(9, 30)
+
+SUMMARY_FIELDS = ['last_close', 'as_of', 'overall_recommendation', 'technical_recommendation',
+                  'last_buy_signal', 'last_sell_signal', 'pe_ratio', 'pe_sector_median']
+
+def api_body_path(report_dir, kind, symbol):
+    return os.path.join(report_dir, 'api', kind, f'{symbol}.json')
+
+def _write_bytes(path, data):
+    tmp_file = path + '.tmp'
+    with open(tmp_file, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_file, path)
+
+def _setup_backend(offline, latency):
+    """Import the app in this process, pick its data backend and load the benchmarks"""
+    import app as stock_app
+    if offline:
+        import offline_data
+        offline_data.install(stock_app, latency=latency)
+    stock_app.ensure_benchmarks_loaded()
+
+def _init_worker(offline, latency, verbose):
+    """Pool initializer: silence the app's progress output and set up the app"""
+    if not verbose:
+        sys.stdout = open(os.devnull, 'w')
+    _setup_backend(offline, latency)
+
+def _analyze_quietly(task):
+    """analyze_symbol with the app's progress output silenced (for runs in this process)"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        return analyze_symbol(task)
+
+def analyze_symbol(task):
+    """Worker: fetch and analyze one symbol, write its API bodies and chart; returns its summary row"""
+    symbol, name, report_dir, charts = task
+    import app as stock_app
+
+    start_time = time.perf_counter()
+    row = {'symbol': symbol, 'name': name, 'status': 'ok'}
+    try:
+        stock_app.fetch_single_stock_data(symbol, max_age_seconds=0)
+        stock_data = stock_app.get_cached_frame(symbol)
+        if stock_data.empty:
+            return {**row, 'status': 'no_data'}
+
+        payload = stock_app.build_stock_payload(symbol)
+        _write_bytes(api_body_path(report_dir, 'stock', symbol), dumps_bytes(payload))
+
+        state = stock_app.symbol_state(symbol) or {}
+        row.update({field: state.get(field) for field in SUMMARY_FIELDS})
+        row['last_updated'] = payload['last_updated']
+
+        if charts:
+            chart = stock_app.create_technical_chart(symbol, stock_data)
+            _write_bytes(api_body_path(report_dir, 'chart', symbol), dumps_bytes({'chart': chart}))
+            _write_bytes(os.path.join(report_dir, 'charts', f'{symbol}.png'), base64.b64decode(chart))
+            row['chart'] = f'charts/{symbol}.png'
+    except Exception as e:
+        row.update({'status': 'failed', 'error': str(e)[:200]})
+    row['seconds'] = round(time.perf_counter() - start_time, 2)
+    return row
+
+def render_html(report):
+    """Static HTML page of a report (summary table plus one chart per symbol)"""
+    def cell(value):
+        return html.escape('N/A' if value is None else str(value))
+
+    badge = {'BUY': 'success', 'SELL': 'danger', 'HOLD': 'secondary'}
+    rows = []
+    sections = []
+    for entry in report['results']:
+        symbol = html.escape(entry['symbol'])
+        recommendation = entry.get('overall_recommendation')
+        rows.append(
+            f"<tr><td><a href=\"#{symbol}\">{symbol}</a></td><td>{cell(entry.get('name'))}</td>"
+            f"<td>{cell(entry.get('last_close'))}</td>"
+            f"<td><span class=\"badge bg-{badge.get(recommendation, 'light text-dark')}\">{cell(recommendation)}</span></td>"
+            f"<td>{cell(entry.get('technical_recommendation'))}</td><td>{cell(entry.get('last_buy_signal'))}</td>"
+            f"<td>{cell(entry.get('last_sell_signal'))}</td><td>{cell(entry.get('pe_ratio'))}</td>"
+            f"<td>{cell(entry.get('pe_sector_median'))}</td><td>{cell(entry['status'])}</td></tr>")
+        if entry.get('chart'):
+            sections.append(f"<h4 id=\"{symbol}\" class=\"mt-4\">{symbol} <small class=\"text-muted\">"
+                            f"{cell(entry.get('name'))}</small></h4>"
+                            f"<img class=\"img-fluid\" src=\"{html.escape(entry['chart'])}\" alt=\"{symbol} chart\">")
+
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <title>Portfolio Report {cell(report['generated_at'])}</title>
+    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css" rel="stylesheet">
+</head>
+<body>
+<div class="container my-4">
+    <h1>Portfolio Report</h1>
+    <p class="text-muted">{cell(report['source'])} &middot; generated {cell(report['generated_at'])} &middot;
+        {report['symbols']} symbols, {report['failed']} failed, {report['elapsed_seconds']}s</p>
+    <table class="table table-sm table-striped">
+        <thead><tr><th>Symbol</th><th>Name</th><th>Last Close</th><th>Overall</th><th>Technical</th>
+            <th>Last Buy</th><th>Last Sell</th><th>P/E</th><th>Sector P/E</th><th>Status</th></tr></thead>
+        <tbody>
+{chr(10).join(rows)}
+        </tbody>
+    </table>
+{chr(10).join(sections)}
+</div>
+</body>
+</html>
+"""
+
+def generate_report(holdings, source, output=REPORT_DIR, processes=None, charts=True,
+                    offline=False, latency=0.0, verbose=False):
+    """Analyze holdings ([{'symbol', 'name'}]) into a static report at output; returns the report
+
+    The report is built next to output and swapped in when complete, so the web app never
+    serves a half-written one.
+    """
+    start_time = time.perf_counter()
+    building = f"{output.rstrip(os.sep)}.building"
+    shutil.rmtree(building, ignore_errors=True)
+    for subdir in ('api/stock', 'api/chart', 'charts'):
+        os.makedirs(os.path.join(building, subdir), exist_ok=True)
+
+    holdings = list({holding['symbol']: holding for holding in holdings}.values())
+    tasks = [(holding['symbol'], holding.get('name') or holding['symbol'], building, charts)
+             for holding in holdings]
+    print(f"Analyzing {len(tasks)} symbols from {source}...")
+
+    results = []
+    if processes == 1 or len(tasks) <= 1:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(sys.stdout if verbose else devnull):
+            _setup_backend(offline, latency)
+        outputs = map(analyze_symbol if verbose else _analyze_quietly, tasks)
+        pool = None
+    else:
+        pool = Pool(processes=processes, initializer=_init_worker, initargs=(offline, latency, verbose))
+        outputs = pool.imap_unordered(analyze_symbol, tasks)
+    try:
+        for i, row in enumerate(outputs, 1):
+            results.append(row)
+            print(f"  {i}/{len(tasks)} {row['symbol']}: {row['status']} ({row.get('seconds', 0)}s)")
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    results.sort(key=lambda row: row['symbol'])
+    generated_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    report = {
+        'generated_at': generated_at,
+        'source': source,
+        'symbols': len(results),
+        'failed': sum(1 for row in results if row['status'] != 'ok'),
+        'elapsed_seconds': round(time.perf_counter() - start_time, 1),
+        'results': results
+    }
+    manifest = {
+        'generated_at': generated_at,
+        'source': source,
+        'symbols': {row['symbol']: {'last_updated': row.get('last_updated'),
+                                    'chart': bool(row.get('chart'))}
+                    for row in results if row['status'] == 'ok'}
+    }
+
+    _write_bytes(os.path.join(building, 'report.json'), json.dumps(report, indent=2, default=str).encode())
+    _write_bytes(os.path.join(building, 'index.html'), render_html(report).encode())
+    _write_bytes(os.path.join(building, MANIFEST_FILE), json.dumps(manifest, indent=2).encode())
+
+    previous = f"{output.rstrip(os.sep)}.previous"
+    shutil.rmtree(previous, ignore_errors=True)
+    if os.path.exists(output):
+        os.replace(output, previous)
+    os.replace(building, output)
+    shutil.rmtree(previous, ignore_errors=True)
+    return report
+
+# Manifest of the served report, reloaded when the report is replaced
+_manifest = {'mtime': None, 'manifest': None}
+_manifest_lock = threading.Lock()
+
+def load_manifest(report_dir=REPORT_DIR):
+    """Manifest of the report at report_dir (None if there is none)"""
+    path = os.path.join(report_dir, MANIFEST_FILE)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    if _manifest['mtime'] != mtime:
+        with _manifest_lock:
+            try:
+                with open(path, 'r') as f:
+                    _manifest['manifest'] = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Error loading report manifest: {e}")
+                _manifest['manifest'] = None
+            _manifest['mtime'] = mtime
+    return _manifest['manifest']
+
+def next_session_open(moment):
+    """Local time of the first regular session open after moment (a naive local datetime)"""
+    market_time = moment.astimezone(MARKET_TIMEZONE)
+    session_open = datetime.combine(market_time.date(), SESSION_OPEN, tzinfo=MARKET_TIMEZONE)
+    if market_time >= session_open:
+        session_open += timedelta(days=1)
+    while session_open.weekday() >= 5:
+        session_open += timedelta(days=1)
+    return session_open.astimezone().replace(tzinfo=None)
+
+def precomputed_body(kind, symbol, newer_than=None, report_dir=REPORT_DIR, now=None):
+    """Precomputed response body of /api/<kind>/<symbol> (None if there is no usable one)
+
+    Bodies are used until the next session opens after the report was generated and, when
+    newer_than (e.g. when the shared price store was rebuilt) is given, only if the report
+    is newer.
+    """
+    manifest = load_manifest(report_dir)
+    if not manifest or symbol not in manifest['symbols']:
+        return None
+    generated_at = datetime.strptime(manifest['generated_at'], '%Y-%m-%d %H:%M:%S')
+    if (now or datetime.now()) >= next_session_open(generated_at) or \
+            (newer_than is not None and newer_than >= generated_at):
+        return None
+    try:
+        with open(api_body_path(report_dir, kind, symbol), 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Analyze a portfolio or universe into a static report')
+    source_group = parser.add_mutually_exclusive_group()
+    source_group.add_argument('--portfolio', help='Named portfolio to analyze (default: default)')
+    source_group.add_argument('--universe', help='Universe CSV file to analyze')
+    source_group.add_argument('--symbols', help='Comma-separated symbols')
+    parser.add_argument('--output', default=REPORT_DIR, help=f'Report directory (default: {REPORT_DIR}, '
+                                                              'which the web app serves)')
+    parser.add_argument('--processes', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--no-charts', action='store_true', help='Skip chart rendering')
+    parser.add_argument('--offline', action='store_true', help='Use the synthetic offline data backend')
+    parser.add_argument('--latency', type=float, default=0.0, help='Simulated latency of the offline backend')
+    parser.add_argument('--verbose', action='store_true', help='Show the app\'s own progress output')
+    args = parser.parse_args()
+
+    if args.universe:
+        from universe import load_universe
+        holdings = load_universe(args.universe)
+        source = f'universe {args.universe}'
+    elif args.symbols:
+        holdings = [{'symbol': s.strip().upper()} for s in args.symbols.split(',') if s.strip()]
+        source = 'symbols'
+    else:
+        import portfolios
+        name = args.portfolio or portfolios.DEFAULT_PORTFOLIO
+        if not portfolios.portfolio_exists(name):
+            parser.error(f"Portfolio '{name}' not found")
+        holdings = portfolios.portfolio_holdings(name)
+        source = f"portfolio '{name}'"
+
+    if not holdings:
+        parser.error('No symbols to analyze')
+
+    report = generate_report(holdings, source, output=args.output, processes=args.processes,
+                             charts=not args.no_charts, offline=args.offline, latency=args.latency,
+                             verbose=args.verbose)
+    print(f"Report for {report['symbols']} symbols ({report['failed']} failed) written to "
+          f"{os.path.join(args.output, 'index.html')} in {report['elapsed_seconds']}s")
@@ -0,0 +1,70 @@
+"""
+Per-symbol indicator benchmark
+Compares calculate_technical_indicators (pandas) with calculate_served_indicators (NumPy
+kernel) on synthetic daily histories: checks that the served columns match, then reports
+latency and peak traced memory per symbol.
+
+    python bench_indicators.py --bars 300 2500 --repeat 200
+"""
+
+import argparse
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from indicators import (KERNEL_FLAG_COLUMNS, KERNEL_VALUE_COLUMNS, calculate_served_indicators,
+                        calculate_technical_indicators)
+
+def synthetic_history(bars, seed=0):
+    """Random-walk daily OHLC history with prices rounded to cents"""
+    rng = np.random.default_rng(seed)
+    close = np.round(100 * np.exp(np.cumsum(rng.normal(0, 0.02, bars))), 2)
+    high = np.maximum(np.round(close * (1 + np.abs(rng.normal(0, 0.01, bars))), 2), close)
+    low = np.minimum(np.round(close * (1 - np.abs(rng.normal(0, 0.01, bars))), 2), close)
+    return pd.DataFrame({'Open': close, 'High': high, 'Low': low, 'Close': close,
+                         'Volume': rng.integers(1e5, 1e7, bars).astype(float)},
+                        index=pd.bdate_range('2000-01-03', periods=bars))
+
+def check_match(data):
+    """Largest relative value difference and number of differing flags between the two paths"""
+    expected = calculate_technical_indicators(data.copy())
+    actual = calculate_served_indicators(data.copy())
+    difference = max(float(np.max(np.abs(actual[column] - expected[column]) /
+                                  np.maximum(np.abs(expected[column]), 1.0)))
+                     for column in KERNEL_VALUE_COLUMNS)
+    mismatched_flags = sum(int((actual[column] != expected[column]).sum()) for column in KERNEL_FLAG_COLUMNS)
+    return difference, mismatched_flags
+
+def measure(calculate, data, repeat):
+    """(median milliseconds per call, peak traced KiB of one call)"""
+    calculate(data.copy())  # warm-up
+    timings = []
+    for _ in range(repeat):
+        frame = data.copy()
+        start = time.perf_counter()
+        calculate(frame)
+        timings.append(time.perf_counter() - start)
+
+    frame = data.copy()
+    tracemalloc.start()
+    calculate(frame)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return float(np.median(timings)) * 1000, peak / 1024
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the pandas and NumPy indicator paths')
+    parser.add_argument('--bars', type=int, nargs='+', default=[300, 2500], help='History lengths to test')
+    parser.add_argument('--repeat', type=int, default=200, help='Timed calls per path')
+    args = parser.parse_args()
+
+    for bars in args.bars:
+        data = synthetic_history(bars)
+        difference, mismatched_flags = check_match(data)
+        pandas_ms, pandas_kib = measure(calculate_technical_indicators, data, args.repeat)
+        kernel_ms, kernel_kib = measure(calculate_served_indicators, data, args.repeat)
+
+        print(f"{bars} bars (max relative difference {difference:.1e}, {mismatched_flags} mismatched flags)")
+        print(f"  pandas  {pandas_ms:8.3f} ms  peak {pandas_kib:8.1f} KiB")
+        print(f"  kernel  {kernel_ms:8.3f} ms  peak {kernel_kib:8.1f} KiB  "
+              f"({pandas_ms / kernel_ms:.1f}x faster)")
@@ -0,0 +1,83 @@
+"""
+Startup benchmark for the web app
+Measures, in fresh interpreter processes, the time to import app.py, to create the
+application and to answer the first request, and lists the slowest imports.
+
+    python bench_startup.py --runs 5 --path /api/portfolio
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Runs in a fresh process so every measurement is a cold start
+CHILD_SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+flask_app = app.create_app(load_benchmarks=sys.argv[2])
+created = time.perf_counter()
+response = flask_app.test_client().get(sys.argv[1])
+answered = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_request_ms': (answered - created) * 1000,
+    'time_to_first_response_ms': (answered - start) * 1000,
+    'status': response.status_code,
+    'heavy_modules_loaded': [name for name in ('matplotlib', 'yfinance')
+                             if name in sys.modules and type(sys.modules[name]).__name__ == 'module']
+}))
+'''
+
+TIMINGS = ['import_ms', 'create_app_ms', 'first_request_ms', 'time_to_first_response_ms']
+
+def run_once(path, load_benchmarks):
+    """Measure one cold start"""
+    output = subprocess.run([sys.executable, '-c', CHILD_SCRIPT, path, load_benchmarks],
+                            cwd=APP_DIR, capture_output=True, text=True, check=True).stdout
+    # The app prints progress messages; the measurement is the last line
+    return json.loads(output.strip().splitlines()[-1])
+
+def slowest_imports(top):
+    """(cumulative ms, module) of the slowest imports of app.py, from python -X importtime"""
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                            cwd=APP_DIR, capture_output=True, text=True, check=True).stderr
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # app.py itself and the modules it imports directly (nesting is two spaces per level)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth <= 1:
+            imports.append((int(cumulative) / 1000, name.strip()))
+    return sorted(imports, reverse=True)[:top]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure app import and time to first request')
+    parser.add_argument('--runs', type=int, default=5, help='Cold starts to measure')
+    parser.add_argument('--path', default='/', help='Path of the first request')
+    parser.add_argument('--benchmarks', default='background', choices=['background', 'eager', 'lazy'],
+                        help='Benchmark loading mode passed to create_app')
+    parser.add_argument('--top', type=int, default=10, help='Slowest imports to list')
+    args = parser.parse_args()
+
+    results = [run_once(args.path, args.benchmarks) for _ in range(args.runs)]
+
+    print(f"{args.runs} cold starts, first request GET {args.path} (status {results[-1]['status']})")
+    for timing in TIMINGS:
+        values = [result[timing] for result in results]
+        print(f"  {timing:<28} median {statistics.median(values):8.1f}  min {min(values):8.1f}")
+    print(f"  heavy modules loaded by first request: {results[-1]['heavy_modules_loaded'] or 'none'}")
+
+    if args.top:
+        print("\nSlowest imports of app.py:")
+        for cumulative_ms, name in slowest_imports(args.top):
+            print(f"  {cumulative_ms:8.1f} ms  {name}")
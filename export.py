@@ -0,0 +1,172 @@
+"""
+Streaming bulk export
+Writes indicator frames or fundamental metrics for many symbols as CSV, NDJSON or Parquet
+(Parquet needs pyarrow). Output is produced by generators one symbol at a time, so memory
+use does not grow with the number of symbols exported.
+"""
+
+import io
+import pandas as pd
+from indicator_cache import SIGNAL_FLAGS, VALUE_COLUMNS
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pyarrow_parquet
+except ImportError:
+    pyarrow = None
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+# Columns of an indicator export, as cached for the dashboard
+INDICATOR_COLUMNS = VALUE_COLUMNS + SIGNAL_FLAGS
+
+# Fundamental metrics holding text; every other metric is exported as a number
+FUNDAMENTAL_TEXT_COLUMNS = ('sector', 'industry', 'country')
+
+# Fundamental rows are one per symbol, so they are written in batches of this many rows
+FUNDAMENTAL_BATCH_ROWS = 500
+
+def available_formats():
+    """Export formats usable in this installation"""
+    return [fmt for fmt in EXPORT_FORMATS if fmt != 'parquet' or pyarrow is not None]
+
+def select_columns(requested, available):
+    """Validated column projection (all available columns if requested is empty)"""
+    if not requested:
+        return list(available)
+    unknown = [column for column in requested if column not in available]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+    return list(requested)
+
+def indicator_frames(symbols, load_frame, columns, start=None, end=None):
+    """Yield one DataFrame per symbol with symbol and date columns plus the projected columns
+
+    load_frame(symbol) returns the symbol's indicator DataFrame (empty or None to skip it).
+    """
+    for symbol in symbols:
+        data = load_frame(symbol)
+        if data is None or data.empty:
+            continue
+        data = data.loc[start:end] if (start or end) else data
+        if data.empty:
+            continue
+
+        frame = data.reindex(columns=columns)
+        frame.insert(0, 'date', data.index.strftime('%Y-%m-%d'))
+        frame.insert(0, 'symbol', symbol)
+        yield frame.reset_index(drop=True)
+
+def fundamental_frames(symbols, load_metrics, columns, batch_rows=FUNDAMENTAL_BATCH_ROWS):
+    """Yield DataFrames of up to batch_rows symbols with the projected fundamental metrics
+
+    load_metrics(symbol) returns the symbol's metrics dict (empty or None to skip it).
+    """
+    def batch_frame(rows):
+        frame = pd.DataFrame(rows, columns=['symbol'] + columns)
+        for column in columns:
+            if column not in FUNDAMENTAL_TEXT_COLUMNS:
+                frame[column] = pd.to_numeric(frame[column], errors='coerce').astype('float64')
+        return frame
+
+    rows = []
+    for symbol in symbols:
+        metrics = load_metrics(symbol)
+        if not metrics:
+            continue
+        rows.append({'symbol': symbol, **{column: metrics.get(column) for column in columns}})
+        if len(rows) >= batch_rows:
+            yield batch_frame(rows)
+            rows = []
+    if rows:
+        yield batch_frame(rows)
+
+def csv_chunks(frames):
+    """CSV text, one chunk per frame (the first one with the header)"""
+    header = True
+    for frame in frames:
+        yield frame.to_csv(index=False, header=header)
+        header = False
+
+def ndjson_chunks(frames):
+    """One JSON object per line, one chunk per frame"""
+    for frame in frames:
+        # Widen float32 columns through their shortest repr, so 35.9053 is not written as 35.905300140380859
+        for column in frame.columns[frame.dtypes == 'float32']:
+            frame[column] = frame[column].astype(str).astype('float64')
+        yield frame.to_json(orient='records', lines=True)
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back what was written since the last drain"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def parquet_chunks(frames, schema=None):
+    """Parquet bytes with one row group per frame, streamed as each row group is written"""
+    if pyarrow is None:
+        raise RuntimeError('Parquet export requires pyarrow (pip install pyarrow)')
+
+    sink = _ChunkSink()
+    writer = None
+    try:
+        for frame in frames:
+            table = pyarrow.Table.from_pandas(frame, preserve_index=False)
+            if writer is None:
+                schema = schema or table.schema
+                writer = pyarrow_parquet.ParquetWriter(sink, schema)
+            writer.write_table(table.cast(schema))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        if writer is not None:
+            writer.close()
+    data = sink.drain()
+    if data:
+        yield data
+
+def indicator_schema(columns):
+    """Fixed Parquet schema for indicator exports, so every symbol's row group matches"""
+    fields = [('symbol', pyarrow.string()), ('date', pyarrow.string())]
+    for column in columns:
+        fields.append((column, pyarrow.bool_() if column in SIGNAL_FLAGS else pyarrow.float32()))
+    return pyarrow.schema(fields)
+
+def fundamental_schema(columns):
+    """Fixed Parquet schema for fundamental exports"""
+    fields = [('symbol', pyarrow.string())]
+    for column in columns:
+        fields.append((column, pyarrow.string() if column in FUNDAMENTAL_TEXT_COLUMNS else pyarrow.float64()))
+    return pyarrow.schema(fields)
+
+def export_stream(frames, fmt, schema=None):
+    """Generator of response chunks for frames in fmt ('csv', 'ndjson' or 'parquet')"""
+    if fmt == 'csv':
+        return csv_chunks(frames)
+    if fmt == 'ndjson':
+        return ndjson_chunks(frames)
+    if fmt == 'parquet':
+        return parquet_chunks(frames, schema)
+    raise ValueError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
@@ -0,0 +1,80 @@
+"""
+Compact columnar storage for cached indicator frames
+Keeps only the columns the API and charts consume, as float32, with the signal flags packed into a bitmask
+"""
+
+import weakref
+import numpy as np
+import pandas as pd
+
+# Price/indicator columns served by the API and drawn by the charts
+VALUE_COLUMNS = ['Close', '30_Moving_Avg', 'Smoothed_%D', 'Smoothed_MACD', 'Smoothed_Signal_Line']
+
+# Boolean columns packed into one uint8 per row (bit position = list position)
+SIGNAL_FLAGS = ['Buy_Signal', 'Sell_Signal',
+                'buy_ma', 'buy_stochastic', 'buy_macd',
+                'sell_ma', 'sell_stochastic', 'sell_macd']
+
+# Date indexes shared between symbols that trade on the same calendar
+_shared_indexes = weakref.WeakValueDictionary()
+
+def share_index(index):
+    """Return an identical, already cached index object if one exists"""
+    if len(index) == 0:
+        return index
+
+    key = (len(index), index[0], index[-1])
+    shared = _shared_indexes.get(key)
+    if shared is not None and shared.equals(index):
+        return shared
+
+    _shared_indexes[key] = index
+    return index
+
+def compact_indicator_frame(data):
+    """Convert a full indicator DataFrame into its compact cached form"""
+    n = len(data)
+    values = np.full((len(VALUE_COLUMNS), n), np.nan, dtype=np.float32)
+    flags = np.zeros(n, dtype=np.uint8)
+
+    if n == 0:
+        return {'index': pd.DatetimeIndex([]), 'values': values, 'flags': flags}
+
+    for i, column in enumerate(VALUE_COLUMNS):
+        if column in data.columns:
+            values[i] = data[column].to_numpy(dtype=np.float32, na_value=np.nan)
+
+    for bit, column in enumerate(SIGNAL_FLAGS):
+        if column in data.columns:
+            flags |= data[column].fillna(False).to_numpy(dtype=bool).astype(np.uint8) << bit
+
+    return {
+        'index': share_index(data.index),
+        'values': values,
+        'flags': flags
+    }
+
+def expand_indicator_frame(compact):
+    """Rebuild a DataFrame with the served columns from a compact cached entry"""
+    if compact is None or len(compact['index']) == 0:
+        return pd.DataFrame()
+
+    columns = {column: compact['values'][i] for i, column in enumerate(VALUE_COLUMNS)}
+    flags = compact['flags']
+    for bit, column in enumerate(SIGNAL_FLAGS):
+        columns[column] = ((flags >> bit) & 1).astype(bool)
+
+    return pd.DataFrame(columns, index=compact['index'])
+
+def compact_frame_nbytes(compact):
+    """Approximate memory held by a compact entry, excluding the shared index"""
+    if compact is None:
+        return 0
+    return compact['values'].nbytes + compact['flags'].nbytes
+
+def compact_column(compact, column='Close'):
+    """One value column of a compact cached entry as a float64 Series (None if not cached)"""
+    if compact is None or len(compact['index']) == 0:
+        return None
+    return pd.Series(compact['values'][VALUE_COLUMNS.index(column)].astype(np.float64),
+                     index=compact['index'], name=column)
@@ -0,0 +1,319 @@
+"""
+Technical indicator and buy/sell signal calculations
+The same formulas run on a single symbol's Series or on wide date x symbol DataFrames.
+indicator_kernel computes the served columns for one symbol directly on NumPy arrays.
+"""
+
+import threading
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Default indicator settings; column names (30_Moving_Avg, 12_EMA, ...) stay the same
+# whatever the settings, since the API and charts read them by name
+DEFAULT_INDICATOR_PARAMS = {
+    'ma_window': 30,            # Moving average filter
+    'stoch_window': 14,         # Stochastic high/low lookback
+    'stoch_k_smooth': 3,        # %K smoothing
+    'stoch_d_smooth': 3,        # %D smoothing
+    'stoch_d_long_smooth': 30,  # Smoothed %D
+    'stoch_threshold': 30,      # Level Smoothed %D must cross
+    'macd_fast': 12,
+    'macd_slow': 26,
+    'macd_signal': 9,
+    'macd_smooth': 15,          # Smoothing of MACD and signal line
+    'signal_window': 10         # Bars a condition stays "recent" for the buy/sell confirmation
+}
+
+# Minimum history needed before indicators are calculated
+MIN_HISTORY = 30
+
+def resolve_indicator_params(params=None):
+    """Merge params over the defaults, rejecting unknown or non-positive settings"""
+    resolved = dict(DEFAULT_INDICATOR_PARAMS)
+    for name, value in (params or {}).items():
+        if name not in DEFAULT_INDICATOR_PARAMS:
+            raise ValueError(f"Unknown indicator parameter '{name}'")
+        if isinstance(value, bool) or not isinstance(value, (int, float, np.integer, np.floating)):
+            raise ValueError(f"Indicator parameter '{name}' must be a number")
+        if name == 'stoch_threshold':
+            resolved[name] = value
+            continue
+        # Windows given as whole floats (30.0, e.g. from JSON) are used as integers
+        if not np.isfinite(value) or int(value) != value or value < 1:
+            raise ValueError(f"Indicator parameter '{name}' must be a positive integer")
+        resolved[name] = int(value)
+    return resolved
+
+def _fired_within(flags, window):
+    """True where flags was set in the last `window` bars
+
+    Same result as flags.rolling(window, min_periods=window).max().fillna(False).astype(bool),
+    but computed with one cumulative sum, so wide frames are not processed column by column.
+    """
+    counts = flags.astype('int64').cumsum()
+    prior = counts.shift(window)
+    if len(prior) >= window:
+        prior.iloc[window - 1] = 0
+    return (counts - prior) > 0
+
+def _indicator_columns(high, low, close, params):
+    """Indicator and signal columns for Series or wide DataFrames (one column per symbol)"""
+    columns = {}
+
+    # 30-Day Moving Average
+    columns['30_Moving_Avg'] = close.rolling(window=params['ma_window'], min_periods=1).mean()
+
+    # Stochastic Oscillator
+    period_high = high.rolling(window=params['stoch_window'], min_periods=1).max()
+    period_low = low.rolling(window=params['stoch_window'], min_periods=1).min()
+
+    denominator = (period_high - period_low)
+    denominator = denominator.replace(0, 1e-10)
+    percent_k = (close - period_low) * 100 / denominator
+    columns['%K'] = percent_k.rolling(window=params['stoch_k_smooth'], min_periods=1).mean()
+    columns['%D'] = columns['%K'].rolling(window=params['stoch_d_smooth'], min_periods=1).mean()
+    columns['Smoothed_%D'] = columns['%D'].rolling(window=params['stoch_d_long_smooth'], min_periods=1).mean()
+
+    # MACD
+    columns['12_EMA'] = close.ewm(span=params['macd_fast'], adjust=False).mean()
+    columns['26_EMA'] = close.ewm(span=params['macd_slow'], adjust=False).mean()
+    columns['MACD'] = columns['12_EMA'] - columns['26_EMA']
+    columns['Signal_Line'] = columns['MACD'].ewm(span=params['macd_signal'], adjust=False).mean()
+    columns['Smoothed_MACD'] = columns['MACD'].rolling(window=params['macd_smooth'], min_periods=1).mean()
+    columns['Smoothed_Signal_Line'] = columns['Signal_Line'].rolling(window=params['macd_smooth'], min_periods=1).mean()
+
+    smoothed_d = columns['Smoothed_%D']
+    smoothed_macd = columns['Smoothed_MACD']
+    smoothed_signal = columns['Smoothed_Signal_Line']
+    threshold = params['stoch_threshold']
+    window = params['signal_window']
+
+    # Generate buy/sell signals
+    columns['buy_ma'] = (close > columns['30_Moving_Avg'])
+    columns['buy_stochastic'] = (smoothed_d > threshold) & (smoothed_d.shift(1) <= threshold)
+    columns['buy_macd'] = (smoothed_macd > smoothed_signal) & (smoothed_macd.shift(1) <= smoothed_signal.shift(1))
+
+    columns['sell_ma'] = (close < columns['30_Moving_Avg'])
+    columns['sell_stochastic'] = (smoothed_d < threshold) & (smoothed_d.shift(1) >= threshold)
+    columns['sell_macd'] = (smoothed_macd < smoothed_signal) & (smoothed_macd.shift(1) >= smoothed_signal.shift(1))
+
+    columns['Buy_Signal'] = (
+        _fired_within(columns['buy_ma'], window) &
+        _fired_within(columns['buy_stochastic'], window) &
+        _fired_within(columns['buy_macd'], window)
+    )
+
+    columns['Sell_Signal'] = (
+        _fired_within(columns['sell_ma'], window) &
+        _fired_within(columns['sell_stochastic'], window) &
+        _fired_within(columns['sell_macd'], window)
+    )
+
+    return columns
+
+def calculate_technical_indicators(data, params=None):
+    """Calculate technical indicators (params override DEFAULT_INDICATOR_PARAMS)"""
+    params = resolve_indicator_params(params)
+
+    if isinstance(data.columns, pd.MultiIndex):
+        data.columns = data.columns.droplevel(1)
+
+    if len(data) < MIN_HISTORY:
+        return data
+
+    data = data.sort_index()
+
+    for name, values in _indicator_columns(data['High'], data['Low'], data['Close'], params).items():
+        data[name] = values
+
+    return data
+
+def calculate_signals_batch(high, low, close, params=None):
+    """Calculate Buy_Signal/Sell_Signal for wide date x symbol frames in one vectorized pass
+
+    Symbols may start at different dates (leading NaN rows); results match
+    calculate_technical_indicators on each symbol's own NaN-free history.
+    """
+    params = resolve_indicator_params(params)
+    columns = _indicator_columns(high, low, close, params)
+    window = params['signal_window']
+
+    # Emulate the per-symbol min_periods and minimum-history rules
+    valid_rows = close.notna()
+    bars_seen = valid_rows.cumsum()
+    enough_history = valid_rows.sum() >= MIN_HISTORY
+    mask = valid_rows & (bars_seen >= window) & enough_history
+
+    return columns['Buy_Signal'] & mask, columns['Sell_Signal'] & mask
+
+# Columns written by indicator_kernel: the ones the dashboard serves (see indicator_cache.py)
+KERNEL_VALUE_COLUMNS = ['30_Moving_Avg', 'Smoothed_%D', 'Smoothed_MACD', 'Smoothed_Signal_Line']
+KERNEL_FLAG_COLUMNS = ['Buy_Signal', 'Sell_Signal', 'buy_ma', 'buy_stochastic', 'buy_macd',
+                       'sell_ma', 'sell_stochastic', 'sell_macd']
+
+class IndicatorBuffers:
+    """Preallocated work and output arrays for indicator_kernel, grown as needed"""
+
+    def __init__(self, length=0):
+        self.capacity = 0
+        self.ensure(length)
+
+    def ensure(self, length):
+        if length > self.capacity:
+            capacity = max(length, 2 * self.capacity)
+            self.values = np.empty((len(KERNEL_VALUE_COLUMNS), capacity))
+            self.flags = np.empty((len(KERNEL_FLAG_COLUMNS), capacity), dtype=bool)
+            self.work = np.empty((8, capacity))
+            self.sums = np.empty(capacity + 1)
+            self.positions = np.empty(capacity, dtype=np.int64)
+            self.capacity = capacity
+        return self
+
+# One set of buffers per thread, so concurrent requests never share them
+_thread_buffers = threading.local()
+
+def _buffers(length):
+    if not hasattr(_thread_buffers, 'buffers'):
+        _thread_buffers.buffers = IndicatorBuffers()
+    return _thread_buffers.buffers.ensure(length)
+
+def _rolling_mean(x, window, out, sums, positions):
+    """rolling(window, min_periods=1).mean() with cumulative sums
+
+    While the window holds one repeated value the value itself is returned, as pandas does,
+    so comparisons against the mean agree on flat stretches.
+    """
+    n = len(x)
+    sums[0] = 0.0
+    np.cumsum(x, out=sums[1:n + 1])
+    head = min(window - 1, n)
+    np.divide(sums[1:head + 1], np.arange(1, head + 1), out=out[:head])
+    if n > head:
+        np.subtract(sums[window:n + 1], sums[:n + 1 - window], out=out[head:])
+        out[head:] /= window
+
+    # Start of the run of equal values ending at each bar
+    positions[0] = 0
+    np.multiply(np.arange(1, n), x[1:] != x[:-1], out=positions[1:n])
+    np.maximum.accumulate(positions[:n], out=positions[:n])
+    run_length = np.arange(1, n + 1) - positions[:n]
+    flat = run_length >= np.minimum(np.arange(1, n + 1), window)
+    out[flat] = x[flat]
+    return out
+
+def _rolling_extreme(x, window, out, use_max):
+    """rolling(window, min_periods=1).max() (or .min())"""
+    reduce = np.max if use_max else np.min
+    accumulate = np.maximum.accumulate if use_max else np.minimum.accumulate
+    head = min(window - 1, len(x))
+    accumulate(x[:head], out=out[:head])
+    if len(x) > head:
+        reduce(sliding_window_view(x, window), axis=1, out=out[head:])
+    return out
+
+def _ema(x, span, out):
+    """ewm(span=span, adjust=False).mean() through pandas' own recurrence
+
+    MACD is the difference of two EMAs and its crossings are compared exactly, so any
+    rounding difference from the pandas result (e.g. -3.6e-15 instead of 0 on a flat
+    stretch) would fire spurious crossings.
+    """
+    out[:] = pd.Series(x, copy=False).ewm(span=span, adjust=False).mean().to_numpy()
+    return out
+
+def _fired_within_array(flags, window, out, sums):
+    """_fired_within for one bool array"""
+    n = len(flags)
+    sums[0] = 0.0
+    np.cumsum(flags, out=sums[1:n + 1])
+    out[:] = False
+    if n >= window:
+        np.greater(sums[window:n + 1], sums[:n + 1 - window], out=out[window - 1:])
+    return out
+
+def indicator_kernel(high, low, close, params=None):
+    """Served indicator columns for one symbol from NumPy arrays
+
+    Returns (values, flags): float rows in KERNEL_VALUE_COLUMNS order and bool rows in
+    KERNEL_FLAG_COLUMNS order, matching _indicator_columns. Both are views of per-thread
+    buffers that the next call overwrites; copy them to keep them.
+    """
+    params = resolve_indicator_params(params)
+    high = np.ascontiguousarray(high, dtype=float)
+    low = np.ascontiguousarray(low, dtype=float)
+    close = np.ascontiguousarray(close, dtype=float)
+    n = len(close)
+
+    buffers = _buffers(n)
+    values, flags = buffers.values[:, :n], buffers.flags[:, :n]
+    work = buffers.work[:, :n]
+    sums, positions = buffers.sums, buffers.positions
+    moving_average, smoothed_d, smoothed_macd, smoothed_signal = values
+    buy_signal, sell_signal, buy_ma, buy_stochastic, buy_macd, sell_ma, sell_stochastic, sell_macd = flags
+
+    # 30-Day Moving Average. It is compared with the close itself, where prices rounded to
+    # cents make exact ties common, so it goes through pandas' own rolling sum to resolve
+    # ties identically
+    moving_average[:] = pd.Series(close, copy=False).rolling(window=params['ma_window'], min_periods=1).mean().to_numpy()
+
+    # Stochastic Oscillator: %K -> %D -> Smoothed %D
+    period_high = _rolling_extreme(high, params['stoch_window'], work[0], use_max=True)
+    period_low = _rolling_extreme(low, params['stoch_window'], work[1], use_max=False)
+    denominator = np.subtract(period_high, period_low, out=work[0])
+    denominator[denominator == 0] = 1e-10
+    percent_k = np.subtract(close, period_low, out=work[2])
+    percent_k *= 100
+    percent_k /= denominator
+    k = _rolling_mean(percent_k, params['stoch_k_smooth'], work[3], sums, positions)
+    d = _rolling_mean(k, params['stoch_d_smooth'], work[4], sums, positions)
+    _rolling_mean(d, params['stoch_d_long_smooth'], smoothed_d, sums, positions)
+
+    # MACD and its signal line, both smoothed
+    macd = _ema(close, params['macd_fast'], work[5])
+    macd -= _ema(close, params['macd_slow'], work[6])
+    signal_line = _ema(macd, params['macd_signal'], work[7])
+    _rolling_mean(macd, params['macd_smooth'], smoothed_macd, sums, positions)
+    _rolling_mean(signal_line, params['macd_smooth'], smoothed_signal, sums, positions)
+
+    # Buy/sell conditions; crossings compare with the previous bar
+    threshold = params['stoch_threshold']
+    np.greater(close, moving_average, out=buy_ma)
+    np.less(close, moving_average, out=sell_ma)
+    for out in (buy_stochastic, sell_stochastic, buy_macd, sell_macd):
+        out[0] = False
+    current_d, previous_d = smoothed_d[1:], smoothed_d[:-1]
+    np.logical_and(current_d > threshold, previous_d <= threshold, out=buy_stochastic[1:])
+    np.logical_and(current_d < threshold, previous_d >= threshold, out=sell_stochastic[1:])
+    current_macd, previous_macd = smoothed_macd[1:], smoothed_macd[:-1]
+    current_signal, previous_signal = smoothed_signal[1:], smoothed_signal[:-1]
+    np.logical_and(current_macd > current_signal, previous_macd <= previous_signal, out=buy_macd[1:])
+    np.logical_and(current_macd < current_signal, previous_macd >= previous_signal, out=sell_macd[1:])
+
+    # Confirmation: all three conditions fired within the signal window
+    window = params['signal_window']
+    recent = np.empty((3, n), dtype=bool)
+    for conditions, signal in (((buy_ma, buy_stochastic, buy_macd), buy_signal),
+                               ((sell_ma, sell_stochastic, sell_macd), sell_signal)):
+        for row, condition in zip(recent, conditions):
+            _fired_within_array(condition, window, row, sums)
+        np.logical_and.reduce(recent, axis=0, out=signal)
+
+    return values, flags
+
+def calculate_served_indicators(data, params=None):
+    """calculate_technical_indicators through indicator_kernel, adding only the served columns"""
+    if isinstance(data.columns, pd.MultiIndex):
+        data.columns = data.columns.droplevel(1)
+
+    if len(data) < MIN_HISTORY:
+        return data
+
+    data = data.sort_index()
+    values, flags = indicator_kernel(data['High'].to_numpy(), data['Low'].to_numpy(),
+                                     data['Close'].to_numpy(), params)
+    # Append the outputs as two blocks instead of inserting column by column
+    outputs = [pd.DataFrame(values.T.copy(), index=data.index, columns=KERNEL_VALUE_COLUMNS),
+               pd.DataFrame(flags.T.copy(), index=data.index, columns=KERNEL_FLAG_COLUMNS)]
+    data = data.drop(columns=KERNEL_VALUE_COLUMNS + KERNEL_FLAG_COLUMNS, errors='ignore')
+    return pd.concat([data] + outputs, axis=1)
@@ -0,0 +1,133 @@
+"""
+Live updates over server-sent events
+Background refreshes publish compact diffs (latest price, recommendation changes, new
+signals) to a queue per connected client, so one upstream refresh fans out to every viewer
+instead of each client reloading. Subscribers are per process: under gunicorn every worker
+refreshes and notifies its own clients.
+
+Every open stream holds one server thread, so each process accepts at most MAX_STREAMS of
+them and keeps its other threads for API requests; clients turned away poll instead.
+"""
+
+import queue
+import threading
+import time
+from serialization import dumps_bytes
+
+# Events buffered per client; a slow client loses its oldest events first
+SUBSCRIBER_QUEUE_SIZE = 100
+# Comment lines sent on idle streams so proxies keep the connection open
+KEEPALIVE_INTERVAL = 15
+# Seconds between background refreshes while clients are connected
+REFRESH_INTERVAL = 300
+# Streams open at once per process; werkzeug's threaded server starts a thread per request,
+# gunicorn's gthread workers have a fixed pool (serve.py sets it from --threads)
+MAX_STREAMS = 32
+# Seconds a client turned away should wait before trying to stream again
+STREAM_RETRY_AFTER = 60
+
+# Client queue -> set of subscribed symbols (None for all symbols)
+_subscribers = {}
+_subscribers_lock = threading.Lock()
+
+# Last published snapshot per symbol, used to send only changed fields
+_last_snapshots = {}
+
+_refresher = {'thread': None}
+_refresher_lock = threading.Lock()
+
+def subscribe(symbols=None):
+    """Register a client for updates of symbols (all symbols if None) and return its queue
+
+    Returns None when MAX_STREAMS clients are already subscribed.
+    """
+    client_queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+    with _subscribers_lock:
+        if len(_subscribers) >= MAX_STREAMS:
+            return None
+        _subscribers[client_queue] = set(symbols) if symbols else None
+    return client_queue
+
+def unsubscribe(client_queue):
+    with _subscribers_lock:
+        _subscribers.pop(client_queue, None)
+
+def subscriber_count():
+    return len(_subscribers)
+
+def subscribed_symbols():
+    """Symbols any client is subscribed to (None if a client wants every symbol)"""
+    with _subscribers_lock:
+        symbol_sets = list(_subscribers.values())
+    if any(symbols is None for symbols in symbol_sets):
+        return None
+    return set().union(*symbol_sets)
+
+def publish(event, data, symbol=None):
+    """Queue an event for every client subscribed to symbol"""
+    with _subscribers_lock:
+        targets = [client_queue for client_queue, symbols in _subscribers.items()
+                   if symbols is None or symbol is None or symbol in symbols]
+
+    for client_queue in targets:
+        try:
+            client_queue.put_nowait((event, data))
+        except queue.Full:
+            try:
+                client_queue.get_nowait()
+            except queue.Empty:
+                pass
+            client_queue.put_nowait((event, data))
+    return len(targets)
+
+def snapshot_changes(symbol, snapshot):
+    """Fields of snapshot that differ from the last one published for symbol"""
+    previous = _last_snapshots.get(symbol)
+    _last_snapshots[symbol] = snapshot
+    if previous is None:
+        return dict(snapshot)
+    return {key: value for key, value in snapshot.items() if previous.get(key) != value}
+
+def forget_snapshot(symbol):
+    """Drop the stored snapshot, so the next update for symbol is sent in full"""
+    _last_snapshots.pop(symbol, None)
+
+def format_event(event, data):
+    """Encode one server-sent event"""
+    return f"event: {event}\ndata: {dumps_bytes(data).decode()}\n\n"
+
+def event_stream(client_queue, initial_events=()):
+    """Generator of server-sent events for one client; unsubscribes when the client disconnects"""
+    try:
+        for event, data in initial_events:
+            yield format_event(event, data)
+        while True:
+            try:
+                event, data = client_queue.get(timeout=KEEPALIVE_INTERVAL)
+            except queue.Empty:
+                yield ': keepalive\n\n'
+                continue
+            yield format_event(event, data)
+    finally:
+        unsubscribe(client_queue)
+
+def start_refresher(refresh, interval=REFRESH_INTERVAL):
+    """Start (once per process) a daemon thread calling refresh(symbols) while clients are connected"""
+    with _refresher_lock:
+        if _refresher['thread'] is not None and _refresher['thread'].is_alive():
+            return _refresher['thread']
+
+        def run():
+            while True:
+                time.sleep(interval)
+                if not subscriber_count():
+                    continue
+                try:
+                    refresh(subscribed_symbols())
+                except Exception as e:
+                    print(f"Error in live update refresh: {e}")
+
+        thread = threading.Thread(target=run, name='live-refresher', daemon=True)
+        thread.start()
+        _refresher['thread'] = thread
+        return thread
@@ -0,0 +1,283 @@
+"""
+Load and soak test harness
+Starts the app in-process on a threaded werkzeug server with the offline data backend
+(see offline_data.py), in a scratch working directory, and replays a dashboard traffic mix
+from concurrent virtual users:
+
+- every symbol change fires GET /api/stock/<symbol> and GET /api/chart/<symbol> together
+- some users add a symbol to the portfolio and later remove it
+- a background client POSTs /api/benchmarks/refresh periodically
+
+Every report interval it prints throughput, p50/p99 latency, error rate and the process RSS,
+and at the end a per-endpoint summary with RSS growth, so cache leaks (RSS climbing with a
+steady request mix) and lock contention (p99 far above p50) show up early.
+
+    python loadtest.py --users 20 --duration 60
+    python loadtest.py --users 8 --duration 3600 --report-interval 60 --json soak.json
+"""
+
+import argparse
+import contextlib
+import http.client
+import json
+import logging
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+DEFAULT_SYMBOLS = ['AAPL', 'MSFT', 'GOOGL', 'AMZN', 'NVDA', 'JPM', 'XOM', 'JNJ', 'PG', 'KO']
+# Symbols users add to and remove from their portfolio
+CHURN_SYMBOLS = ['ZTS', 'ROK', 'DE', 'ITW', 'MMC', 'AON', 'CME', 'ICE']
+
+# Progress and summary lines; the app's own output (stdout prints and werkzeug's per-request
+# log) is muted unless --verbose, server errors and tracebacks are still shown
+_report_stream = sys.stdout
+
+def report(line=''):
+    print(line, file=_report_stream, flush=True)
+
+def current_rss_mb():
+    """Resident set size of this process in MB (peak RSS where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError):
+        # ru_maxrss is KB on Linux, bytes on macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+class Recorder:
+    """Thread-safe latency and error samples per endpoint, with a rolling window for reports"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.window = []
+        self.window_errors = 0
+
+    def record(self, endpoint, seconds, ok):
+        with self.lock:
+            self.samples[endpoint].append(seconds)
+            self.window.append(seconds)
+            if not ok:
+                self.errors[endpoint] += 1
+                self.window_errors += 1
+
+    def take_window(self):
+        with self.lock:
+            window, errors = self.window, self.window_errors
+            self.window, self.window_errors = [], 0
+        return window, errors
+
+def percentiles_ms(samples):
+    if not samples:
+        return None, None
+    values = np.asarray(samples) * 1000
+    return round(float(np.percentile(values, 50)), 1), round(float(np.percentile(values, 99)), 1)
+
+class Client:
+    """One keep-alive HTTP connection that records every request"""
+
+    def __init__(self, host, port, recorder, timeout=120):
+        self.host, self.port, self.timeout = host, port, timeout
+        self.recorder = recorder
+        self.connection = None
+
+    def request(self, method, path, endpoint, body=None):
+        start = time.perf_counter()
+        ok = False
+        try:
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            headers = {'Accept-Encoding': 'gzip'}
+            payload = None
+            if body is not None:
+                payload = json.dumps(body)
+                headers['Content-Type'] = 'application/json'
+            self.connection.request(method, path, body=payload, headers=headers)
+            response = self.connection.getresponse()
+            response.read()
+            # 400/404 are expected answers (e.g. adding a symbol another user just added)
+            ok = response.status < 500
+        except (OSError, http.client.HTTPException):
+            if self.connection is not None:
+                self.connection.close()
+            self.connection = None
+        self.recorder.record(endpoint, time.perf_counter() - start, ok)
+        return ok
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+def virtual_user(user_id, host, port, recorder, stop, symbols, think_time, churn_probability):
+    """A dashboard user switching symbols and occasionally editing the portfolio"""
+    rng = random.Random(user_id)
+    stock_client = Client(host, port, recorder)
+    chart_client = Client(host, port, recorder)
+    added = []
+
+    with ThreadPoolExecutor(max_workers=2) as burst:
+        while not stop.is_set():
+            # Selecting a symbol loads the stock view and the chart at the same time
+            symbol = rng.choice(symbols)
+            requests = [burst.submit(stock_client.request, 'GET', f'/api/stock/{symbol}', '/api/stock'),
+                        burst.submit(chart_client.request, 'GET', f'/api/chart/{symbol}', '/api/chart')]
+            for request in requests:
+                request.result()
+
+            if rng.random() < churn_probability:
+                if added and rng.random() < 0.5:
+                    stock_client.request('POST', '/api/portfolio/remove', '/api/portfolio/remove',
+                                         {'symbol': added.pop()})
+                else:
+                    new_symbol = rng.choice(CHURN_SYMBOLS)
+                    if stock_client.request('POST', '/api/portfolio/add', '/api/portfolio/add',
+                                            {'symbol': new_symbol}):
+                        added.append(new_symbol)
+
+            stop.wait(rng.expovariate(1.0 / think_time) if think_time > 0 else 0)
+
+    for symbol in added:
+        stock_client.request('POST', '/api/portfolio/remove', '/api/portfolio/remove', {'symbol': symbol})
+    stock_client.close()
+    chart_client.close()
+
+def benchmark_refresher(host, port, recorder, stop, interval, force):
+    """Background benchmark refreshes, as an operator would trigger them"""
+    client = Client(host, port, recorder, timeout=600)
+    path = '/api/benchmarks/refresh' + ('?force=true' if force else '')
+    while not stop.wait(interval):
+        client.request('POST', path, '/api/benchmarks/refresh')
+    client.close()
+
+def start_server(latency, symbols):
+    """Serve a fresh app with the offline backend on an ephemeral port; returns (server, backend)"""
+    from werkzeug.serving import make_server
+    import app as stock_app
+    import offline_data
+    import portfolios
+
+    backend = offline_data.install(stock_app, latency=latency)
+    for symbol in symbols:
+        portfolios.add_holding(portfolios.DEFAULT_PORTFOLIO, symbol, f'{symbol} Holdings Inc.')
+
+    flask_app = stock_app.create_app(load_benchmarks='eager')
+    server = make_server('127.0.0.1', 0, flask_app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='loadtest-server', daemon=True).start()
+    return server, backend
+
+def run(args):
+    symbols = args.symbols or DEFAULT_SYMBOLS
+    recorder = Recorder()
+    stop = threading.Event()
+
+    server, backend = start_server(args.latency, symbols)
+    host, port = server.server_address[:2]
+    report(f"Serving on http://{host}:{port} with the offline backend (latency {args.latency * 1000:.0f} ms)")
+
+    threads = [threading.Thread(target=virtual_user, name=f'user-{i}',
+                                args=(i, host, port, recorder, stop, symbols, args.think_time, args.churn))
+               for i in range(args.users)]
+    if args.benchmark_interval > 0:
+        threads.append(threading.Thread(target=benchmark_refresher, name='benchmark-refresher',
+                                        args=(host, port, recorder, stop, args.benchmark_interval,
+                                              args.force_benchmarks)))
+
+    start_time = time.perf_counter()
+    for thread in threads:
+        thread.start()
+
+    rss_samples = []
+    report(f"{'elapsed':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'RSS MB':>8}")
+    try:
+        while time.perf_counter() - start_time < args.duration:
+            time.sleep(min(args.report_interval, max(args.duration - (time.perf_counter() - start_time), 0.1)))
+            window, errors = recorder.take_window()
+            elapsed = time.perf_counter() - start_time
+            rss = current_rss_mb()
+            rss_samples.append((round(elapsed, 1), round(rss, 1)))
+            p50, p99 = percentiles_ms(window)
+            report(f"{elapsed:8.0f} {len(window) / args.report_interval:8.1f} {p50 or 0:8.1f} {p99 or 0:8.1f} "
+                  f"{errors:7d} {rss:8.1f}")
+    except KeyboardInterrupt:
+        report("Interrupted, stopping users...")
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=60)
+        server.shutdown()
+
+    elapsed = time.perf_counter() - start_time
+    endpoints = {}
+    for endpoint, samples in sorted(recorder.samples.items()):
+        p50, p99 = percentiles_ms(samples)
+        endpoints[endpoint] = {
+            'requests': len(samples),
+            'errors': recorder.errors[endpoint],
+            'error_rate': round(recorder.errors[endpoint] / len(samples), 4),
+            'p50_ms': p50,
+            'p99_ms': p99,
+            'throughput': round(len(samples) / elapsed, 2)
+        }
+
+    # Growth after warm-up: the first sample includes the initial fetches and imports
+    baseline = rss_samples[0][1] if rss_samples else None
+    summary = {
+        'users': args.users,
+        'duration_seconds': round(elapsed, 1),
+        'total_requests': sum(entry['requests'] for entry in endpoints.values()),
+        'endpoints': endpoints,
+        'rss_mb': rss_samples,
+        'rss_growth_mb': round(rss_samples[-1][1] - baseline, 1) if rss_samples else None,
+        'backend_calls': dict(backend.calls)
+    }
+
+    report(f"\n{'endpoint':<28} {'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'error %':>8}")
+    for endpoint, entry in endpoints.items():
+        report(f"{endpoint:<28} {entry['requests']:>9} {entry['throughput']:>8.1f} {entry['p50_ms']:>8.1f} "
+              f"{entry['p99_ms']:>8.1f} {entry['error_rate'] * 100:>8.2f}")
+    report(f"RSS growth after the first interval: {summary['rss_growth_mb']} MB; "
+          f"backend calls: {summary['backend_calls']}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=2)
+    return summary
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay dashboard traffic against the app with offline data')
+    parser.add_argument('--users', type=int, default=10, help='Concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=60, help='Seconds to run')
+    parser.add_argument('--think-time', type=float, default=0.5, help='Mean seconds between a user\'s actions')
+    parser.add_argument('--churn', type=float, default=0.05, help='Chance per action of a portfolio add/remove')
+    parser.add_argument('--benchmark-interval', type=float, default=30,
+                        help='Seconds between background benchmark refreshes (0 disables them)')
+    parser.add_argument('--force-benchmarks', action='store_true', help='Force full benchmark refreshes')
+    parser.add_argument('--latency', type=float, default=0.05, help='Simulated data backend latency in seconds')
+    parser.add_argument('--symbols', nargs='+', help='Portfolio symbols (default: 10 large caps)')
+    parser.add_argument('--report-interval', type=float, default=10, help='Seconds between progress lines')
+    parser.add_argument('--json', help='Also write the summary to this file')
+    parser.add_argument('--verbose', action='store_true', help='Show the app\'s own log output')
+    parser.add_argument('--workdir', help='Working directory for the app\'s files (default: a temporary one)')
+    args = parser.parse_args()
+
+    # The app reads and writes its data files relative to the working directory
+    workdir = args.workdir or tempfile.mkdtemp(prefix='loadtest-')
+    os.chdir(workdir)
+    if not args.verbose:
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(sys.stdout if args.verbose else devnull):
+            run(args)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
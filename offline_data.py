@@ -0,0 +1,154 @@
+"""
+Offline market data backend
+A drop-in for the parts of yfinance the app uses (download and Ticker info / quarterly
+statements) that serves deterministic synthetic data per symbol, with optional simulated
+network latency. Used by the load test harness so runs are repeatable and never touch
+Yahoo Finance:
+
+    import app, offline_data
+    offline_data.install(app, latency=0.05)
+"""
+
+import re
+import threading
+import time
+import zlib
+import numpy as np
+import pandas as pd
+
+SECTORS = {
+    'Technology': 'Software - Infrastructure',
+    'Healthcare': 'Drug Manufacturers - General',
+    'Financial Services': 'Banks - Diversified',
+    'Consumer Cyclical': 'Specialty Retail',
+    'Consumer Defensive': 'Beverages - Non-Alcoholic',
+    'Utilities': 'Utilities - Regulated Electric',
+    'Energy': 'Oil & Gas Integrated',
+    'Industrials': 'Aerospace & Defense',
+    'Materials': 'Specialty Chemicals',
+    'Real Estate': 'REIT - Specialty',
+    'Communication Services': 'Entertainment'
+}
+
+# Quarters of statements served per symbol
+STATEMENT_QUARTERS = 8
+
+def _seed(symbol):
+    return zlib.crc32(symbol.encode())
+
+def _period_days(period):
+    match = re.fullmatch(r'(\d+)(d|mo|y)', period or '300d')
+    if not match:
+        return 300
+    count, unit = int(match.group(1)), match.group(2)
+    return count * {'d': 1, 'mo': 30, 'y': 365}[unit]
+
+class OfflineTicker:
+    """yfinance.Ticker lookalike with synthetic info and quarterly statements"""
+
+    def __init__(self, symbol, backend):
+        self.ticker = symbol
+        self._backend = backend
+
+    @property
+    def info(self):
+        self._backend.wait()
+        rng = np.random.default_rng(_seed(self.ticker))
+        sector = list(SECTORS)[int(rng.integers(len(SECTORS)))]
+        price = float(np.round(rng.uniform(20, 500), 2))
+        return {
+            'symbol': self.ticker,
+            'longName': f'{self.ticker} Holdings Inc.',
+            'sector': sector,
+            'industry': SECTORS[sector],
+            'country': 'United States',
+            'marketCap': float(rng.uniform(1e9, 2e12)),
+            'sharesOutstanding': float(rng.uniform(1e8, 1e10)),
+            'trailingPE': float(rng.uniform(5, 60)),
+            'forwardPE': float(rng.uniform(5, 50)),
+            'priceToBook': float(rng.uniform(0.5, 20)),
+            'priceToSalesTrailing12Months': float(rng.uniform(0.5, 15)),
+            'profitMargins': float(rng.uniform(-0.05, 0.35)),
+            'operatingMargins': float(rng.uniform(0, 0.4)),
+            'returnOnAssets': float(rng.uniform(0, 0.2)),
+            'returnOnEquity': float(rng.uniform(-0.05, 0.5)),
+            'debtToEquity': float(rng.uniform(0, 250)),
+            'currentRatio': float(rng.uniform(0.5, 3)),
+            'quickRatio': float(rng.uniform(0.3, 2.5)),
+            'revenueGrowth': float(rng.uniform(-0.1, 0.4)),
+            'earningsGrowth': float(rng.uniform(-0.2, 0.5)),
+            'dividendYield': float(rng.uniform(0, 0.05)),
+            'beta': float(rng.uniform(0.4, 2)),
+            'fullTimeEmployees': int(rng.integers(1000, 200000)),
+            'currentPrice': price,
+            'previousClose': price
+        }
+
+    def _statement(self, rows, offset):
+        self._backend.wait()
+        rng = np.random.default_rng(_seed(self.ticker) + offset)
+        quarters = pd.date_range(end=pd.Timestamp.now().normalize(), periods=STATEMENT_QUARTERS, freq='Q')[::-1]
+        base = rng.uniform(1e8, 1e10)
+        values = {name: base * scale * np.cumprod(1 + rng.normal(-0.02, 0.05, STATEMENT_QUARTERS))
+                  for name, scale in rows}
+        return pd.DataFrame(values, index=quarters).T
+
+    @property
+    def quarterly_financials(self):
+        return self._statement([('Total Revenue', 1.0), ('Net Income', 0.15)], 1)
+
+    @property
+    def quarterly_cashflow(self):
+        return self._statement([('Operating Cash Flow', 0.2), ('Free Cash Flow', 0.1)], 2)
+
+    @property
+    def quarterly_balance_sheet(self):
+        return self._statement([('Stockholders Equity', 4.0), ('Total Assets', 10.0)], 3)
+
+class OfflineMarketData:
+    """yfinance module lookalike: download() and Ticker() over synthetic data"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = {'download': 0, 'ticker': 0}
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def Ticker(self, symbol):
+        with self._lock:
+            self.calls['ticker'] += 1
+        return OfflineTicker(symbol, self)
+
+    def download(self, tickers, period='300d', interval='1d', **kwargs):
+        """Daily (or intraday) OHLCV bars for one symbol, as yf.download returns them"""
+        with self._lock:
+            self.calls['download'] += 1
+        self.wait()
+
+        symbol = tickers if isinstance(tickers, str) else tickers[0]
+        if interval == '1d':
+            index = pd.bdate_range(end=pd.Timestamp.now().normalize(), periods=int(_period_days(period) * 5 / 7))
+        else:
+            minutes = int(re.sub(r'\D', '', interval) or 5)
+            index = pd.date_range(end=pd.Timestamp.now().floor('min'), periods=390, freq=f'{minutes}min')
+
+        # Same series for a symbol on every call, ending today
+        rng = np.random.default_rng(_seed(symbol))
+        close = np.round(rng.uniform(20, 500) * np.exp(np.cumsum(rng.normal(0, 0.015, len(index)))), 2)
+        spread = np.abs(rng.normal(0, 0.01, len(index)))
+        return pd.DataFrame({
+            'Open': close,
+            'High': np.round(close * (1 + spread), 2),
+            'Low': np.round(close * (1 - spread), 2),
+            'Close': close,
+            'Volume': rng.integers(1e5, 1e7, len(index)).astype(float)
+        }, index=pd.DatetimeIndex(index, name='Date'))
+
+def install(app_module, latency=0.0):
+    """Point app_module's yfinance reference at an offline backend and return the backend"""
+    backend = OfflineMarketData(latency=latency)
+    app_module.yf = backend
+    return backend
@@ -0,0 +1,169 @@
+"""
+Named portfolios stored in SQLite
+Each portfolio (per user or per strategy) holds a set of symbols. The holdings table is
+indexed by symbol as well, so "which portfolios hold AAPL" and "is AAPL still referenced"
+are index lookups. The app keeps one shared cache entry per symbol and uses these
+reference counts to drop entries no portfolio holds any more.
+
+On first use the database is created and an existing portfolio.json is imported as the
+'default' portfolio.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+PORTFOLIO_DB_FILE = 'portfolios.db'
+LEGACY_PORTFOLIO_FILE = 'portfolio.json'
+DEFAULT_PORTFOLIO = 'default'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS portfolios (
+    name TEXT PRIMARY KEY,
+    owner TEXT,
+    created TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS holdings (
+    portfolio TEXT NOT NULL REFERENCES portfolios(name) ON DELETE CASCADE,
+    symbol TEXT NOT NULL,
+    name TEXT,
+    date_added TEXT NOT NULL,
+    PRIMARY KEY (portfolio, symbol)
+);
+CREATE INDEX IF NOT EXISTS holdings_by_symbol ON holdings (symbol, portfolio);
+"""
+
+# One connection per thread and database path
+_connections = threading.local()
+_initialized = set()
+_init_lock = threading.Lock()
+
+def connect(path=PORTFOLIO_DB_FILE):
+    """This thread's connection to the portfolio database, creating it on first use"""
+    connections = getattr(_connections, 'by_path', None)
+    if connections is None or _connections.pid != os.getpid():
+        # A forked worker never reuses its parent's connections; they are not fork safe
+        connections = _connections.by_path = {}
+        _connections.pid = os.getpid()
+
+    conn = connections.get(path)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA foreign_keys = ON')
+        connections[path] = conn
+
+    if path not in _initialized:
+        with _init_lock:
+            if path not in _initialized:
+                _initialize(conn)
+                _initialized.add(path)
+    return conn
+
+def close_connections():
+    """Close this thread's connections (e.g. in a master process before it forks workers)"""
+    connections = getattr(_connections, 'by_path', None) or {}
+    _connections.by_path = {}
+    _connections.pid = os.getpid()
+    for conn in connections.values():
+        conn.close()
+
+def _initialize(conn):
+    with conn:
+        conn.executescript(SCHEMA)
+        if conn.execute('SELECT COUNT(*) FROM portfolios').fetchone()[0]:
+            return
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        conn.execute('INSERT INTO portfolios (name, owner, created) VALUES (?, NULL, ?)',
+                     (DEFAULT_PORTFOLIO, now))
+        for stock in _load_legacy_portfolio():
+            conn.execute('INSERT OR IGNORE INTO holdings (portfolio, symbol, name, date_added) VALUES (?, ?, ?, ?)',
+                         (DEFAULT_PORTFOLIO, stock['symbol'], stock.get('name', stock['symbol']),
+                          stock.get('date_added', now[:10])))
+
+def _load_legacy_portfolio():
+    try:
+        if os.path.exists(LEGACY_PORTFOLIO_FILE):
+            with open(LEGACY_PORTFOLIO_FILE, 'r') as f:
+                portfolio = json.load(f).get('portfolio', [])
+            print(f"Imported {len(portfolio)} stocks from {LEGACY_PORTFOLIO_FILE} into the '{DEFAULT_PORTFOLIO}' portfolio")
+            return portfolio
+    except Exception as e:
+        print(f"Error importing {LEGACY_PORTFOLIO_FILE}: {e}")
+    return []
+
+def list_portfolios(path=PORTFOLIO_DB_FILE):
+    """Every portfolio with its owner and number of holdings"""
+    rows = connect(path).execute(
+        'SELECT p.name, p.owner, p.created, COUNT(h.symbol) AS holdings '
+        'FROM portfolios p LEFT JOIN holdings h ON h.portfolio = p.name '
+        'GROUP BY p.name ORDER BY p.name').fetchall()
+    return [dict(row) for row in rows]
+
+def portfolio_exists(name, path=PORTFOLIO_DB_FILE):
+    return connect(path).execute('SELECT 1 FROM portfolios WHERE name = ?', (name,)).fetchone() is not None
+
+def create_portfolio(name, owner=None, path=PORTFOLIO_DB_FILE):
+    """Create an empty portfolio; returns False if the name is taken"""
+    conn = connect(path)
+    try:
+        with conn:
+            conn.execute('INSERT INTO portfolios (name, owner, created) VALUES (?, ?, ?)',
+                         (name, owner, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+        return True
+    except sqlite3.IntegrityError:
+        return False
+
+def delete_portfolio(name, path=PORTFOLIO_DB_FILE):
+    """Delete a portfolio and its holdings; returns its symbols (None if it does not exist)"""
+    conn = connect(path)
+    with conn:
+        symbols = [row['symbol'] for row in
+                   conn.execute('SELECT symbol FROM holdings WHERE portfolio = ?', (name,))]
+        if conn.execute('DELETE FROM portfolios WHERE name = ?', (name,)).rowcount == 0:
+            return None
+    return symbols
+
+def portfolio_holdings(name=DEFAULT_PORTFOLIO, path=PORTFOLIO_DB_FILE):
+    """Holdings of a portfolio as [{'symbol', 'name', 'date_added'}] sorted by symbol"""
+    rows = connect(path).execute(
+        'SELECT symbol, name, date_added FROM holdings WHERE portfolio = ? ORDER BY symbol',
+        (name,)).fetchall()
+    return [dict(row) for row in rows]
+
+def add_holding(name, symbol, company_name, path=PORTFOLIO_DB_FILE):
+    """Add symbol to a portfolio; returns the new holding (None if it is already held)"""
+    holding = {'symbol': symbol, 'name': company_name, 'date_added': datetime.now().strftime('%Y-%m-%d')}
+    conn = connect(path)
+    try:
+        with conn:
+            conn.execute('INSERT INTO holdings (portfolio, symbol, name, date_added) VALUES (?, ?, ?, ?)',
+                         (name, symbol, company_name, holding['date_added']))
+        return holding
+    except sqlite3.IntegrityError:
+        return None
+
+def remove_holding(name, symbol, path=PORTFOLIO_DB_FILE):
+    """Remove symbol from a portfolio; returns False if it was not held"""
+    conn = connect(path)
+    with conn:
+        removed = conn.execute('DELETE FROM holdings WHERE portfolio = ? AND symbol = ?',
+                               (name, symbol)).rowcount
+    return removed > 0
+
+def symbol_portfolios(symbol, path=PORTFOLIO_DB_FILE):
+    """Names of the portfolios holding symbol"""
+    rows = connect(path).execute('SELECT portfolio FROM holdings WHERE symbol = ? ORDER BY portfolio',
+                                 (symbol,)).fetchall()
+    return [row['portfolio'] for row in rows]
+
+def symbol_refcount(symbol, path=PORTFOLIO_DB_FILE):
+    """Number of portfolios holding symbol"""
+    return connect(path).execute('SELECT COUNT(*) FROM holdings WHERE symbol = ?', (symbol,)).fetchone()[0]
+
+def referenced_symbols(path=PORTFOLIO_DB_FILE):
+    """{symbol: number of portfolios holding it} over all portfolios"""
+    rows = connect(path).execute('SELECT symbol, COUNT(*) FROM holdings GROUP BY symbol ORDER BY symbol').fetchall()
+    return {symbol: count for symbol, count in rows}
@@ -0,0 +1,228 @@
+"""
+Memory-mapped price history store
+One .npy file per OHLCV field laid out date x symbol (column-major, so each symbol's
+history is one contiguous block), plus a symbol index. Files are opened with
+mmap_mode='r', so every worker process shares the same pages through the OS cache.
+"""
+
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+
+PRICE_STORE_DIR = 'price_store'
+PRICE_FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+METADATA_FILE = 'symbols.json'
+DATES_FILE = 'dates.npy'
+
+# Store contents older than this are not used for the live dashboard
+PRICE_STORE_MAX_AGE = timedelta(hours=24)
+
+# Opened stores per path, reopened when the metadata file changes
+_open_stores = {}
+
+def _field_file(path, field):
+    return os.path.join(path, f'{field}.npy')
+
+def write_price_store(histories, path=PRICE_STORE_DIR):
+    """Write {symbol: OHLCV DataFrame} into a memory-mapped store at path"""
+    os.makedirs(path, exist_ok=True)
+
+    histories = {symbol: data for symbol, data in histories.items()
+                 if data is not None and not data.empty}
+    symbols = sorted(histories)
+
+    all_dates = pd.DatetimeIndex([])
+    for data in histories.values():
+        all_dates = all_dates.union(pd.DatetimeIndex(data.index).tz_localize(None))
+    dates = all_dates.sort_values()
+
+    dates_tmp = os.path.join(path, DATES_FILE + '.tmp')
+    with open(dates_tmp, 'wb') as f:
+        np.save(f, dates.values.astype('datetime64[ns]').view('int64'))
+
+    field_tmps = {}
+    for field in PRICE_FIELDS:
+        tmp_file = _field_file(path, field) + '.tmp'
+        array = np.lib.format.open_memmap(tmp_file, mode='w+', dtype=np.float64,
+                                          shape=(len(dates), len(symbols)), fortran_order=True)
+        array[:] = np.nan
+        for j, symbol in enumerate(symbols):
+            data = histories[symbol]
+            if field not in data.columns:
+                continue
+            positions = dates.get_indexer(pd.DatetimeIndex(data.index).tz_localize(None))
+            array[positions, j] = data[field].to_numpy(dtype=np.float64, na_value=np.nan)
+        array.flush()
+        del array
+        field_tmps[field] = tmp_file
+
+    os.replace(dates_tmp, os.path.join(path, DATES_FILE))
+    for field, tmp_file in field_tmps.items():
+        os.replace(tmp_file, _field_file(path, field))
+
+    # Metadata is written last; readers key their mapping on it
+    metadata = {
+        'symbols': symbols,
+        'fields': PRICE_FIELDS,
+        'total_dates': len(dates),
+        'first_date': dates[0].strftime('%Y-%m-%d') if len(dates) else None,
+        'last_date': dates[-1].strftime('%Y-%m-%d') if len(dates) else None,
+        'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+    metadata_tmp = os.path.join(path, METADATA_FILE + '.tmp')
+    with open(metadata_tmp, 'w') as f:
+        json.dump(metadata, f, indent=2)
+    os.replace(metadata_tmp, os.path.join(path, METADATA_FILE))
+
+    print(f"Price store written to {path}: {len(symbols)} symbols x {len(dates)} dates")
+    return True
+
+def open_price_store(path=PRICE_STORE_DIR):
+    """Open the store at path read-only (None if it does not exist)"""
+    metadata_file = os.path.join(path, METADATA_FILE)
+    if not os.path.exists(metadata_file):
+        return None
+
+    version = os.stat(metadata_file).st_mtime_ns
+    store = _open_stores.get(path)
+    if store is not None and store['version'] == version:
+        return store
+
+    try:
+        with open(metadata_file, 'r') as f:
+            metadata = json.load(f)
+
+        dates = pd.DatetimeIndex(np.load(os.path.join(path, DATES_FILE)).view('datetime64[ns]'))
+        fields = {field: np.load(_field_file(path, field), mmap_mode='r')
+                  for field in metadata.get('fields', PRICE_FIELDS)}
+
+        store = {
+            'path': path,
+            'version': version,
+            'metadata': metadata,
+            'symbols': metadata['symbols'],
+            'symbol_index': {symbol: j for j, symbol in enumerate(metadata['symbols'])},
+            'dates': dates,
+            'fields': fields
+        }
+        _open_stores[path] = store
+        return store
+    except Exception as e:
+        print(f"Error opening price store at {path}: {e}")
+        return None
+
+def store_updated_at(store):
+    """When the store was last rebuilt (None without a store)"""
+    if store is None:
+        return None
+    return datetime.strptime(store['metadata']['last_updated'], '%Y-%m-%d %H:%M:%S')
+
+def is_store_fresh(store, max_age=PRICE_STORE_MAX_AGE):
+    """Check whether the store was rebuilt recently enough to serve live views"""
+    if store is None:
+        return False
+    return datetime.now() - store_updated_at(store) < max_age
+
+def symbol_arrays(store, symbol, start=None):
+    """Zero-copy views of one symbol's fields, trimmed to its traded date range"""
+    j = store['symbol_index'].get(symbol)
+    if j is None:
+        return None
+
+    close = store['fields']['Close'][:, j]
+    valid = np.flatnonzero(~np.isnan(close))
+    if len(valid) == 0:
+        return None
+
+    first, last = valid[0], valid[-1] + 1
+    if start is not None:
+        first = max(first, store['dates'].searchsorted(pd.Timestamp(start)))
+
+    arrays = {field: values[first:last, j] for field, values in store['fields'].items()}
+    arrays['dates'] = store['dates'][first:last]
+    return arrays
+
+def symbol_history(store, symbol, start=None):
+    """OHLCV DataFrame for one symbol, shaped like the yf.download() output"""
+    arrays = symbol_arrays(store, symbol, start=start)
+    if arrays is None:
+        return None
+
+    dates = arrays.pop('dates')
+    data = pd.DataFrame(arrays, index=dates, copy=False)
+    data.index.name = 'Date'
+    return data.dropna()
+
+def matrix(store, field, symbols=None, start=None):
+    """Date x symbol view of one field (a column subset is gathered, not a view)"""
+    values = store['fields'][field]
+    first = 0 if start is None else store['dates'].searchsorted(pd.Timestamp(start))
+
+    if symbols is None:
+        return pd.DataFrame(values[first:], index=store['dates'][first:],
+                            columns=store['symbols'], copy=False)
+
+    columns = [s for s in symbols if s in store['symbol_index']]
+    positions = [store['symbol_index'][s] for s in columns]
+    return pd.DataFrame(values[first:, positions], index=store['dates'][first:], columns=columns)
+
+def read_all_histories(store):
+    """Load every symbol's history (used when rewriting the store)"""
+    histories = {}
+    for symbol in store['symbols']:
+        data = symbol_history(store, symbol)
+        if data is not None:
+            histories[symbol] = data.copy()
+    return histories
+
+def download_price_store(symbols, path=PRICE_STORE_DIR, period='10y', batch_size=100):
+    """Download daily histories for symbols in batches and merge them into the store"""
+    import yfinance as yf
+
+    existing = open_price_store(path)
+    histories = read_all_histories(existing) if existing else {}
+
+    symbols = sorted(set(symbols))
+    for start in range(0, len(symbols), batch_size):
+        batch = symbols[start:start + batch_size]
+        print(f"Downloading {start + 1}-{start + len(batch)} of {len(symbols)} symbols...")
+        try:
+            data = yf.download(batch, period=period, interval='1d', auto_adjust=True,
+                               group_by='ticker', threads=True, progress=False)
+        except Exception as e:
+            print(f"Error downloading batch starting at {batch[0]}: {e}")
+            continue
+
+        for symbol in batch:
+            try:
+                if isinstance(data.columns, pd.MultiIndex):
+                    if symbol not in data.columns.get_level_values(0):
+                        continue
+                    symbol_data = data[symbol]
+                else:
+                    symbol_data = data
+                symbol_data = symbol_data.dropna(how='all')
+                if not symbol_data.empty:
+                    histories[symbol] = symbol_data
+            except Exception as e:
+                print(f"Error reading downloaded data for {symbol}: {e}")
+
+    # Release our own mapping before the files are replaced
+    _open_stores.pop(path, None)
+    return write_price_store(histories, path)
+
+if __name__ == '__main__':
+    # Usage: python price_store.py AAPL MSFT ...  or  python price_store.py --file symbols.txt
+    args = sys.argv[1:]
+    if args[:1] == ['--file'] and len(args) > 1:
+        with open(args[1], 'r') as f:
+            args = [line.split(',')[0].strip().upper() for line in f
+                    if line.strip() and not line.startswith('#')]
+        args = [symbol for symbol in args if symbol != 'SYMBOL']
+    if not args:
+        print("Usage: python price_store.py SYMBOL [SYMBOL ...] | --file symbols.txt")
+        sys.exit(1)
+    download_price_store(args)
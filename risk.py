@@ -0,0 +1,286 @@
+"""
+Portfolio risk analytics
+Aligns the close histories of a portfolio's holdings into one date x symbol returns matrix
+and computes the correlation matrix, portfolio volatility, full-period and rolling betas and
+historical / Monte Carlo value at risk with whole-matrix NumPy operations, so the cost grows
+with the matrix size rather than with one pass per symbol or per pair.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# Calendar days of history used, the same window the dashboard caches per symbol
+RISK_LOOKBACK_DAYS = 300
+TRADING_DAYS_PER_YEAR = 252
+
+# Symbols need returns on this share of the aligned dates to be included
+MIN_RETURN_COVERAGE = 0.8
+# Gaps of up to this many days inside a history are carried forward (holiday mismatches)
+MAX_FILL_DAYS = 5
+
+RISK_BENCHMARK = 'SPY'
+BETA_WINDOW = 60
+# Points of the portfolio's rolling beta included in the response
+ROLLING_BETA_POINTS = 60
+
+VAR_CONFIDENCE_LEVELS = (0.95, 0.99)
+MONTE_CARLO_PATHS = 10000
+# Fixed seed, so a cached report and a recomputed one agree
+MONTE_CARLO_SEED = 0
+
+# The full correlation matrix is only included for portfolios up to this size unless requested
+CORRELATION_MATRIX_LIMIT = 50
+TOP_CORRELATED_PAIRS = 10
+
+# Recent reports keyed by (data version, symbols, options)
+RISK_CACHE_SIZE = 16
+_risk_cache = OrderedDict()
+_risk_cache_lock = threading.Lock()
+
+def aligned_returns(closes, min_coverage=MIN_RETURN_COVERAGE):
+    """Daily returns of a date x symbol close frame
+
+    Returns (returns DataFrame, symbols dropped for too little history). Missing returns of the
+    kept symbols are set to 0, so every matrix operation below sees complete columns.
+    """
+    closes = closes.sort_index().ffill(limit=MAX_FILL_DAYS)
+    values = closes.to_numpy(dtype=np.float64)
+    if len(values) < 2:
+        return pd.DataFrame(columns=closes.columns, dtype=np.float64), []
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = values[1:] / values[:-1] - 1.0
+    returns[~np.isfinite(returns)] = np.nan
+
+    # Dates where no holding traded add nothing
+    traded = ~np.isnan(returns).all(axis=1)
+    returns = returns[traded]
+    dates = closes.index[1:][traded]
+
+    coverage = (~np.isnan(returns)).mean(axis=0) if len(returns) else np.zeros(returns.shape[1])
+    kept = coverage >= min_coverage
+    dropped = [symbol for symbol, keep in zip(closes.columns, kept) if not keep]
+
+    returns = np.nan_to_num(returns[:, kept], nan=0.0)
+    return pd.DataFrame(returns, index=dates, columns=closes.columns[kept]), dropped
+
+def normalize_weights(symbols, weights=None):
+    """Weights for symbols summing to 1 (equal weights by default; unknown symbols get 0)"""
+    if not weights:
+        return np.full(len(symbols), 1.0 / len(symbols))
+    raw = np.array([float(weights.get(symbol, 0.0)) for symbol in symbols])
+    total = raw.sum()
+    if total <= 0:
+        raise ValueError('weights must sum to a positive number')
+    return raw / total
+
+def covariance_matrix(returns):
+    """Sample covariance of the columns of a T x n returns array"""
+    centered = returns - returns.mean(axis=0)
+    return centered.T @ centered / (len(returns) - 1)
+
+def correlation_from_covariance(covariance):
+    """Correlation matrix (NaN rows/columns for symbols whose price never moved)"""
+    std = np.sqrt(np.diag(covariance))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        correlation = covariance / np.outer(std, std)
+    np.fill_diagonal(correlation, 1.0)
+    return correlation
+
+def top_correlated_pairs(correlation, symbols, count=TOP_CORRELATED_PAIRS):
+    """The most strongly correlated distinct pairs, highest first"""
+    rows, columns = np.triu_indices(len(symbols), k=1)
+    pair_values = np.nan_to_num(correlation[rows, columns], nan=-np.inf)
+    count = min(count, len(pair_values))
+    if count == 0:
+        return []
+
+    top = np.argpartition(pair_values, -count)[-count:]
+    top = top[np.argsort(pair_values[top])[::-1]]
+    return [{'symbols': [symbols[rows[i]], symbols[columns[i]]],
+             'correlation': round(float(pair_values[i]), 4)}
+            for i in top if np.isfinite(pair_values[i])]
+
+def rolling_betas(returns, market, window=BETA_WINDOW):
+    """Rolling betas of every column of a T x n returns array against a market return vector
+
+    Window sums come from cumulative sums, so all windows for all symbols are one pass.
+    Returns a (T - window + 1) x n array (empty when there are fewer than window rows).
+    """
+    if len(returns) < window:
+        return np.empty((0, returns.shape[1]))
+
+    def window_sums(values):
+        cumulative = np.cumsum(values, axis=0)
+        cumulative = np.concatenate([np.zeros((1,) + values.shape[1:]), cumulative])
+        return cumulative[window:] - cumulative[:-window]
+
+    sum_x = window_sums(returns)
+    sum_m = window_sums(market)
+    sum_xm = window_sums(returns * market[:, None])
+    sum_mm = window_sums(market * market)
+
+    covariance = sum_xm - sum_x * (sum_m / window)[:, None]
+    variance = sum_mm - sum_m * sum_m / window
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return covariance / variance[:, None]
+
+def historical_var(portfolio_returns, confidence_levels=VAR_CONFIDENCE_LEVELS, horizon_days=1):
+    """Value at risk and expected shortfall (as positive loss fractions) from observed returns"""
+    scale = np.sqrt(horizon_days)
+    results = {}
+    for confidence in confidence_levels:
+        cutoff = np.quantile(portfolio_returns, 1.0 - confidence)
+        tail = portfolio_returns[portfolio_returns <= cutoff]
+        results[f'{confidence:.0%}'] = {
+            'var': round(float(-cutoff * scale), 6),
+            'expected_shortfall': round(float(-tail.mean() * scale), 6)
+        }
+    return results
+
+def monte_carlo_var(returns, weights, confidence_levels=VAR_CONFIDENCE_LEVELS, horizon_days=1,
+                    paths=MONTE_CARLO_PATHS, seed=MONTE_CARLO_SEED):
+    """Value at risk from simulated multivariate normal returns with the sample mean and covariance
+
+    The covariance factor is the scaled, centered returns matrix itself (F with F.T @ F equal to
+    the covariance), which stays valid when there are more holdings than observations and a
+    Cholesky factor does not exist. Only the portfolio's projection onto that factor is needed,
+    so all paths are simulated with one (paths x T) @ (T,) product.
+    """
+    observations = len(returns)
+    mean = returns.mean(axis=0)
+    factor = (returns - mean) / np.sqrt(observations - 1)
+
+    rng = np.random.default_rng(seed)
+    shocks = rng.standard_normal((paths, observations))
+    simulated = horizon_days * float(mean @ weights) + np.sqrt(horizon_days) * (shocks @ (factor @ weights))
+
+    results = {}
+    for confidence in confidence_levels:
+        cutoff = np.quantile(simulated, 1.0 - confidence)
+        results[f'{confidence:.0%}'] = {
+            'var': round(float(-cutoff), 6),
+            'expected_shortfall': round(float(-simulated[simulated <= cutoff].mean()), 6)
+        }
+    return results
+
+def _rounded(values, symbols, digits=4):
+    return {symbol: (round(float(value), digits) if np.isfinite(value) else None)
+            for symbol, value in zip(symbols, values)}
+
+def portfolio_risk(closes, benchmark_close=None, weights=None, horizon_days=1,
+                   full_correlation=False, benchmark_name=RISK_BENCHMARK):
+    """Risk report for the holdings in a date x symbol close frame
+
+    benchmark_close is the market's close series used for betas; without it betas are taken
+    against the portfolio's equal-weighted return.
+    """
+    start_time = time.perf_counter()
+    returns_frame, insufficient = aligned_returns(closes)
+    symbols = list(returns_frame.columns)
+    if len(symbols) == 0 or len(returns_frame) < BETA_WINDOW:
+        raise ValueError(f'Need at least {BETA_WINDOW} days of returns for at least one holding')
+
+    returns = returns_frame.to_numpy()
+    w = normalize_weights(symbols, weights)
+
+    covariance = covariance_matrix(returns)
+    correlation = correlation_from_covariance(covariance)
+    portfolio_returns = returns @ w
+    portfolio_variance = float(w @ covariance @ w)
+    daily_volatility = np.sqrt(portfolio_variance)
+    annualize = np.sqrt(TRADING_DAYS_PER_YEAR)
+
+    # Share of the portfolio variance each holding contributes (sums to 1)
+    contribution = w * (covariance @ w) / portfolio_variance if portfolio_variance > 0 else np.zeros(len(w))
+
+    # Betas against the benchmark on the same dates
+    market = None
+    if benchmark_close is not None:
+        benchmark_close = benchmark_close.sort_index().ffill(limit=MAX_FILL_DAYS)
+        market = (benchmark_close / benchmark_close.shift(1) - 1.0).reindex(returns_frame.index)
+        if market.notna().mean() < MIN_RETURN_COVERAGE:
+            market = None
+        else:
+            market = market.fillna(0.0).to_numpy()
+    if market is None:
+        market = returns.mean(axis=1)
+        benchmark_name = 'equal_weight'
+
+    market_centered = market - market.mean()
+    market_variance = float(market_centered @ market_centered)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        betas = (returns - returns.mean(axis=0)).T @ market_centered / market_variance
+    rolling = rolling_betas(returns, market)
+    portfolio_rolling = rolling @ w
+    rolling_dates = returns_frame.index[BETA_WINDOW - 1:]
+
+    valid_pairs = correlation[np.triu_indices(len(symbols), k=1)]
+    valid_pairs = valid_pairs[np.isfinite(valid_pairs)]
+    correlation_report = {
+        'average_pairwise': round(float(valid_pairs.mean()), 4) if len(valid_pairs) else None,
+        'top_pairs': top_correlated_pairs(correlation, symbols)
+    }
+    if full_correlation or len(symbols) <= CORRELATION_MATRIX_LIMIT:
+        correlation_report['matrix'] = np.where(np.isfinite(correlation), np.round(correlation, 4), None).tolist()
+
+    return {
+        'symbols': symbols,
+        'insufficient_history': insufficient,
+        'observations': len(returns),
+        'start': returns_frame.index[0].strftime('%Y-%m-%d'),
+        'end': returns_frame.index[-1].strftime('%Y-%m-%d'),
+        'weights': _rounded(w, symbols, 6),
+        'volatility': {
+            'daily': round(float(daily_volatility), 6),
+            'annualized': round(float(daily_volatility * annualize), 6),
+            'symbols_annualized': _rounded(np.sqrt(np.diag(covariance)) * annualize, symbols),
+            'risk_contribution': _rounded(contribution, symbols)
+        },
+        'beta': {
+            'benchmark': benchmark_name,
+            'window': BETA_WINDOW,
+            'portfolio': round(float(betas @ w), 4) if np.all(np.isfinite(betas)) else None,
+            'symbols': _rounded(betas, symbols),
+            'symbols_rolling_latest': _rounded(rolling[-1], symbols),
+            'portfolio_rolling': [{'date': date.strftime('%Y-%m-%d'), 'beta': round(float(beta), 4)}
+                                  for date, beta in zip(rolling_dates[-ROLLING_BETA_POINTS:],
+                                                        portfolio_rolling[-ROLLING_BETA_POINTS:])
+                                  if np.isfinite(beta)]
+        },
+        'value_at_risk': {
+            'horizon_days': horizon_days,
+            'historical': historical_var(portfolio_returns, horizon_days=horizon_days),
+            'monte_carlo': monte_carlo_var(returns, w, horizon_days=horizon_days),
+            'monte_carlo_paths': MONTE_CARLO_PATHS
+        },
+        'correlation': correlation_report,
+        'elapsed_ms': round((time.perf_counter() - start_time) * 1000, 1)
+    }
+
+def cached_portfolio_risk(version, load_closes, weights=None, horizon_days=1, full_correlation=False):
+    """portfolio_risk for the data identified by version, computed once per version and options
+
+    load_closes() returns (close frame, benchmark close series or None, benchmark name) and is
+    only called on a cache miss.
+    """
+    weights_key = tuple(sorted(weights.items())) if weights else None
+    cache_key = (version, weights_key, horizon_days, full_correlation)
+    with _risk_cache_lock:
+        cached = _risk_cache.get(cache_key)
+        if cached is not None:
+            _risk_cache.move_to_end(cache_key)
+            return cached
+
+    closes, benchmark_close, benchmark_name = load_closes()
+    report = portfolio_risk(closes, benchmark_close, weights=weights, horizon_days=horizon_days,
+                            full_correlation=full_correlation, benchmark_name=benchmark_name)
+
+    with _risk_cache_lock:
+        _risk_cache[cache_key] = report
+        while len(_risk_cache) > RISK_CACHE_SIZE:
+            _risk_cache.popitem(last=False)
+    return report
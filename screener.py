@@ -0,0 +1,111 @@
+"""
+Universe-wide technical signal screener
+Evaluates the buy/sell signal logic for hundreds to thousands of symbols from the price store
+in one batched pass instead of one download and indicator run per symbol
+"""
+
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import price_store
+from indicators import calculate_signals_batch
+
+# Same history length the dashboard downloads for a single symbol
+SCREEN_LOOKBACK_DAYS = 300
+
+# Bars looked at by the technical recommendation (see get_technical_recommendation)
+RECOMMENDATION_BARS = 10
+
+# Recent screen results keyed by (store version, symbols)
+SCREEN_CACHE_SIZE = 16
+_screen_cache = OrderedDict()
+_screen_cache_lock = threading.Lock()
+
+def technical_recommendations(buy, sell, bars=RECOMMENDATION_BARS):
+    """Vectorized get_technical_recommendation for wide date x symbol signal frames"""
+    buy_count = buy.tail(bars).sum()
+    sell_count = sell.tail(bars).sum()
+    recommendations = np.select(
+        [(buy_count > sell_count) & (buy_count > 0), (sell_count > buy_count) & (sell_count > 0)],
+        ['BUY', 'SELL'],
+        'HOLD'
+    )
+    return pd.Series(recommendations, index=buy.columns)
+
+def last_signal_dates(signals):
+    """Date of the most recent True value in each column (None if the signal never fired)"""
+    if signals.empty:
+        return {symbol: None for symbol in signals.columns}
+
+    values = signals.to_numpy()
+    fired = values.any(axis=0)
+    last_positions = len(values) - 1 - values[::-1].argmax(axis=0)
+    dates = signals.index[last_positions]
+
+    return {symbol: (date.strftime('%Y-%m-%d') if has_fired else None)
+            for symbol, date, has_fired in zip(signals.columns, dates, fired)}
+
+def screen_entry(symbol, recommendation, last_buy, last_sell, close):
+    """Result row for one screened symbol"""
+    return {
+        'symbol': symbol,
+        'recommendation': recommendation,
+        'last_buy_signal': last_buy,
+        'last_sell_signal': last_sell,
+        'last_close': round(float(close), 2) if close is not None and not pd.isna(close) else None
+    }
+
+def screen_symbols(symbols, store=None):
+    """Screen symbols from the price store; symbols not in the store are reported as missing"""
+    start_time = time.perf_counter()
+    store = store or price_store.open_price_store()
+
+    if store is None:
+        return {'buy': [], 'sell': [], 'hold_count': 0, 'screened': 0,
+                'missing_symbols': list(symbols), 'as_of': None}
+
+    symbols = list(dict.fromkeys(symbols))
+    cache_key = (store['path'], store['version'], tuple(symbols))
+    with _screen_cache_lock:
+        cached = _screen_cache.get(cache_key)
+        if cached is not None:
+            _screen_cache.move_to_end(cache_key)
+            return cached
+
+    available = [s for s in symbols if s in store['symbol_index']]
+    missing = [s for s in symbols if s not in store['symbol_index']]
+
+    start = store['dates'][-1] - pd.Timedelta(days=SCREEN_LOOKBACK_DAYS) if len(store['dates']) else None
+    high = price_store.matrix(store, 'High', available, start=start)
+    low = price_store.matrix(store, 'Low', available, start=start)
+    close = price_store.matrix(store, 'Close', available, start=start)
+
+    buy, sell = calculate_signals_batch(high, low, close)
+    recommendations = technical_recommendations(buy, sell)
+    last_buy = last_signal_dates(buy)
+    last_sell = last_signal_dates(sell)
+    last_close = close.ffill().iloc[-1] if len(close) else pd.Series(dtype=float)
+
+    results = {'buy': [], 'sell': []}
+    for symbol in available:
+        recommendation = recommendations[symbol]
+        if recommendation == 'HOLD':
+            continue
+        entry = screen_entry(symbol, recommendation, last_buy[symbol], last_sell[symbol],
+                             last_close.get(symbol))
+        results['buy' if recommendation == 'BUY' else 'sell'].append(entry)
+
+    results['hold_count'] = int((recommendations == 'HOLD').sum())
+    results['screened'] = len(available)
+    results['missing_symbols'] = missing
+    results['as_of'] = close.index[-1].strftime('%Y-%m-%d') if len(close) else None
+    results['elapsed_ms'] = round((time.perf_counter() - start_time) * 1000, 1)
+
+    with _screen_cache_lock:
+        _screen_cache[cache_key] = results
+        while len(_screen_cache) > SCREEN_CACHE_SIZE:
+            _screen_cache.popitem(last=False)
+
+    return results
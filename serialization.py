@@ -0,0 +1,171 @@
+"""
+JSON serialization and response compression for the API
+Encodes with orjson when it is installed (the standard library otherwise) and handles NumPy
+and pandas values directly. Responses are gzip or brotli compressed according to
+Accept-Encoding, and compressed bodies are kept in an LRU keyed by content hash, so a
+memoized payload is serialized and compressed once.
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from flask import Response, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ORJSON_OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS) if orjson else 0
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/html', 'text/plain',
+                          'text/csv', 'text/css', 'application/javascript'}
+# Smaller bodies are not worth the compression overhead
+MIN_COMPRESS_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Compressed bodies keyed by (encoding, body hash)
+COMPRESSED_CACHE_SIZE = 256
+_compressed_cache = OrderedDict()
+
+# Serialized bodies of memoized payloads keyed by the caller's key
+BODY_CACHE_SIZE = 256
+_body_cache = OrderedDict()
+
+# Guards both LRUs and compression_stats; bodies are serialized and compressed outside it
+_cache_lock = threading.Lock()
+
+compression_stats = {'responses': 0, 'cache_hits': 0, 'bytes_in': 0, 'bytes_out': 0}
+
+def json_default(obj):
+    """Encode NumPy and pandas values the JSON encoders do not handle"""
+    if isinstance(obj, np.bool_):
+        return bool(obj)
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return None if np.isnan(obj) else float(obj)
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if obj is pd.NaT:
+        return None
+    if isinstance(obj, pd.Timestamp):
+        return obj.isoformat()
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return obj.tolist()
+    return DefaultJSONProvider.default(obj)
+
+def dumps_bytes(obj):
+    """Serialize obj to compact JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=json_default, option=ORJSON_OPTIONS)
+    return json.dumps(obj, default=json_default, sort_keys=True, separators=(',', ':')).encode()
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson (standard library fallback)"""
+
+    default = staticmethod(json_default)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=json_default, option=ORJSON_OPTIONS).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None or self._app.debug:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj), mimetype=self.mimetype)
+
+def available_encodings():
+    """Content encodings this server can produce, preferred first"""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+def compress_body(body, encoding):
+    """Compress body with encoding, reusing earlier results for identical bodies"""
+    key = (encoding, hashlib.blake2b(body, digest_size=16).digest())
+    with _cache_lock:
+        compressed = _compressed_cache.get(key)
+        if compressed is not None:
+            _compressed_cache.move_to_end(key)
+            compression_stats['cache_hits'] += 1
+            return compressed
+
+    if encoding == 'br':
+        compressed = brotli.compress(body, quality=BROTLI_QUALITY)
+    else:
+        compressed = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+    with _cache_lock:
+        _compressed_cache[key] = compressed
+        while len(_compressed_cache) > COMPRESSED_CACHE_SIZE:
+            _compressed_cache.popitem(last=False)
+    return compressed
+
+def compress_response(response):
+    """after_request hook: compress the body according to the request's Accept-Encoding"""
+    if (response.direct_passthrough or response.is_streamed or
+            response.status_code < 200 or response.status_code >= 300 or
+            'Content-Encoding' in response.headers or
+            response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(available_encodings())
+    if not encoding:
+        return response
+
+    body = response.get_data()
+    if len(body) < MIN_COMPRESS_SIZE:
+        return response
+
+    compressed = compress_body(body, encoding)
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+
+    with _cache_lock:
+        compression_stats['responses'] += 1
+        compression_stats['bytes_in'] += len(body)
+        compression_stats['bytes_out'] += len(compressed)
+    return response
+
+def memoized_json_response(key, build):
+    """JSON response for build(), serialized once per key and reused until evicted"""
+    with _cache_lock:
+        body = _body_cache.get(key)
+        if body is not None:
+            _body_cache.move_to_end(key)
+    if body is None:
+        body = dumps_bytes(build())
+        with _cache_lock:
+            _body_cache[key] = body
+            while len(_body_cache) > BODY_CACHE_SIZE:
+                _body_cache.popitem(last=False)
+    return Response(body, mimetype='application/json')
+
+def forget_memoized(predicate):
+    """Drop memoized bodies whose key matches predicate(key)"""
+    with _cache_lock:
+        for key in [key for key in _body_cache if predicate(key)]:
+            del _body_cache[key]
+
+def init_app(app):
+    """Install the fast JSON provider and response compression on a Flask app"""
+    app.json = FastJSONProvider(app)
+    app.after_request(compress_response)
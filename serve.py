@@ -0,0 +1,166 @@
+"""
+Production server for the web app
+Runs create_app() under gunicorn with preforked workers when gunicorn is installed, and
+falls back to werkzeug's threaded server otherwise. With --preload the benchmarks and the
+portfolio's data are loaded once in the master, so forked workers share them copy-on-write.
+When sector_benchmarks.json changes, the master refreshes its data and gracefully restarts the
+workers (SIGHUP). Portfolio changes need no restart: every worker reads the portfolio database
+itself, and each opens its own SQLite connections after it is forked.
+
+gunicorn's gthread workers hold a thread for every open live update stream, so each worker
+streams to at most half of its --threads clients (see live_updates.MAX_STREAMS); the others
+get 503 and the dashboard polls instead.
+
+    python serve.py --workers 4 --threads 8 --preload
+"""
+
+import argparse
+import importlib.util
+import os
+import signal
+import threading
+import time
+import app as stock_app
+import live_updates
+import portfolios
+import snapshots
+
+WATCHED_FILES = [stock_app.BENCHMARKS_FILE]
+WATCH_INTERVAL = 5
+
+def default_workers():
+    return int(os.environ.get('WEB_CONCURRENCY', (os.cpu_count() or 1) * 2 + 1))
+
+def stream_limit(threads):
+    """Live update streams per worker, leaving at least half the threads for API requests"""
+    return max(1, threads // 2)
+
+def prefetch_portfolio():
+    """Fetch data for every stock held by any portfolio and not already cached"""
+    # Sequential on purpose: concurrent yf.download calls share module state
+    for symbol in stock_app.get_all_portfolio_stocks():
+        stock_app.fetch_single_stock_data(symbol)
+
+def warm_up(prefetch=True):
+    """Load benchmarks and (optionally) the portfolio's data into this process"""
+    start_time = time.perf_counter()
+    stock_app.ensure_benchmarks_loaded()
+    if prefetch:
+        prefetch_portfolio()
+    print(f"Warm-up completed in {time.perf_counter() - start_time:.1f}s")
+
+def file_signatures(paths):
+    """{path: modification time} (None for missing files)"""
+    signatures = {}
+    for path in paths:
+        try:
+            signatures[path] = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            signatures[path] = None
+    return signatures
+
+def watch_files(paths, on_change, interval=WATCH_INTERVAL):
+    """Call on_change(changed_paths) from a daemon thread whenever one of paths changes"""
+    def poll():
+        previous = file_signatures(paths)
+        while True:
+            time.sleep(interval)
+            current = file_signatures(paths)
+            changed = [path for path in paths if current[path] != previous[path]]
+            previous = current
+            if changed:
+                try:
+                    on_change(changed)
+                except Exception as e:
+                    print(f"Error reloading after change to {changed}: {e}")
+
+    thread = threading.Thread(target=poll, name='file-watcher', daemon=True)
+    thread.start()
+    return thread
+
+def refresh_shared_data(changed):
+    """Bring this process's benchmark data up to date after a file change"""
+    print(f"Detected change to {', '.join(changed)}")
+    if stock_app.BENCHMARKS_FILE in changed:
+        stock_app.reload_benchmarks()
+
+def close_connections():
+    """Close this thread's SQLite connections, so forked workers do not inherit them"""
+    portfolios.close_connections()
+    snapshots.close_connections()
+
+def run_gunicorn(args):
+    """Serve with gunicorn; the master watches the data files and reloads workers on change"""
+    from gunicorn.app.base import BaseApplication
+
+    # Set in the master, so every forked worker inherits it
+    live_updates.MAX_STREAMS = stream_limit(args.threads)
+
+    def when_ready(server):
+        def reload_workers(changed):
+            if args.preload:
+                # Workers are forked from the master, so refresh its copy first
+                refresh_shared_data(changed)
+            os.kill(server.pid, signal.SIGHUP)
+
+        watch_files(WATCHED_FILES, reload_workers)
+
+    def pre_fork(server, worker):
+        # Workers are forked from the master's main thread, which ran the warm-up
+        close_connections()
+
+    def post_fork(server, worker):
+        # Threads started in the master are gone in the worker, so start its own now
+        stock_app.start_background_threads()
+
+    class StockAnalysisApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f'{args.host}:{args.port}')
+            self.cfg.set('workers', args.workers)
+            self.cfg.set('threads', args.threads)
+            self.cfg.set('timeout', args.timeout)
+            self.cfg.set('preload_app', args.preload)
+            self.cfg.set('when_ready', when_ready)
+            self.cfg.set('pre_fork', pre_fork)
+            self.cfg.set('post_fork', post_fork)
+
+        def load(self):
+            flask_app = stock_app.create_app(load_benchmarks='eager' if args.preload else 'background')
+            if args.preload:
+                warm_up(prefetch=not args.no_prefetch)
+            return flask_app
+
+    StockAnalysisApplication().run()
+
+def run_threaded(args):
+    """Serve from one process with werkzeug's threaded server (no gunicorn installed)"""
+    from werkzeug.serving import run_simple
+
+    flask_app = stock_app.create_app(load_benchmarks='eager' if args.preload else 'background')
+    if args.preload:
+        warm_up(prefetch=not args.no_prefetch)
+
+    # A single process can refresh in place instead of restarting
+    watch_files(WATCHED_FILES, refresh_shared_data)
+    run_simple(args.host, args.port, flask_app, threaded=True, use_reloader=False, use_debugger=False)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve the stock analysis app in production mode')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=default_workers(),
+                        help='Worker processes (default: $WEB_CONCURRENCY or 2 x CPUs + 1)')
+    parser.add_argument('--threads', type=int, default=4, help='Threads per worker')
+    parser.add_argument('--timeout', type=int, default=120, help='Worker timeout in seconds')
+    parser.add_argument('--preload', action='store_true',
+                        help='Load the app and warm caches in the master before forking workers')
+    parser.add_argument('--no-prefetch', action='store_true',
+                        help='With --preload, load benchmarks but do not prefetch portfolio data')
+    args = parser.parse_args()
+
+    if importlib.util.find_spec('gunicorn') is None:
+        print("gunicorn is not installed; serving with werkzeug's threaded server "
+              "(--workers is ignored)")
+        run_threaded(args)
+    else:
+        run_gunicorn(args)
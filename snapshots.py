@@ -0,0 +1,345 @@
+"""
+Historical fundamentals and sector benchmark snapshots
+Every fetch records the day's fundamentals of a symbol, and every benchmark refresh the
+sector distributions, in an append-only SQLite store. Records are split into sections
+(market data, valuation, financials, profile, ...) and each section is stored once as a
+zlib-compressed JSON value addressed by its hash, so snapshots share every section that
+did not change since the day before.
+
+The snapshot tables are keyed (symbol, date, section) and (sector, metric, date), so a
+year of "P/E against the sector median" is two index range scans, with decoded values
+kept in an LRU. Days before today are never rewritten; a later fetch on the same day
+replaces that day's snapshot.
+
+    python snapshots.py AAPL --metric pe_ratio --days 365
+    python snapshots.py --stats
+"""
+
+import argparse
+import bisect
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from serialization import dumps_bytes
+
+SNAPSHOT_DB_FILE = 'snapshots.db'
+
+# Fundamental fields grouped by how often they change; fields not listed go to 'other'
+FUNDAMENTAL_SECTIONS = {
+    'market': ('current_price', 'previous_close', 'market_cap', 'enterprise_value',
+               '52_week_high', '52_week_low', 'avg_volume'),
+    'valuation': ('pe_ratio', 'forward_pe', 'peg_ratio', 'price_to_book', 'price_to_sales',
+                  'ev_to_revenue', 'ev_to_ebitda', 'dividend_yield'),
+    'financials': ('shares_outstanding', 'profit_margin', 'operating_margin', 'return_on_assets',
+                   'return_on_equity', 'total_debt', 'total_cash', 'debt_to_equity', 'current_ratio',
+                   'quick_ratio', 'revenue_growth', 'earnings_growth', 'payout_ratio', 'beta'),
+    'profile': ('sector', 'industry', 'country', 'employees')
+}
+OTHER_SECTION = 'other'
+FIELD_SECTIONS = {field: section for section, fields in FUNDAMENTAL_SECTIONS.items() for field in fields}
+
+# Metrics with sector distributions (see calculate_single_sector_benchmarks in app.py)
+BENCHMARK_METRICS = ('pe_ratio', 'price_to_book', 'price_to_sales', 'return_on_equity', 'profit_margin')
+
+ZLIB_LEVEL = 9
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshot_meta (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshot_values (
+    id INTEGER PRIMARY KEY,
+    digest BLOB NOT NULL UNIQUE,
+    data BLOB NOT NULL,
+    raw_size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fundamental_snapshots (
+    symbol TEXT NOT NULL,
+    date TEXT NOT NULL,
+    section TEXT NOT NULL,
+    value_id INTEGER NOT NULL REFERENCES snapshot_values(id),
+    PRIMARY KEY (symbol, date, section)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS benchmark_snapshots (
+    sector TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    date TEXT NOT NULL,
+    value_id INTEGER NOT NULL REFERENCES snapshot_values(id),
+    PRIMARY KEY (sector, metric, date)
+) WITHOUT ROWID;
+"""
+
+def default_zlib_dictionary():
+    """Preset zlib dictionary: the field names every value repeats, which dominate small values"""
+    names = list(FIELD_SECTIONS) + ['median', 'percentiles']
+    return ','.join(f'"{name}":' for name in names).encode()
+
+# Decoded values keyed by (database path, value id) (values are immutable, so entries never go stale)
+VALUE_CACHE_SIZE = 4096
+_value_cache = OrderedDict()
+_value_cache_lock = threading.Lock()
+
+# One connection per thread and database path
+_connections = threading.local()
+_initialized = set()
+_init_lock = threading.Lock()
+
+# Preset dictionary per database path; stored in the database when it is created, so
+# values stay readable when the fields above change
+_dictionaries = {}
+
+def connect(path=SNAPSHOT_DB_FILE):
+    """This thread's connection to the snapshot database, creating it on first use"""
+    connections = getattr(_connections, 'by_path', None)
+    if connections is None or _connections.pid != os.getpid():
+        # A forked worker never reuses its parent's connections; they are not fork safe
+        connections = _connections.by_path = {}
+        _connections.pid = os.getpid()
+
+    conn = connections.get(path)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=10)
+        # Appends are frequent and small: write-ahead logging avoids a full sync per snapshot
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')
+        connections[path] = conn
+
+    if path not in _initialized:
+        with _init_lock:
+            if path not in _initialized:
+                with conn:
+                    conn.executescript(SCHEMA)
+                    conn.execute('INSERT OR IGNORE INTO snapshot_meta (key, value) VALUES (?, ?)',
+                                 ('zlib_dictionary', default_zlib_dictionary()))
+                _dictionaries[path] = conn.execute(
+                    "SELECT value FROM snapshot_meta WHERE key = 'zlib_dictionary'").fetchone()[0]
+                _initialized.add(path)
+    return conn
+
+def close_connections():
+    """Close this thread's connections (e.g. in a master process before it forks workers)"""
+    connections = getattr(_connections, 'by_path', None) or {}
+    _connections.by_path = {}
+    _connections.pid = os.getpid()
+    for conn in connections.values():
+        conn.close()
+
+def _compress(raw, path):
+    compressor = zlib.compressobj(ZLIB_LEVEL, zdict=_dictionaries[path])
+    return compressor.compress(raw) + compressor.flush()
+
+def _decompress(data, path):
+    decompressor = zlib.decompressobj(zdict=_dictionaries[path])
+    return decompressor.decompress(data) + decompressor.flush()
+
+def today():
+    return datetime.now().strftime('%Y-%m-%d')
+
+def split_sections(metrics):
+    """{section: {field: value}} of a fundamentals dict"""
+    sections = {}
+    for field, value in metrics.items():
+        sections.setdefault(FIELD_SECTIONS.get(field, OTHER_SECTION), {})[field] = value
+    return sections
+
+def _store_value(conn, value, path):
+    """Id of value in snapshot_values, inserting it if no identical value is stored yet"""
+    raw = dumps_bytes(value)
+    digest = hashlib.blake2b(raw, digest_size=16).digest()
+    row = conn.execute('SELECT id FROM snapshot_values WHERE digest = ?', (digest,)).fetchone()
+    if row:
+        return row[0]
+    return conn.execute('INSERT INTO snapshot_values (digest, data, raw_size) VALUES (?, ?, ?)',
+                        (digest, _compress(raw, path), len(raw))).lastrowid
+
+def _load_values(conn, value_ids, path):
+    """{value id: decoded value}, decompressing only values not in the LRU"""
+    values = {}
+    missing = []
+    with _value_cache_lock:
+        for value_id in set(value_ids):
+            if (path, value_id) in _value_cache:
+                _value_cache.move_to_end((path, value_id))
+                values[value_id] = _value_cache[(path, value_id)]
+            else:
+                missing.append(value_id)
+
+    # Stay well below SQLite's host parameter limit
+    for start in range(0, len(missing), 500):
+        batch = missing[start:start + 500]
+        rows = conn.execute(f"SELECT id, data FROM snapshot_values WHERE id IN ({','.join('?' * len(batch))})",
+                            batch).fetchall()
+        decoded = {value_id: json.loads(_decompress(data, path)) for value_id, data in rows}
+        values.update(decoded)
+        with _value_cache_lock:
+            _value_cache.update(((path, value_id), value) for value_id, value in decoded.items())
+            while len(_value_cache) > VALUE_CACHE_SIZE:
+                _value_cache.popitem(last=False)
+    return values
+
+def record_fundamentals(symbol, metrics, date=None, path=SNAPSHOT_DB_FILE):
+    """Store the fundamentals of symbol as its snapshot for date (default today)"""
+    if not metrics:
+        return False
+    date = date or today()
+    conn = connect(path)
+    with conn:
+        for section, values in split_sections(metrics).items():
+            conn.execute('INSERT OR REPLACE INTO fundamental_snapshots (symbol, date, section, value_id) '
+                         'VALUES (?, ?, ?, ?)', (symbol, date, section, _store_value(conn, values, path)))
+    return True
+
+def record_benchmarks(benchmarks_data, date=None, path=SNAPSHOT_DB_FILE):
+    """Store each sector's metric distributions as its snapshot for date (default today)
+
+    benchmarks_data is the sector benchmark file's content: {sector: {'pe_ratio_median', ...}}.
+    """
+    date = date or today()
+    recorded = 0
+    conn = connect(path)
+    with conn:
+        for sector, benchmarks in benchmarks_data.items():
+            if sector.startswith('_') or not isinstance(benchmarks, dict):
+                continue
+            for metric in BENCHMARK_METRICS:
+                if benchmarks.get(f'{metric}_median') is None:
+                    continue
+                value = {'median': benchmarks[f'{metric}_median'],
+                         'percentiles': benchmarks.get(f'{metric}_percentiles')}
+                conn.execute('INSERT OR REPLACE INTO benchmark_snapshots (sector, metric, date, value_id) '
+                             'VALUES (?, ?, ?, ?)', (sector, metric, date, _store_value(conn, value, path)))
+                recorded += 1
+    return recorded
+
+def snapshot_dates(symbol, path=SNAPSHOT_DB_FILE):
+    """Dates with a fundamentals snapshot of symbol, oldest first"""
+    rows = connect(path).execute('SELECT DISTINCT date FROM fundamental_snapshots WHERE symbol = ? ORDER BY date',
+                                 (symbol,)).fetchall()
+    return [row[0] for row in rows]
+
+def fundamentals_as_of(symbol, date, path=SNAPSHOT_DB_FILE):
+    """(snapshot date, fundamentals) of the latest snapshot of symbol on or before date ((None, {}) if none)"""
+    conn = connect(path)
+    row = conn.execute('SELECT MAX(date) FROM fundamental_snapshots WHERE symbol = ? AND date <= ?',
+                       (symbol, date)).fetchone()
+    if row[0] is None:
+        return None, {}
+    rows = conn.execute('SELECT value_id FROM fundamental_snapshots WHERE symbol = ? AND date = ?',
+                        (symbol, row[0])).fetchall()
+    values = _load_values(conn, [value_id for value_id, in rows], path)
+    metrics = {}
+    for value in values.values():
+        metrics.update(value)
+    return row[0], metrics
+
+def benchmarks_as_of(sector, date, path=SNAPSHOT_DB_FILE):
+    """{metric: {'median', 'percentiles', 'date'}} of the sector's latest snapshots on or before date"""
+    conn = connect(path)
+    rows = conn.execute('SELECT metric, MAX(date), value_id FROM benchmark_snapshots '
+                        'WHERE sector = ? AND date <= ? GROUP BY metric', (sector, date)).fetchall()
+    values = _load_values(conn, [value_id for _, _, value_id in rows], path)
+    return {metric: {**values[value_id], 'date': snapshot_date} for metric, snapshot_date, value_id in rows}
+
+def _sector_medians(conn, sector, metric, start, end, path):
+    """Sorted (dates, medians) of a sector metric covering start..end, including the snapshot in force at start"""
+    rows = conn.execute(
+        'SELECT date, value_id FROM benchmark_snapshots WHERE sector = ? AND metric = ? AND date <= ? '
+        'AND date >= COALESCE((SELECT MAX(date) FROM benchmark_snapshots '
+        'WHERE sector = ? AND metric = ? AND date <= ?), \'\') ORDER BY date',
+        (sector, metric, end, sector, metric, start)).fetchall()
+    values = _load_values(conn, [value_id for _, value_id in rows], path)
+    return [date for date, _ in rows], [values[value_id]['median'] for _, value_id in rows]
+
+def metric_history(symbol, metric='pe_ratio', start=None, end=None, path=SNAPSHOT_DB_FILE):
+    """Daily snapshots of one fundamental metric with the sector median in force on each day
+
+    Returns [{'date', 'value', 'sector', 'sector_median', 'relative'}] oldest first, where
+    relative is value / sector_median (None when either is missing). start and end are
+    YYYY-MM-DD (default: the year up to today).
+    """
+    end = end or today()
+    start = start or (datetime.strptime(end, '%Y-%m-%d') - timedelta(days=365)).strftime('%Y-%m-%d')
+    section = FIELD_SECTIONS.get(metric, OTHER_SECTION)
+
+    conn = connect(path)
+    rows = conn.execute('SELECT date, section, value_id FROM fundamental_snapshots '
+                        'WHERE symbol = ? AND date >= ? AND date <= ? AND section IN (?, ?) ORDER BY date',
+                        (symbol, start, end, section, 'profile')).fetchall()
+    values = _load_values(conn, [value_id for _, _, value_id in rows], path)
+
+    days = OrderedDict()
+    for date, row_section, value_id in rows:
+        day = days.setdefault(date, {})
+        if row_section == section:
+            day['value'] = values[value_id].get(metric)
+        if row_section == 'profile':
+            day['sector'] = values[value_id].get('sector')
+
+    medians = {}
+    if metric in BENCHMARK_METRICS:
+        for sector in {day.get('sector') for day in days.values()} - {None}:
+            medians[sector] = _sector_medians(conn, sector, metric, start, end, path)
+
+    history = []
+    for date, day in days.items():
+        value, sector = day.get('value'), day.get('sector')
+        sector_median = None
+        if sector in medians:
+            dates, sector_values = medians[sector]
+            position = bisect.bisect_right(dates, date) - 1
+            if position >= 0:
+                sector_median = sector_values[position]
+        history.append({
+            'date': date,
+            'value': value,
+            'sector': sector,
+            'sector_median': sector_median,
+            'relative': round(value / sector_median, 4) if value is not None and sector_median else None
+        })
+    return history
+
+def store_stats(path=SNAPSHOT_DB_FILE):
+    """Row counts and stored vs uncompressed value sizes"""
+    conn = connect(path)
+    values, stored, raw = conn.execute('SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0), '
+                                       'COALESCE(SUM(raw_size), 0) FROM snapshot_values').fetchone()
+    symbols, symbol_days, sections = conn.execute(
+        'SELECT COUNT(DISTINCT symbol), COUNT(DISTINCT symbol || date), COUNT(*) FROM fundamental_snapshots').fetchone()
+    sectors, benchmark_rows = conn.execute(
+        'SELECT COUNT(DISTINCT sector), COUNT(*) FROM benchmark_snapshots').fetchone()
+    return {
+        'symbols': symbols,
+        'fundamental_snapshots': symbol_days,
+        'fundamental_sections': sections,
+        'sectors': sectors,
+        'benchmark_snapshots': benchmark_rows,
+        'distinct_values': values,
+        'stored_bytes': stored,
+        'uncompressed_bytes': raw
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Query the fundamentals snapshot store')
+    parser.add_argument('symbol', nargs='?', help='Symbol to show the metric history of')
+    parser.add_argument('--metric', default='pe_ratio', help='Fundamental metric (default: pe_ratio)')
+    parser.add_argument('--days', type=int, default=365, help='Days of history up to today')
+    parser.add_argument('--as-of', help='Show the full snapshot in force on this date (YYYY-MM-DD) instead')
+    parser.add_argument('--stats', action='store_true', help='Show store size and sharing statistics')
+    parser.add_argument('--db', default=SNAPSHOT_DB_FILE, help='Snapshot database file')
+    args = parser.parse_args()
+
+    if args.stats or not args.symbol:
+        print(json.dumps(store_stats(args.db), indent=2))
+    elif args.as_of:
+        snapshot_date, metrics = fundamentals_as_of(args.symbol.upper(), args.as_of, args.db)
+        print(json.dumps({'date': snapshot_date, 'fundamentals': metrics}, indent=2, default=str))
+    else:
+        start = (datetime.now() - timedelta(days=args.days)).strftime('%Y-%m-%d')
+        for entry in metric_history(args.symbol.upper(), args.metric, start=start, path=args.db):
+            print(f"{entry['date']}  {entry['value']!s:>12}  {entry['sector_median']!s:>12}  {entry['relative']!s:>8}")
@@ -0,0 +1,388 @@
+"""
+Quarterly financial statements and the growth metrics derived from them
+Row names are lowercased once per statement and each row lookup is memoized, and growth
+metrics are cached per (symbol, latest fiscal quarter) since the statements only change once
+a quarter. A symbol's statements are not downloaded again until a newer quarter could have
+been reported.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+
+GROWTH_FIELDS = ['revenue_growth_yoy', 'ocf_growth_yoy', 'roe_growth_yoy']
+
+# Quarters stacked per statement row for the batch path; growth needs at most the last 7
+STACKED_QUARTERS = 8
+
+# Derived growth metrics keyed by (symbol, latest fiscal quarter)
+GROWTH_CACHE_SIZE = 1024
+growth_cache = OrderedDict()
+growth_cache_stats = {'hits': 0, 'computed': 0}
+
+# A newer quarter cannot be reported before the quarter after the latest one has ended;
+# from then on statements are downloaded again at most once per STATEMENT_RECHECK
+QUARTER_DAYS = 91
+STATEMENT_RECHECK = timedelta(days=1)
+
+# symbol -> (growth cache key of its latest statements, when to download them again)
+statement_checks = OrderedDict()
+
+# Guards growth_cache, growth_cache_stats and statement_checks
+_growth_cache_lock = threading.Lock()
+
+class Statement:
+    """A quarterly statement (rows: line items, columns: quarters, most recent first)"""
+
+    def __init__(self, frame):
+        self.frame = frame if frame is not None else pd.DataFrame()
+        self.row_names = [str(idx).lower() for idx in self.frame.index]
+        self._row_positions = {}
+        self._values = None
+
+    @property
+    def empty(self):
+        return self.frame.empty
+
+    @property
+    def quarters(self):
+        return self.frame.shape[1]
+
+    @property
+    def latest_quarter(self):
+        """Date of the most recent quarter as YYYY-MM-DD (None if the statement is empty)"""
+        if self.empty:
+            return None
+        latest = self.frame.columns[0]
+        return latest.strftime('%Y-%m-%d') if hasattr(latest, 'strftime') else str(latest)
+
+    @property
+    def values(self):
+        """Statement values as a float array (non-numeric entries become NaN)"""
+        if self._values is None:
+            try:
+                self._values = self.frame.to_numpy(dtype=float)
+            except (TypeError, ValueError):
+                self._values = self.frame.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        return self._values
+
+    def find_row(self, *terms, exclude=()):
+        """Position of the first row whose name contains all terms and none of exclude (None if missing)
+
+        The row names are scanned once per distinct lookup; the position is then memoized.
+        """
+        key = (tuple(term.lower() for term in terms), tuple(term.lower() for term in exclude))
+        if key not in self._row_positions:
+            include_terms, exclude_terms = key
+            self._row_positions[key] = next(
+                (position for position, name in enumerate(self.row_names)
+                 if all(term in name for term in include_terms)
+                 and not any(term in name for term in exclude_terms)),
+                None
+            )
+        return self._row_positions[key]
+
+    def row(self, *terms, exclude=()):
+        """Values of the first matching row as a Series over quarters (None if missing)"""
+        position = self.find_row(*terms, exclude=exclude)
+        if position is None:
+            return None
+        return self.frame.iloc[position]
+
+def as_statement(data):
+    """Wrap a quarterly DataFrame in a Statement (Statements are returned unchanged)"""
+    return data if isinstance(data, Statement) else Statement(data)
+
+def validate_growth_data(quarterly_data, metric_name, required_quarters=4):
+    """Validate data quality for growth calculations"""
+    statement = as_statement(quarterly_data)
+    if statement.empty:
+        return False, f"No quarterly data available for {metric_name}"
+
+    if statement.quarters < required_quarters:
+        return False, f"Insufficient quarters for {metric_name} (need {required_quarters}, got {statement.quarters})"
+
+    # Check if metric exists
+    if statement.find_row(metric_name) is None:
+        return False, f"Metric '{metric_name}' not found in quarterly data"
+
+    return True, "Data valid"
+
+def calculate_yoy_growth(quarterly_data, metric_name):
+    """Calculate year-over-year growth from quarterly data"""
+    try:
+        statement = as_statement(quarterly_data)
+
+        # Validate data quality first
+        is_valid, message = validate_growth_data(statement, metric_name)
+        if not is_valid:
+            print(f"Data validation failed: {message}")
+            return None
+
+        metric_data = statement.row(metric_name)
+
+        # Get most recent quarter vs same quarter last year (4 quarters ago)
+        current_q = metric_data.iloc[0]  # Most recent quarter
+        year_ago_q = metric_data.iloc[3] if len(metric_data) >= 4 else None
+
+        if (year_ago_q is None or year_ago_q == 0 or
+            pd.isna(current_q) or pd.isna(year_ago_q)):
+            return None
+
+        growth_rate = (current_q - year_ago_q) / abs(year_ago_q)
+        return growth_rate
+
+    except Exception as e:
+        print(f"Error calculating YoY growth for {metric_name}: {e}")
+        return None
+
+def calculate_roe_growth(quarterly_financials, quarterly_balance_sheet):
+    """Calculate ROE growth rate over time"""
+    try:
+        financials = as_statement(quarterly_financials)
+        balance_sheet = as_statement(quarterly_balance_sheet)
+        if financials.empty or balance_sheet.empty:
+            return None
+
+        # Net Income and Stockholders Equity
+        income_data = financials.row('net income', exclude=('common',))
+        equity_data = balance_sheet.row('stockholder', 'equity')
+        if income_data is None or equity_data is None:
+            return None
+
+        # Calculate ROE for recent quarter and year-ago quarter using TTM approach
+        if len(income_data) >= 4 and len(equity_data) >= 4:
+            # Current TTM (Trailing Twelve Months) ROE
+            current_ttm_income = income_data.iloc[0:4].sum()  # Sum of last 4 quarters
+            current_equity = equity_data.iloc[0]  # Most recent equity
+
+            # Year-ago TTM ROE (if we have enough data)
+            if len(income_data) >= 7 and len(equity_data) >= 4:
+                year_ago_ttm_income = income_data.iloc[3:7].sum()  # Sum of quarters 4-7
+                year_ago_equity = equity_data.iloc[3]  # Equity 4 quarters ago
+            else:
+                # Fallback: annualize the year-ago quarter
+                year_ago_ttm_income = income_data.iloc[3] * 4
+                year_ago_equity = equity_data.iloc[3]
+
+            if (current_equity > 0 and year_ago_equity > 0 and
+                not pd.isna(current_ttm_income) and not pd.isna(year_ago_ttm_income)):
+
+                current_roe = current_ttm_income / current_equity
+                year_ago_roe = year_ago_ttm_income / year_ago_equity
+
+                if year_ago_roe != 0:
+                    roe_growth = (current_roe - year_ago_roe) / abs(year_ago_roe)
+                    return roe_growth
+
+        return None
+
+    except Exception as e:
+        print(f"Error calculating ROE growth: {e}")
+        return None
+
+def growth_metrics_from_statements(financials, cashflow, balance_sheet):
+    """Revenue, operating cash flow and ROE growth from normalized statements"""
+    return {
+        # 1. Enhanced Revenue Growth (YoY quarterly)
+        'revenue_growth_yoy': calculate_yoy_growth(financials, 'Total Revenue'),
+        # 2. Operating Cash Flow Growth
+        'ocf_growth_yoy': calculate_yoy_growth(cashflow, 'Operating Cash Flow'),
+        # 3. ROE Growth Rate
+        'roe_growth_yoy': calculate_roe_growth(financials, balance_sheet)
+    }
+
+def _growth_cache_key(symbol, financials, cashflow, balance_sheet):
+    """Cache key for a symbol's statements, or None if they should not be cached"""
+    quarters = (financials.latest_quarter, cashflow.latest_quarter, balance_sheet.latest_quarter)
+    # Only cache complete statement sets; a missing statement may just be a failed download
+    if not symbol or not all(quarters):
+        return None
+    return (symbol, quarters)
+
+def _store_growth_metrics(cache_key, metrics):
+    with _growth_cache_lock:
+        growth_cache[cache_key] = metrics
+        while len(growth_cache) > GROWTH_CACHE_SIZE:
+            growth_cache.popitem(last=False)
+
+def _cached_growth_metrics_for_key(cache_key):
+    """Copy of the cached growth metrics for cache_key (None if not cached)"""
+    with _growth_cache_lock:
+        metrics = growth_cache.get(cache_key)
+        if metrics is None:
+            return None
+        growth_cache.move_to_end(cache_key)
+        growth_cache_stats['hits'] += 1
+        return dict(metrics)
+
+def _count_computed(count=1):
+    with _growth_cache_lock:
+        growth_cache_stats['computed'] += count
+
+def _record_statement_check(cache_key, now=None):
+    """Remember a symbol's latest statements and when a newer quarter could be reported"""
+    now = now or datetime.now()
+    symbol, quarters = cache_key
+    try:
+        expected = max(pd.Timestamp(quarter) for quarter in quarters).to_pydatetime() + timedelta(days=QUARTER_DAYS)
+    except (TypeError, ValueError):
+        expected = now
+    with _growth_cache_lock:
+        statement_checks[symbol] = (cache_key, max(expected, now + STATEMENT_RECHECK))
+        statement_checks.move_to_end(symbol)
+        while len(statement_checks) > GROWTH_CACHE_SIZE:
+            statement_checks.popitem(last=False)
+
+def _cached_growth_metrics(symbol, now=None):
+    """Cached growth metrics of symbol while its statements cannot have changed (else None)"""
+    with _growth_cache_lock:
+        check = statement_checks.get(symbol)
+    if check is None:
+        return None
+    cache_key, next_check = check
+    if (now or datetime.now()) >= next_check:
+        return None
+    return _cached_growth_metrics_for_key(cache_key)
+
+def cached_growth_metrics(symbols):
+    """{symbol: growth metrics} for the symbols whose statements cannot have changed since cached"""
+    now = datetime.now()
+    cached = {}
+    for symbol in symbols:
+        metrics = _cached_growth_metrics(symbol, now)
+        if metrics is not None:
+            cached[symbol] = metrics
+    return cached
+
+def extract_enhanced_growth_metrics(ticker):
+    """Extract enhanced growth metrics from quarterly data, cached per latest fiscal quarter
+
+    The statements are only downloaded when none are cached for the symbol or a newer
+    quarter could have been reported since they were.
+    """
+    try:
+        symbol = getattr(ticker, 'ticker', None)
+        cached = _cached_growth_metrics(symbol)
+        if cached is not None:
+            return cached
+
+        # Get quarterly data
+        financials = Statement(ticker.quarterly_financials)
+        cashflow = Statement(ticker.quarterly_cashflow)
+        balance_sheet = Statement(ticker.quarterly_balance_sheet)
+
+        cache_key = _growth_cache_key(symbol, financials, cashflow, balance_sheet)
+        if cache_key:
+            _record_statement_check(cache_key)
+        cached = _cached_growth_metrics_for_key(cache_key) if cache_key else None
+        if cached is not None:
+            return cached
+
+        enhanced_metrics = growth_metrics_from_statements(financials, cashflow, balance_sheet)
+        _count_computed()
+        if cache_key:
+            _store_growth_metrics(cache_key, enhanced_metrics)
+
+        return dict(enhanced_metrics)
+
+    except Exception as e:
+        print(f"Error extracting enhanced growth metrics: {e}")
+        return {}
+
+def stack_statement_rows(statements, *terms, exclude=(), quarters=STACKED_QUARTERS):
+    """Stack the first matching row of each statement into one (statements x quarters) array
+
+    Returns the NaN-padded values (most recent quarter first) and each row's quarter
+    count, which is 0 where the statement has no matching row.
+    """
+    values = np.full((len(statements), quarters), np.nan)
+    lengths = np.zeros(len(statements), dtype=int)
+    for i, statement in enumerate(statements):
+        position = statement.find_row(*terms, exclude=exclude)
+        if position is None:
+            continue
+        row_values = statement.values[position, :quarters]
+        values[i, :len(row_values)] = row_values
+        lengths[i] = statement.quarters
+    return values, lengths
+
+def yoy_growth_batch(values, lengths):
+    """Vectorized calculate_yoy_growth over stacked rows (NaN where it returns None)"""
+    current, year_ago = values[:, 0], values[:, 3]
+    valid = (lengths >= 4) & (year_ago != 0) & ~np.isnan(current) & ~np.isnan(year_ago)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = (current - year_ago) / np.abs(year_ago)
+    return np.where(valid, growth, np.nan)
+
+def roe_growth_batch(income, income_lengths, equity, equity_lengths):
+    """Vectorized calculate_roe_growth over stacked net income and equity rows"""
+    # TTM sums skip missing quarters like Series.sum(); without 7 quarters the
+    # year-ago quarter is annualized
+    current_ttm_income = np.nansum(income[:, 0:4], axis=1)
+    year_ago_ttm_income = np.where(income_lengths >= 7, np.nansum(income[:, 3:7], axis=1), income[:, 3] * 4)
+    current_equity, year_ago_equity = equity[:, 0], equity[:, 3]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        current_roe = current_ttm_income / current_equity
+        year_ago_roe = year_ago_ttm_income / year_ago_equity
+        growth = (current_roe - year_ago_roe) / np.abs(year_ago_roe)
+
+    valid = ((income_lengths >= 4) & (equity_lengths >= 4) &
+             (current_equity > 0) & (year_ago_equity > 0) &
+             ~np.isnan(current_ttm_income) & ~np.isnan(year_ago_ttm_income) &
+             (year_ago_roe != 0))
+    return np.where(valid, growth, np.nan)
+
+def batch_growth_metrics(statement_sets):
+    """Growth metrics for many symbols in one vectorized pass
+
+    statement_sets maps symbol -> (financials, cashflow, balance_sheet) DataFrames or
+    Statements. Returns a DataFrame indexed by symbol with GROWTH_FIELDS columns, matching
+    extract_enhanced_growth_metrics (NaN where it gives None).
+    """
+    symbols = list(statement_sets)
+    financials = [as_statement(statement_sets[symbol][0]) for symbol in symbols]
+    cashflows = [as_statement(statement_sets[symbol][1]) for symbol in symbols]
+    balance_sheets = [as_statement(statement_sets[symbol][2]) for symbol in symbols]
+
+    revenue, revenue_lengths = stack_statement_rows(financials, 'Total Revenue')
+    ocf, ocf_lengths = stack_statement_rows(cashflows, 'Operating Cash Flow')
+    income, income_lengths = stack_statement_rows(financials, 'net income', exclude=('common',))
+    equity, equity_lengths = stack_statement_rows(balance_sheets, 'stockholder', 'equity')
+
+    return pd.DataFrame({
+        'revenue_growth_yoy': yoy_growth_batch(revenue, revenue_lengths),
+        'ocf_growth_yoy': yoy_growth_batch(ocf, ocf_lengths),
+        'roe_growth_yoy': roe_growth_batch(income, income_lengths, equity, equity_lengths)
+    }, index=pd.Index(symbols, dtype=object), columns=GROWTH_FIELDS)
+
+def growth_metrics_for_symbols(statement_sets):
+    """{symbol: growth metrics} for many symbols, computing only those not cached yet"""
+    results = {}
+    pending = {}
+    for symbol, statements in statement_sets.items():
+        statements = tuple(as_statement(statement) for statement in statements)
+        cache_key = _growth_cache_key(symbol, *statements)
+        if cache_key:
+            _record_statement_check(cache_key)
+        cached = _cached_growth_metrics_for_key(cache_key) if cache_key else None
+        if cached is not None:
+            results[symbol] = cached
+        else:
+            pending[symbol] = (cache_key, statements)
+
+    if pending:
+        frame = batch_growth_metrics({symbol: statements for symbol, (_, statements) in pending.items()})
+        _count_computed(len(pending))
+        for symbol, row in zip(frame.index, frame.itertuples(index=False)):
+            metrics = {field: (None if pd.isna(value) else float(value))
+                       for field, value in zip(GROWTH_FIELDS, row)}
+            cache_key = pending[symbol][0]
+            if cache_key:
+                _store_growth_metrics(cache_key, metrics)
+            results[symbol] = dict(metrics)
+
+    return results
@@ -0,0 +1,277 @@
+"""
+Streaming technical indicators for intraday bars
+Keeps per-symbol indicator state that is updated in constant time per new bar: EMAs and
+MACD recursively, rolling means with running sums, and rolling high/low with monotonic
+deques. Values match calculate_technical_indicators on the same bars.
+
+Replay a local bar file (CSV with a date/time index and High, Low, Close columns) and
+compare against the batch calculation:
+
+    python streaming_indicators.py bars.csv
+"""
+
+import argparse
+import time
+from collections import deque
+import numpy as np
+import pandas as pd
+from indicators import MIN_HISTORY, calculate_technical_indicators, resolve_indicator_params
+
+# Intraday bar intervals and the history yfinance serves for them
+INTRADAY_INTERVALS = {'1m': '5d', '2m': '30d', '5m': '30d', '15m': '30d', '30m': '30d', '60m': '60d'}
+
+# Bars looked at by the technical recommendation (see get_technical_recommendation)
+RECOMMENDATION_BARS = 10
+
+# Columns produced per bar, named as in calculate_technical_indicators
+VALUE_COLUMNS = ['30_Moving_Avg', '%K', '%D', 'Smoothed_%D', '12_EMA', '26_EMA', 'MACD',
+                 'Signal_Line', 'Smoothed_MACD', 'Smoothed_Signal_Line']
+FLAG_COLUMNS = ['buy_ma', 'buy_stochastic', 'buy_macd', 'sell_ma', 'sell_stochastic', 'sell_macd',
+                'Buy_Signal', 'Sell_Signal']
+
+class RollingMean:
+    """Mean of the last `window` values (fewer at the start, like min_periods=1)
+
+    Keeps a compensated running sum, and returns the value itself while the window holds
+    one repeated value, as pandas does, so comparisons against the mean (close > MA) agree
+    with the batch calculation on flat stretches.
+    """
+
+    def __init__(self, window):
+        self.values = deque(maxlen=window)
+        self.total = 0.0
+        # Kahan compensation, kept separately for added and removed values like pandas
+        self.compensation = {'add': 0.0, 'remove': 0.0}
+        self.same_value_run = 0
+
+    def _add(self, value, kind):
+        adjusted = value - self.compensation[kind]
+        total = self.total + adjusted
+        self.compensation[kind] = (total - self.total) - adjusted
+        self.total = total
+
+    def update(self, value):
+        if len(self.values) == self.values.maxlen:
+            self._add(-self.values[0], 'remove')
+        self.same_value_run = self.same_value_run + 1 if self.values and self.values[-1] == value else 1
+        self.values.append(value)
+        self._add(value, 'add')
+        if self.same_value_run >= len(self.values):
+            return value
+        return self.total / len(self.values)
+
+class RollingExtreme:
+    """Max (or min) of the last `window` values using a monotonic deque"""
+
+    def __init__(self, window, use_max=True):
+        self.window = window
+        self.use_max = use_max
+        self.candidates = deque()  # (bar number, value), values monotonic from the front
+        self.bars = 0
+
+    def update(self, value):
+        if self.use_max:
+            while self.candidates and self.candidates[-1][1] <= value:
+                self.candidates.pop()
+        else:
+            while self.candidates and self.candidates[-1][1] >= value:
+                self.candidates.pop()
+        self.candidates.append((self.bars, value))
+        while self.candidates[0][0] <= self.bars - self.window:
+            self.candidates.popleft()
+        self.bars += 1
+        return self.candidates[0][1]
+
+class EMA:
+    """Exponential moving average, as ewm(span=span, adjust=False).mean()"""
+
+    def __init__(self, span):
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = None
+
+    def update(self, value):
+        if self.value is None:
+            self.value = value
+        else:
+            self.value = self.alpha * value + (1.0 - self.alpha) * self.value
+        return self.value
+
+class RecentFlag:
+    """Whether a flag fired within the last `window` bars (as the batch signal confirmation)"""
+
+    def __init__(self, window):
+        self.window = window
+        self.last_fired = None
+        self.bars = 0
+
+    def update(self, fired):
+        if fired:
+            self.last_fired = self.bars
+        self.bars += 1
+        # No confirmation until a full window of bars has been seen
+        return (self.bars >= self.window and self.last_fired is not None and
+                self.last_fired > self.bars - 1 - self.window)
+
+class StreamingIndicatorState:
+    """Indicator and signal state for one symbol, updated in O(1) per bar"""
+
+    def __init__(self, params=None):
+        self.params = resolve_indicator_params(params)
+        params = self.params
+        self.bars = 0
+        self.last_timestamp = None
+        self.latest = {}
+
+        self.moving_average = RollingMean(params['ma_window'])
+        self.period_high = RollingExtreme(params['stoch_window'], use_max=True)
+        self.period_low = RollingExtreme(params['stoch_window'], use_max=False)
+        self.percent_k = RollingMean(params['stoch_k_smooth'])
+        self.percent_d = RollingMean(params['stoch_d_smooth'])
+        self.smoothed_d = RollingMean(params['stoch_d_long_smooth'])
+        self.fast_ema = EMA(params['macd_fast'])
+        self.slow_ema = EMA(params['macd_slow'])
+        self.signal_line = EMA(params['macd_signal'])
+        self.smoothed_macd = RollingMean(params['macd_smooth'])
+        self.smoothed_signal = RollingMean(params['macd_smooth'])
+
+        window = params['signal_window']
+        self.recent = {name: RecentFlag(window) for name in
+                       ('buy_ma', 'buy_stochastic', 'buy_macd', 'sell_ma', 'sell_stochastic', 'sell_macd')}
+        self.recent_signals = deque(maxlen=RECOMMENDATION_BARS)
+
+        self._previous_smoothed_d = None
+        self._previous_macd = None
+        self._previous_signal = None
+
+    @property
+    def ready(self):
+        """Whether enough bars were seen for the batch calculation to report indicators"""
+        return self.bars >= MIN_HISTORY
+
+    def update(self, high, low, close, timestamp=None):
+        """Add one bar and return its indicator values and signal flags"""
+        high, low, close = float(high), float(low), float(close)
+        threshold = self.params['stoch_threshold']
+        values = {'Close': close}
+
+        values['30_Moving_Avg'] = self.moving_average.update(close)
+
+        # Stochastic Oscillator
+        period_high = self.period_high.update(high)
+        period_low = self.period_low.update(low)
+        denominator = period_high - period_low
+        if denominator == 0:
+            denominator = 1e-10
+        values['%K'] = self.percent_k.update((close - period_low) * 100 / denominator)
+        values['%D'] = self.percent_d.update(values['%K'])
+        smoothed_d = values['Smoothed_%D'] = self.smoothed_d.update(values['%D'])
+
+        # MACD
+        values['12_EMA'] = self.fast_ema.update(close)
+        values['26_EMA'] = self.slow_ema.update(close)
+        values['MACD'] = values['12_EMA'] - values['26_EMA']
+        values['Signal_Line'] = self.signal_line.update(values['MACD'])
+        smoothed_macd = values['Smoothed_MACD'] = self.smoothed_macd.update(values['MACD'])
+        smoothed_signal = values['Smoothed_Signal_Line'] = self.smoothed_signal.update(values['Signal_Line'])
+
+        # Buy/sell conditions; crossings need the previous bar
+        previous_d = self._previous_smoothed_d
+        previous_macd, previous_signal = self._previous_macd, self._previous_signal
+        has_previous = previous_d is not None
+        values['buy_ma'] = close > values['30_Moving_Avg']
+        values['buy_stochastic'] = has_previous and smoothed_d > threshold and previous_d <= threshold
+        values['buy_macd'] = has_previous and smoothed_macd > smoothed_signal and previous_macd <= previous_signal
+        values['sell_ma'] = close < values['30_Moving_Avg']
+        values['sell_stochastic'] = has_previous and smoothed_d < threshold and previous_d >= threshold
+        values['sell_macd'] = has_previous and smoothed_macd < smoothed_signal and previous_macd >= previous_signal
+
+        recent = {name: tracker.update(values[name]) for name, tracker in self.recent.items()}
+        values['Buy_Signal'] = recent['buy_ma'] and recent['buy_stochastic'] and recent['buy_macd']
+        values['Sell_Signal'] = recent['sell_ma'] and recent['sell_stochastic'] and recent['sell_macd']
+
+        self._previous_smoothed_d = smoothed_d
+        self._previous_macd, self._previous_signal = smoothed_macd, smoothed_signal
+        self.recent_signals.append((values['Buy_Signal'], values['Sell_Signal']))
+        self.bars += 1
+        self.last_timestamp = timestamp
+        self.latest = values
+        return values
+
+    def update_frame(self, bars):
+        """Feed the rows of a High/Low/Close DataFrame newer than the last bar seen; returns rows added"""
+        if self.last_timestamp is not None:
+            bars = bars[bars.index > self.last_timestamp]
+        for timestamp, high, low, close in zip(bars.index, bars['High'].to_numpy(),
+                                               bars['Low'].to_numpy(), bars['Close'].to_numpy()):
+            self.update(high, low, close, timestamp)
+        return len(bars)
+
+    def recommendation(self):
+        """BUY/SELL/HOLD from the signals of the last bars, as get_technical_recommendation"""
+        if not self.ready:
+            return 'HOLD'
+        buy_count = sum(buy for buy, sell in self.recent_signals)
+        sell_count = sum(sell for buy, sell in self.recent_signals)
+        if buy_count > sell_count and buy_count > 0:
+            return 'BUY'
+        elif sell_count > buy_count and sell_count > 0:
+            return 'SELL'
+        return 'HOLD'
+
+def replay(bars, params=None):
+    """Stream bars through a fresh state; returns the per-bar values as a DataFrame and seconds per bar"""
+    state = StreamingIndicatorState(params)
+    rows = []
+    start_time = time.perf_counter()
+    for high, low, close in zip(bars['High'].to_numpy(), bars['Low'].to_numpy(), bars['Close'].to_numpy()):
+        rows.append(state.update(high, low, close))
+    seconds_per_bar = (time.perf_counter() - start_time) / max(len(bars), 1)
+    return pd.DataFrame(rows, index=bars.index), seconds_per_bar
+
+def compare_with_batch(bars, params=None):
+    """Replay bars and compare every bar's values with calculate_technical_indicators"""
+    if len(bars) < MIN_HISTORY:
+        raise ValueError(f"Need at least {MIN_HISTORY} bars to compare, got {len(bars)}")
+    streamed, seconds_per_bar = replay(bars, params)
+    batch = calculate_technical_indicators(bars.copy(), params)
+
+    differences = {}
+    for column in VALUE_COLUMNS:
+        expected = batch[column].to_numpy(dtype=float)
+        scale = np.maximum(np.abs(expected), 1.0)
+        differences[column] = float(np.max(np.abs(streamed[column].to_numpy(dtype=float) - expected) / scale))
+    mismatches = {column: int((streamed[column].to_numpy(dtype=bool) != batch[column].to_numpy(dtype=bool)).sum())
+                  for column in FLAG_COLUMNS}
+    return {
+        'bars': len(bars),
+        'max_relative_difference': differences,
+        'flag_mismatches': mismatches,
+        'microseconds_per_bar': round(seconds_per_bar * 1e6, 2)
+    }
+
+def load_bar_file(path):
+    """Load a bar CSV (first column is the timestamp) with High, Low and Close columns"""
+    bars = pd.read_csv(path, index_col=0, parse_dates=True)
+    bars.columns = [str(column).strip().title() for column in bars.columns]
+    missing = [column for column in ('High', 'Low', 'Close') if column not in bars.columns]
+    if missing:
+        raise ValueError(f"Bar file is missing columns: {', '.join(missing)}")
+    return bars[['High', 'Low', 'Close']].dropna().sort_index()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay a bar file through the streaming indicators')
+    parser.add_argument('bar_file', help='CSV with a timestamp index and High, Low, Close columns')
+    parser.add_argument('--tolerance', type=float, default=1e-8, help='Allowed relative difference')
+    args = parser.parse_args()
+
+    report = compare_with_batch(load_bar_file(args.bar_file))
+    print(f"Replayed {report['bars']} bars at {report['microseconds_per_bar']} us/bar")
+    for column, difference in report['max_relative_difference'].items():
+        print(f"  {column:<22} max relative difference {difference:.2e}")
+    for column, count in report['flag_mismatches'].items():
+        print(f"  {column:<22} {count} mismatched bars")
+
+    matches = (all(difference <= args.tolerance for difference in report['max_relative_difference'].values())
+               and not any(report['flag_mismatches'].values()))
+    print("Streaming state matches the batch calculation" if matches else "MISMATCH against the batch calculation")
+    raise SystemExit(0 if matches else 1)
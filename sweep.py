@@ -0,0 +1,242 @@
+"""
+Parameter sweep over the technical indicator settings
+Evaluates a grid of indicator parameter sets against the price store history across a
+process pool. Results are cached per (symbol, parameter set, data version), so a re-run
+only recomputes combinations whose parameters or price data changed.
+
+Pool workers are spawned rather than forked: sweeps also run inside the threaded web server,
+and a fork there would copy its locks in whatever state other threads left them.
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import tempfile
+import time
+import multiprocessing
+import numpy as np
+import pandas as pd
+import price_store
+from backtest import run_backtest
+from indicators import DEFAULT_INDICATOR_PARAMS, resolve_indicator_params
+
+SWEEP_CACHE_DIR = 'sweep_cache'
+# Symbols per worker task, so small grids still spread over all processes
+SYMBOLS_PER_TASK = 100
+POOL_START_METHOD = 'spawn'
+RESULT_FIELDS = ['total_return', 'annualized_return', 'buy_and_hold_return', 'max_drawdown',
+                 'trades', 'hit_rate', 'exposure', 'bars']
+
+def expand_grid(grid):
+    """Expand {param: [values]} into a list of full parameter sets"""
+    names = sorted(grid)
+    combinations = itertools.product(*[grid[name] if isinstance(grid[name], list) else [grid[name]]
+                                       for name in names])
+    return [resolve_indicator_params(dict(zip(names, values))) for values in combinations]
+
+def params_key(params):
+    """Stable short key for a resolved parameter set"""
+    encoded = json.dumps(params, sort_keys=True).encode()
+    return hashlib.sha1(encoded).hexdigest()[:16]
+
+def symbol_data_version(store, symbol):
+    """Hash of a symbol's stored dates and prices; changes only when its data changes"""
+    arrays = price_store.symbol_arrays(store, symbol)
+    if arrays is None:
+        return None
+
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(arrays['dates'].asi8.tobytes())
+    for field in ('High', 'Low', 'Close'):
+        digest.update(np.ascontiguousarray(arrays[field]).tobytes())
+    return digest.hexdigest()
+
+def _cache_file(key, cache_dir):
+    return os.path.join(cache_dir, f'{key}.json')
+
+def load_cached_results(key, cache_dir=SWEEP_CACHE_DIR):
+    """Cached {symbol: {'data_version', 'window', 'result'}} for one parameter set"""
+    try:
+        with open(_cache_file(key, cache_dir), 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"Error loading sweep cache {key}: {e}")
+        return {}
+
+def _write_json(path, obj, **kwargs):
+    """Write obj to path through a unique temporary file, so concurrent writers never mix"""
+    fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix=os.path.basename(path) + '.',
+                                    suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(obj, f, **kwargs)
+        os.replace(tmp_file, path)
+    except BaseException:
+        os.unlink(tmp_file)
+        raise
+
+def save_cached_results(key, params, entries, cache_dir=SWEEP_CACHE_DIR):
+    """Save cached results for one parameter set"""
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        _write_json(_cache_file(key, cache_dir), entries)
+
+        # Keep the readable parameter set next to its results
+        _write_json(os.path.join(cache_dir, f'{key}.params.json'), params, indent=2, sort_keys=True)
+        return True
+    except Exception as e:
+        print(f"Error saving sweep cache {key}: {e}")
+        return False
+
+def resolve_processes(processes):
+    """Worker process count clamped to [1, CPU count] (None for the CPU count)
+
+    Raises ValueError unless processes is None or an integer.
+    """
+    if processes is None:
+        return None
+    if isinstance(processes, bool) or not isinstance(processes, int):
+        raise ValueError('processes must be an integer')
+    return min(max(processes, 1), os.cpu_count() or 1)
+
+def _evaluate_params(task):
+    """Worker: backtest one parameter set over the given symbols"""
+    key, params, symbols, store_path, start, end = task
+    store = price_store.open_price_store(store_path)
+
+    high = price_store.matrix(store, 'High', symbols)
+    low = price_store.matrix(store, 'Low', symbols)
+    close = price_store.matrix(store, 'Close', symbols)
+    performance = run_backtest(high, low, close, start=start, end=end, params=params)
+
+    results = {}
+    for symbol, row in performance.iterrows():
+        results[symbol] = {field: (None if pd.isna(row[field]) else float(row[field]))
+                           for field in RESULT_FIELDS}
+    return key, results
+
+def summarize_results(results):
+    """Aggregate per-symbol results of one parameter set"""
+    frame = pd.DataFrame(list(results.values()), columns=RESULT_FIELDS, dtype=float)
+    if frame.empty:
+        return {'symbols_tested': 0}
+
+    def median(field):
+        value = frame[field].median()
+        return None if pd.isna(value) else round(float(value), 4)
+
+    return {
+        'symbols_tested': len(frame),
+        'median_total_return': median('total_return'),
+        'median_annualized_return': median('annualized_return'),
+        'median_hit_rate': median('hit_rate'),
+        'median_max_drawdown': median('max_drawdown'),
+        'total_trades': int(frame['trades'].sum())
+    }
+
+def run_parameter_sweep(grid, symbols, start=None, end=None, processes=None,
+                        store_path=price_store.PRICE_STORE_DIR, cache_dir=SWEEP_CACHE_DIR,
+                        objective='median_total_return'):
+    """Evaluate every parameter set in grid over symbols, reusing cached results"""
+    start_time = time.perf_counter()
+    processes = resolve_processes(processes)
+    store = price_store.open_price_store(store_path)
+    if store is None:
+        raise ValueError(f"No price store found at {store_path}")
+
+    symbols = [s for s in dict.fromkeys(symbols) if s in store['symbol_index']]
+    versions = {symbol: symbol_data_version(store, symbol) for symbol in symbols}
+    window = [start, end]
+
+    param_sets = expand_grid(grid)
+    cached = {}
+    tasks = []
+    for params in param_sets:
+        key = params_key(params)
+        entries = load_cached_results(key, cache_dir)
+        cached[key] = entries
+
+        stale = [symbol for symbol in symbols
+                 if entries.get(symbol, {}).get('data_version') != versions[symbol]
+                 or entries.get(symbol, {}).get('window') != window]
+        for i in range(0, len(stale), SYMBOLS_PER_TASK):
+            tasks.append((key, params, stale[i:i + SYMBOLS_PER_TASK], store_path, start, end))
+
+    computed = sum(len(task[2]) for task in tasks)
+    print(f"Sweep: {len(param_sets)} parameter sets x {len(symbols)} symbols, "
+          f"{computed} combinations to compute")
+
+    if tasks:
+        params_by_key = {task[0]: task[1] for task in tasks}
+        if processes == 1 or len(tasks) == 1:
+            outputs = map(_evaluate_params, tasks)
+            pool = None
+        else:
+            pool = multiprocessing.get_context(POOL_START_METHOD).Pool(processes=processes)
+            outputs = pool.imap_unordered(_evaluate_params, tasks)
+
+        try:
+            for key, results in outputs:
+                for symbol, result in results.items():
+                    cached[key][symbol] = {'data_version': versions[symbol], 'window': window,
+                                           'result': result}
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        for key, params in params_by_key.items():
+            save_cached_results(key, params, cached[key], cache_dir)
+
+    ranking = []
+    for params in param_sets:
+        key = params_key(params)
+        results = {symbol: cached[key][symbol]['result'] for symbol in symbols if symbol in cached[key]}
+        ranking.append({'params_key': key, 'params': params, 'summary': summarize_results(results)})
+
+    def objective_value(entry):
+        value = entry['summary'].get(objective)
+        return float('-inf') if value is None else value
+
+    ranking.sort(key=objective_value, reverse=True)
+
+    return {
+        'ranking': ranking,
+        'objective': objective,
+        'parameter_sets': len(param_sets),
+        'symbols': len(symbols),
+        'combinations_computed': computed,
+        'combinations_cached': len(param_sets) * len(symbols) - computed,
+        'elapsed_ms': round((time.perf_counter() - start_time) * 1000, 1)
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Grid search over technical indicator parameters')
+    parser.add_argument('--grid', required=True, help='JSON file of {parameter: [values]}')
+    parser.add_argument('--symbols', help='Comma-separated symbols (default: whole price store)')
+    parser.add_argument('--start', help='Backtest start date (YYYY-MM-DD)')
+    parser.add_argument('--end', help='Backtest end date (YYYY-MM-DD)')
+    parser.add_argument('--processes', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--top', type=int, default=10, help='Parameter sets to print')
+    args = parser.parse_args()
+
+    with open(args.grid, 'r') as f:
+        grid = json.load(f)
+
+    if args.symbols:
+        symbols = [s.strip().upper() for s in args.symbols.split(',') if s.strip()]
+    else:
+        store = price_store.open_price_store()
+        symbols = store['symbols'] if store else []
+
+    sweep = run_parameter_sweep(grid, symbols, start=args.start, end=args.end, processes=args.processes)
+    print(f"Computed {sweep['combinations_computed']}, reused {sweep['combinations_cached']} "
+          f"in {sweep['elapsed_ms'] / 1000:.1f}s")
+    for rank, entry in enumerate(sweep['ranking'][:args.top], 1):
+        changed = {name: value for name, value in entry['params'].items()
+                   if value != DEFAULT_INDICATOR_PARAMS[name]}
+        print(f"{rank:>3}. {entry['summary']}  {changed}")
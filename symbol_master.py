@@ -0,0 +1,244 @@
+"""
+Local symbol master
+Symbol, name, sector, industry and exchange of every US-listed symbol, refreshed in bulk
+from the Nasdaq Trader symbol directories and merged with universe.csv and the sector data
+the app has already fetched. It is saved as symbol_master.csv (the universe file format) and
+loaded into sorted prefix indexes over symbols and company name words, so autocomplete and
+symbol validation are a few bisections in memory instead of a Yahoo Finance round trip.
+
+Without a symbol master file the index is built from universe.csv; it is then used for
+names and search but not to reject unknown symbols. The listings only cover US common
+shares, class shares, units and the like, so symbols in other forms (indices such as ^GSPC,
+foreign listings such as VOD.L, crypto pairs such as BTC-USD, preferreds such as BAC-PL)
+are never rejected locally.
+
+    python symbol_master.py --refresh
+    python symbol_master.py --search "bank of"
+"""
+
+import argparse
+import bisect
+import os
+import re
+import threading
+import time
+import urllib.request
+from universe import load_universe, save_universe, UNIVERSE_FILE
+
+SYMBOL_MASTER_FILE = 'symbol_master.csv'
+
+# Pipe-delimited listings of every Nasdaq and NYSE/Cboe/IEX security, updated daily
+LISTING_URLS = {
+    'nasdaqlisted': 'https://www.nasdaqtrader.com/dynamic/SymDir/nasdaqlisted.txt',
+    'otherlisted': 'https://www.nasdaqtrader.com/dynamic/SymDir/otherlisted.txt'
+}
+OTHER_EXCHANGES = {'A': 'NYSE American', 'N': 'NYSE', 'P': 'NYSE Arca', 'Z': 'Cboe BZX', 'V': 'IEX'}
+LISTING_TIMEOUT = 30
+
+SEARCH_LIMIT = 10
+
+# Symbols of the form the listings cover: 1-5 letters with an optional one-letter class
+# suffix (BRK-B). Preferreds (-P<series>) are skipped by parse_listing, so -P is excluded.
+LISTED_SYMBOL_PATTERN = re.compile(r'[A-Z]{1,5}(-[A-OQ-Z])?')
+
+class SymbolIndex:
+    """Symbol rows with sorted prefix indexes over symbols and lowercase name words"""
+
+    def __init__(self, rows, source):
+        self.source = source
+        self.rows = {row['symbol']: row for row in rows}
+        self.symbols = sorted(self.rows)
+        self.name_words = {row['symbol']: name_words(row.get('name')) for row in rows}
+        words = sorted({(word, symbol) for symbol, symbol_words in self.name_words.items() for word in symbol_words})
+        self.words = [word for word, _ in words]
+        self.word_symbols = [symbol for _, symbol in words]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def lookup(self, symbol):
+        return self.rows.get(symbol)
+
+    def _prefix_range(self, keys, prefix):
+        return bisect.bisect_left(keys, prefix), bisect.bisect_left(keys, prefix + '\uffff')
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        """Rows matching query: the exact symbol, then symbol prefixes, then company name word prefixes"""
+        query = (query or '').strip()
+        if not query or limit < 1:
+            return []
+
+        matches = []
+        seen = set()
+
+        def add(symbol):
+            if symbol not in seen:
+                seen.add(symbol)
+                matches.append(self.rows[symbol])
+            return len(matches) >= limit
+
+        symbol_query = query.upper()
+        if symbol_query in self.rows and add(symbol_query):
+            return matches
+        start, end = self._prefix_range(self.symbols, symbol_query)
+        for symbol in self.symbols[start:end]:
+            if add(symbol):
+                return matches
+
+        # Every query word must start a word of the name ("bank of" matches "Bank of America");
+        # candidates come from the query word with the fewest matching name words
+        terms = name_words(query)
+        if not terms:
+            return matches
+        (start, end), scanned = min(((self._prefix_range(self.words, term), term) for term in terms),
+                                    key=lambda item: item[0][1] - item[0][0])
+        others = [term for term in terms if term != scanned]
+        for symbol in self.word_symbols[start:end]:
+            if symbol in seen:
+                continue
+            if others:
+                words = self.name_words[symbol]
+                if not all(any(word.startswith(term) for word in words) for term in others):
+                    continue
+            if add(symbol):
+                break
+        return matches
+
+def name_words(name):
+    return re.findall(r'[a-z0-9]+', (name or '').lower())
+
+def clean_security_name(name):
+    """'Apple Inc. - Common Stock' -> 'Apple Inc.'"""
+    return name.split(' - ')[0].strip()
+
+def parse_listing(text, source):
+    """Rows of a Nasdaq Trader listing file (test issues and the trailer line skipped)"""
+    lines = text.strip().splitlines()
+    if not lines:
+        return []
+    header = lines[0].split('|')
+    symbol_column = 'Symbol' if source == 'nasdaqlisted' else 'ACT Symbol'
+
+    rows = []
+    for line in lines[1:]:
+        if line.startswith('File Creation Time'):
+            continue
+        entry = dict(zip(header, line.split('|')))
+        symbol = entry.get(symbol_column, '').strip()
+        if not symbol or entry.get('Test Issue') == 'Y' or '$' in symbol:
+            continue
+        exchange = 'NASDAQ' if source == 'nasdaqlisted' else OTHER_EXCHANGES.get(entry.get('Exchange'), '')
+        rows.append({
+            # Class shares are BRK.B in the listings and BRK-B on Yahoo Finance
+            'symbol': symbol.replace('.', '-').upper(),
+            'name': clean_security_name(entry.get('Security Name', '')),
+            'sector': '',
+            'industry': '',
+            'exchange': exchange
+        })
+    return rows
+
+def fetch_listings(timeout=LISTING_TIMEOUT):
+    """Rows of every current listing, downloaded from Nasdaq Trader"""
+    rows = []
+    for source, url in LISTING_URLS.items():
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            rows.extend(parse_listing(response.read().decode('utf-8', errors='replace'), source))
+    return rows
+
+def merge_rows(*row_sets):
+    """Rows by symbol, later sets filling in (not blanking) the fields of earlier ones"""
+    merged = {}
+    for rows in row_sets:
+        for row in rows:
+            symbol = (row.get('symbol') or '').strip().upper()
+            if not symbol:
+                continue
+            entry = merged.setdefault(symbol, {'symbol': symbol})
+            for column in ('name', 'sector', 'industry', 'exchange'):
+                if row.get(column):
+                    entry[column] = row[column]
+    return [merged[symbol] for symbol in sorted(merged)]
+
+_index = {'index': None, 'mtime': None}
+_index_lock = threading.Lock()
+
+def get_index(path=SYMBOL_MASTER_FILE, fallback=UNIVERSE_FILE):
+    """The in-memory index, rebuilt when the symbol master file changes on disk"""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        mtime = None
+
+    index = _index['index']
+    if index is not None and _index['mtime'] == mtime:
+        return index
+
+    with _index_lock:
+        if _index['index'] is None or _index['mtime'] != mtime:
+            if mtime is not None:
+                _index['index'] = SymbolIndex(load_universe(path), 'master')
+            else:
+                _index['index'] = SymbolIndex(load_universe(fallback), 'universe')
+            _index['mtime'] = mtime
+        return _index['index']
+
+def lookup(symbol):
+    """Master row of symbol (None if unknown)"""
+    return get_index().lookup(symbol)
+
+def search(query, limit=SEARCH_LIMIT):
+    return get_index().search(query, limit)
+
+def is_authoritative():
+    """Whether unknown symbols can be rejected locally (a bulk refreshed master is loaded)"""
+    index = get_index()
+    return index.source == 'master' and len(index) > 0
+
+def can_reject(symbol):
+    """Whether symbol can be declared invalid because the symbol master does not list it"""
+    return bool(LISTED_SYMBOL_PATTERN.fullmatch(symbol or '')) and is_authoritative()
+
+def refresh_symbol_master(extra_rows=(), path=SYMBOL_MASTER_FILE, listings=None):
+    """Rebuild the symbol master from the listings, universe.csv and extra_rows; returns a summary
+
+    extra_rows fill in sector and industry (e.g. from fundamentals already fetched).
+    """
+    start_time = time.perf_counter()
+    listings = fetch_listings() if listings is None else listings
+    if not listings:
+        raise RuntimeError('No symbols in the listing files')
+
+    rows = merge_rows(listings, load_universe(UNIVERSE_FILE), extra_rows)
+    if not save_universe(rows, path):
+        raise RuntimeError(f'Failed to save {path}')
+    get_index(path)
+    return {
+        'symbols': len(rows),
+        'listed': len(listings),
+        'with_sector': sum(1 for row in rows if row.get('sector')),
+        'file_saved': path,
+        'elapsed_seconds': round(time.perf_counter() - start_time, 1)
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Refresh or search the local symbol master')
+    parser.add_argument('--refresh', action='store_true', help='Download the exchange listings and rebuild the master')
+    parser.add_argument('--search', help='Autocomplete a symbol or company name')
+    parser.add_argument('--limit', type=int, default=SEARCH_LIMIT, help='Search results to show')
+    args = parser.parse_args()
+
+    if args.refresh:
+        print(refresh_symbol_master())
+    if args.search:
+        start = time.perf_counter()
+        index = get_index()
+        loaded = time.perf_counter()
+        results = index.search(args.search, args.limit)
+        searched = time.perf_counter()
+        for row in results:
+            print(f"{row['symbol']:<8} {row.get('name', ''):<45} {row.get('exchange', ''):<12} {row.get('sector', '')}")
+        print(f"{len(index)} symbols ({index.source}); loaded in {(loaded - start) * 1000:.1f} ms, "
+              f"searched in {(searched - loaded) * 1e6:.0f} us")
+    if not args.refresh and not args.search:
+        parser.print_help()
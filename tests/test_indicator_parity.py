@@ -0,0 +1,62 @@
+"""
+indicator_kernel parity tests
+calculate_served_indicators must give the same served columns as calculate_technical_indicators,
+including on flat stretches and integer prices where exact ties decide the crossings:
+
+    python -m pytest tests/test_indicator_parity.py
+"""
+
+import os
+import sys
+import unittest
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from indicators import (calculate_served_indicators, calculate_technical_indicators,
+                        resolve_indicator_params, KERNEL_FLAG_COLUMNS, KERNEL_VALUE_COLUMNS)
+
+def price_frame(close, spread):
+    close = np.asarray(close, dtype=float)
+    return pd.DataFrame({'High': close + spread, 'Low': close - spread, 'Close': close},
+                        index=pd.date_range('2020-01-01', periods=len(close)))
+
+class IndicatorParityTest(unittest.TestCase):
+    def assert_parity(self, data):
+        expected = calculate_technical_indicators(data.copy())
+        served = calculate_served_indicators(data.copy())
+        for column in KERNEL_FLAG_COLUMNS:
+            np.testing.assert_array_equal(served[column].to_numpy(), expected[column].to_numpy(dtype=bool),
+                                          err_msg=column)
+        np.testing.assert_allclose(served[KERNEL_VALUE_COLUMNS].to_numpy(),
+                                   expected[KERNEL_VALUE_COLUMNS].to_numpy(), rtol=1e-9, atol=1e-9)
+
+    def test_flat_opening_run(self):
+        rng = np.random.default_rng(1)
+        close = np.r_[np.full(60, 50.0), 50 + np.cumsum(rng.integers(-1, 2, 240))]
+        self.assert_parity(price_frame(close, 1.0))
+        served = calculate_served_indicators(price_frame(close, 1.0))
+        # Equal EMAs on the flat run give a MACD of exactly 0, so no crossing fires there
+        self.assertFalse(served['buy_macd'].iloc[:60].any())
+        self.assertFalse(served['sell_macd'].iloc[:60].any())
+
+    def test_constant_series(self):
+        self.assert_parity(price_frame(np.full(120, 20.0), 0.0))
+
+    def test_integer_prices(self):
+        rng = np.random.default_rng(0)
+        for _ in range(100):
+            close = 100 + np.cumsum(rng.integers(-2, 3, 300))
+            self.assert_parity(price_frame(close, rng.integers(0, 3, 300)))
+
+    def test_whole_number_window_params(self):
+        params = resolve_indicator_params({'ma_window': 30.0, 'stoch_threshold': 25.5})
+        self.assertIs(type(params['ma_window']), int)
+        self.assertEqual(params['stoch_threshold'], 25.5)
+        for value in (30.5, 0, True, '30', None):
+            with self.assertRaises(ValueError):
+                resolve_indicator_params({'ma_window': value})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+"""
+Portfolio risk endpoint tests
+Run against the offline market data backend in a scratch working directory:
+
+    python -m pytest tests/test_portfolio_risk.py
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as stock_app
+import offline_data
+
+class PortfolioRiskTest(unittest.TestCase):
+    def setUp(self):
+        self.previous_dir = os.getcwd()
+        self.workdir = tempfile.TemporaryDirectory(prefix='risk-test-')
+        os.chdir(self.workdir.name)
+        self.previous_yf = stock_app.yf
+        offline_data.install(stock_app)
+        stock_app.data_cache.clear()
+        self.client = stock_app.create_app(load_benchmarks='lazy').test_client()
+
+    def tearDown(self):
+        stock_app.yf = self.previous_yf
+        stock_app.data_cache.clear()
+        os.chdir(self.previous_dir)
+        self.workdir.cleanup()
+
+    def test_benchmark_that_is_also_a_holding(self):
+        response = self.client.get('/api/portfolio/risk?symbols=SPY,AAPL&benchmark=SPY&fetch=true')
+        self.assertEqual(response.status_code, 200, response.get_json())
+        report = response.get_json()
+        self.assertEqual(report['missing_symbols'], [])
+        self.assertIn('SPY', report['symbols'])
+        self.assertIn('AAPL', report['symbols'])
+
+    def test_separate_benchmark(self):
+        response = self.client.get('/api/portfolio/risk?symbols=MSFT,AAPL&benchmark=SPY&fetch=true')
+        self.assertEqual(response.status_code, 200, response.get_json())
+        self.assertEqual(response.get_json()['missing_symbols'], [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+"""
+Sector-relative scoring tests
+Percentile-rank scores follow the same bands as the median-multiple scoring they replace:
+
+    python -m pytest tests/test_sector_scoring.py
+"""
+
+import os
+import sys
+import unittest
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as stock_app
+
+class SectorScoringTest(unittest.TestCase):
+    def setUp(self):
+        self.previous_benchmarks = stock_app.sector_benchmarks_data
+        values = np.arange(1.0, 101.0)
+        stock_app.sector_benchmarks_data = {
+            'Technology': {
+                **stock_app.calculate_metric_distribution('return_on_equity', values),
+                **stock_app.calculate_metric_distribution('pe_ratio', values),
+                '_sector_info': {'status': 'ok'}
+            }
+        }
+
+    def tearDown(self):
+        stock_app.sector_benchmarks_data = self.previous_benchmarks
+
+    def test_median_scores_seven(self):
+        self.assertEqual(stock_app.score_from_percentile_rank([50])[0], 7)
+        self.assertEqual(stock_app.score_from_percentile_rank([50], higher_is_better=False)[0], 7)
+        median = stock_app.sector_benchmarks_data['Technology']['return_on_equity_median']
+        self.assertEqual(stock_app.score_metric_relative_to_sector(median, 'roe', 'Technology'), 7)
+        self.assertEqual(stock_app.score_metric_relative_to_sector(median, 'pe_ratio', 'Technology',
+                                                                   higher_is_better=False), 7)
+
+    def test_bands(self):
+        ranks = [0, 9.9, 10, 30, 45, 55, 70, 80, 95, 100]
+        self.assertEqual(list(stock_app.score_from_percentile_rank(ranks)), [1, 1, 2, 4, 6, 7, 8, 9, 10, 10])
+        self.assertEqual(list(stock_app.score_from_percentile_rank([5, 95], higher_is_better=False)), [10, 1])
+
+    def test_extremes_of_the_distribution(self):
+        self.assertEqual(stock_app.score_metric_relative_to_sector(500.0, 'roe', 'Technology'), 10)
+        self.assertEqual(stock_app.score_metric_relative_to_sector(0.5, 'roe', 'Technology'), 1)
+        self.assertEqual(stock_app.score_metric_relative_to_sector(0.5, 'pe_ratio', 'Technology',
+                                                                   higher_is_better=False), 10)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+"""
+Symbol universe file
+A CSV with a 'symbol' column and optional 'name', 'sector', 'industry' and 'exchange'
+columns. A plain file with one symbol per line is accepted too.
+"""
+
+import csv
+import os
+
+UNIVERSE_FILE = 'universe.csv'
+UNIVERSE_COLUMNS = ['symbol', 'name', 'sector', 'industry', 'exchange']
+
+def load_universe(path=UNIVERSE_FILE):
+    """Load universe rows as a list of dicts (empty if the file does not exist)"""
+    if not os.path.exists(path):
+        return []
+
+    try:
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            lines = [line for line in f if line.strip() and not line.startswith('#')]
+
+        if not lines:
+            return []
+
+        if 'symbol' in lines[0].lower().split(','):
+            reader = csv.DictReader(lines)
+            rows = [{key.strip().lower(): (value or '').strip() for key, value in row.items() if key}
+                    for row in reader]
+        else:
+            rows = [{'symbol': line.split(',')[0]} for line in lines]
+
+        universe = []
+        seen = set()
+        for row in rows:
+            symbol = row.get('symbol', '').strip().upper()
+            if symbol and symbol not in seen:
+                seen.add(symbol)
+                row['symbol'] = symbol
+                universe.append(row)
+        return universe
+    except Exception as e:
+        print(f"Error loading universe from {path}: {e}")
+        return []
+
+def save_universe(rows, path=UNIVERSE_FILE):
+    """Save universe rows to a CSV file"""
+    try:
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=UNIVERSE_COLUMNS, extrasaction='ignore')
+            writer.writeheader()
+            for row in rows:
+                writer.writerow({column: row.get(column) or '' for column in UNIVERSE_COLUMNS})
+        return True
+    except Exception as e:
+        print(f"Error saving universe to {path}: {e}")
+        return False
+
+def universe_symbols(path=UNIVERSE_FILE):
+    """Get the list of symbols in the universe file"""
+    return [row['symbol'] for row in load_universe(path)]